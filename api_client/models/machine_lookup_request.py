@@ -28,7 +28,8 @@ class MachineLookupRequest(BaseModel):
     """ # noqa: E501
     instance_hash: Optional[StrictStr] = Field(default=None, description="Hash of the machine instance")
     account_hash: Optional[StrictStr] = Field(default=None, description="Hash of the account owning the instance")
-    __properties: ClassVar[List[str]] = []
+    instance_hashes: Optional[List[StrictStr]] = Field(default=None, description="Hashes of several machine instances to look up in one request")
+    __properties: ClassVar[List[str]] = ["instance_hash", "account_hash", "instance_hashes"]
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -81,6 +82,9 @@ class MachineLookupRequest(BaseModel):
             return cls.model_validate(obj)
 
         _obj = cls.model_validate({
+            "instance_hash": obj.get("instance_hash"),
+            "account_hash": obj.get("account_hash"),
+            "instance_hashes": obj.get("instance_hashes")
         })
         return _obj
 
@@ -23,6 +23,9 @@ from api_client.exceptions import ApiException, ApiValueError
 
 SUPPORTED_SOCKS_PROXIES = {"socks5", "socks5h", "socks4", "socks4a"}
 RESTResponseType = urllib3.HTTPResponse
+# Content codings urllib3 decodes transparently: gzip and deflate, and zstd
+# or br when backports.zstd (or Python 3.14) or brotli are installed
+ACCEPT_ENCODING = urllib3.util.make_headers(accept_encoding=True)["accept-encoding"]
 
 
 def is_socks_proxy_url(url):
@@ -153,6 +156,10 @@ class RESTClientObject:
 
         post_params = post_params or {}
         headers = headers or {}
+        # Ask for a compressed body unless the caller chose an encoding,
+        # urllib3 decompresses it when the response is read
+        if not any(name.lower() == "accept-encoding" for name in headers):
+            headers["Accept-Encoding"] = ACCEPT_ENCODING
 
         timeout = None
         if _request_timeout:
@@ -0,0 +1,3 @@
+from .runner import DEFAULT_OUTPUT, compare, measure, read_results, record, write_results
+from .synthetic import synthetic_payload, synthetic_ring_buffer
+from .cli import manual
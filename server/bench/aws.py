@@ -0,0 +1,62 @@
+from typing import Any, Dict, Iterator, List, Sequence
+
+from ..ec2_tools.clients import set_client_override
+from ..ec2_tools.pricing_fixtures import ReplayPricingClient
+from .synthetic import synthetic_price_fixture
+
+# Instance types handed out round robin to the stubbed fleet
+FLEET_INSTANCE_TYPES = ['m5.large', 'm5.xlarge', 'r5.large', 'c5.xlarge', 't3.medium']
+
+
+class FakeEC2:
+    """Answers describe_instances for a fixed list of running instances, and describe_images."""
+
+    def __init__(self, instance_ids: Sequence[str]) -> None:
+        self.requests: Dict[str, int] = {}
+        self.instances = [
+            {
+                'InstanceId': instance_id,
+                'InstanceType': FLEET_INSTANCE_TYPES[n % len(FLEET_INSTANCE_TYPES)],
+                'State': {'Name': 'running'},
+                'Tags': [{'Key': 'Name', 'Value': f'bench-{n}'}],
+            }
+            for n, instance_id in enumerate(instance_ids)
+        ]
+        self._by_id = {instance['InstanceId']: instance for instance in self.instances}
+
+    def describe_instances(self, InstanceIds: Sequence[str] = (), **kwargs: Any) -> Dict[str, Any]:
+        self.requests['describe_instances'] = self.requests.get('describe_instances', 0) + 1
+        instances = [self._by_id[i] for i in InstanceIds if i in self._by_id] if InstanceIds else self.instances
+        return {'Reservations': [{'Instances': instances}]}
+
+    def describe_images(self, **kwargs: Any) -> Dict[str, Any]:
+        self.requests['describe_images'] = self.requests.get('describe_images', 0) + 1
+        return {'Images': [
+            {'ImageId': 'ami-00000000000000001', 'CreationDate': '2025-01-01T00:00:00.000Z'},
+            {'ImageId': 'ami-00000000000000002', 'CreationDate': '2025-06-01T00:00:00.000Z'},
+        ]}
+
+    def get_paginator(self, operation_name: str) -> Any:
+        ec2 = self
+
+        class Paginator:
+            def paginate(self, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+                yield ec2.describe_instances(**kwargs)
+
+        return Paginator()
+
+
+class FakeSTS:
+
+    def __init__(self, account_id: str) -> None:
+        self.account_id = account_id
+
+    def get_caller_identity(self) -> Dict[str, str]:
+        return {'Account': self.account_id, 'Arn': f'arn:aws:iam::{self.account_id}:user/bench', 'UserId': 'bench'}
+
+
+def install_aws_stubs(instance_ids: List[str], account_id: str) -> None:
+    """Serve ec2, sts and pricing from in-memory stubs so no AWS account is needed."""
+    set_client_override('ec2', FakeEC2(instance_ids))
+    set_client_override('sts', FakeSTS(account_id))
+    set_client_override('pricing', ReplayPricingClient([synthetic_price_fixture()]))
@@ -0,0 +1,76 @@
+import argparse
+import functools
+import time
+import uuid
+from typing import List, Tuple
+
+from ..bitflux_catcher_api.standin import DEFAULT_ENCODINGS, StandinCatcher
+from ..machine_lookup.instance_index import sha256_hex
+from .synthetic import synthetic_payload, synthetic_ring_buffer
+
+# Account the synthetic fleet belongs to, match it with a stubbed STS identity
+DEFAULT_ACCOUNT_ID = '123456789012'
+
+
+def instance_id_for(n: int) -> str:
+    return f'i-{n:017x}'
+
+
+def machine_key_for(n: int) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, f'bitflux-standin-{n}'))
+
+
+def _payload(rows: int, sample_rate: int, seed: int) -> bytes:
+    return synthetic_payload(*synthetic_ring_buffer(rows, sample_rate, wrapped=seed % 2 == 1, seed=seed))
+
+
+def populate(catcher: StandinCatcher, machines: int = 10, rows: int = 10_000, sample_rate: int = 60,
+             account_id: str = DEFAULT_ACCOUNT_ID) -> List[Tuple[str, str]]:
+    """
+    Register a synthetic fleet with catcher.
+
+    Machine n gets a deterministic machine key and instance id, and a ring
+    buffer of rows samples (wrapped for odd n) built on its first download.
+
+    Returns:
+        (machine_key, instance_id) for each machine
+    """
+    fleet = []
+    account_hash = sha256_hex(account_id)
+    for n in range(machines):
+        machine_key, instance_id = machine_key_for(n), instance_id_for(n)
+        catcher.add_machine(machine_key, sha256_hex(instance_id), account_hash)
+        catcher.add_stats(machine_key, functools.partial(_payload, rows, sample_rate, n))
+        fleet.append((machine_key, instance_id))
+    return fleet
+
+
+def manual() -> None:
+    parser = argparse.ArgumentParser(description="Local stand-in for the bitflux catcher, point --bitflux_url at it")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8889, help="Port to listen on")
+    parser.add_argument("--machines", type=int, default=10, help="Number of synthetic machines")
+    parser.add_argument("--rows", type=int, default=10_000, help="Samples per machine, sets the payload size")
+    parser.add_argument("--sample_rate", type=int, default=60, help="Seconds between samples")
+    parser.add_argument("--account_id", default=DEFAULT_ACCOUNT_ID, help="AWS account id the machines belong to")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds per response")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="Response bytes per second, 0 for unlimited")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of requests failed with 503")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for jitter and error injection")
+    parser.add_argument("--encodings", nargs="*", default=list(DEFAULT_ENCODINGS), help="Content codings to compress responses with, in order of preference, empty to disable")
+    args = parser.parse_args()
+
+    catcher = StandinCatcher(args.host, args.port, latency=args.latency, jitter=args.jitter,
+                             bandwidth=args.bandwidth, error_rate=args.error_rate, seed=args.seed,
+                             encodings=args.encodings)
+    fleet = populate(catcher, args.machines, args.rows, args.sample_rate, args.account_id)
+    for machine_key, instance_id in fleet:
+        print(f"{instance_id} {machine_key}")
+    print(f"Serving {len(fleet)} machines for account {args.account_id} at {catcher.url}")
+    with catcher:
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
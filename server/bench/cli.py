@@ -0,0 +1,59 @@
+import argparse
+import json
+import sys
+
+from . import downloadstats, memory, pricing, startup, transfer
+from .runner import DEFAULT_OUTPUT, REGRESSION_THRESHOLD, compare, read_results, write_results
+
+SUITES = {
+    downloadstats.SUITE: lambda args, progress: downloadstats.run(
+        rows=args.rows, sample_rates=args.sample_rates, repeat=args.repeat, progress=progress),
+    pricing.SUITE: lambda args, progress: pricing.run(
+        fixtures=args.pricing_fixtures, queries=args.queries, repeat=args.repeat, progress=progress),
+    startup.SUITE: lambda args, progress: startup.run(repeat=args.repeat, progress=progress),
+    memory.SUITE: lambda args, progress: memory.run(rows=args.memory_rows, repeat=args.repeat, progress=progress),
+    transfer.SUITE: lambda args, progress: transfer.run(
+        rows=args.transfer_rows, links=args.links, repeat=args.repeat, progress=progress),
+}
+
+
+def manual() -> None:
+    parser = argparse.ArgumentParser(description="Bitflux MCP benchmarks")
+    parser.add_argument("--suite", nargs="*", default=list(SUITES), choices=list(SUITES), help="Benchmark suites to run")
+    parser.add_argument("--rows", type=int, nargs="*", default=downloadstats.DEFAULT_ROWS, help="Ring buffer sizes")
+    parser.add_argument("--sample_rates", type=int, nargs="*", default=downloadstats.DEFAULT_SAMPLE_RATES, help="Seconds between samples")
+    parser.add_argument("--pricing_fixtures", nargs="*", default=[], help="Fixtures from 'ec2_pricing --record', synthetic prices if empty")
+    parser.add_argument("--queries", nargs="*", default=pricing.DEFAULT_QUERIES, help="Instance types for the pricing suite")
+    parser.add_argument("--memory_rows", type=int, nargs="*", default=memory.DEFAULT_ROWS, help="Ring buffer sizes for the memory suite")
+    parser.add_argument("--transfer_rows", type=int, nargs="*", default=transfer.DEFAULT_ROWS, help="Ring buffer sizes for the transfer suite")
+    parser.add_argument("--links", nargs="*", default=list(transfer.LINKS), choices=list(transfer.LINKS), help="Simulated links for the transfer suite")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per benchmark")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="File to append JSON lines results to")
+    parser.add_argument("--baseline", default="", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    def progress(entry):
+        line = f"{entry['suite']:<14} {entry['name']:<30} {json.dumps(entry['params']):<55} {entry['min_s'] * 1000:>10.2f} ms"
+        if 'peak_bytes' in entry:
+            line += f" {entry['rows_per_s']:>12.0f} rows/s {entry['peak_bytes'] / 1024**2:>8.1f} MiB peak"
+        if 'peak_rss_growth_bytes' in entry:
+            line += (f" {entry['payload_bytes'] / 1024**2:>8.1f} MiB payload {entry['frame_bytes'] / 1024**2:>8.1f} MiB frame"
+                     f" {entry['peak_rss_growth_bytes'] / 1024**2:>8.1f} MiB peak growth")
+        if 'wire_bytes' in entry:
+            line += f" {entry['wire_bytes'] / 1024**2:>8.2f} MiB sent ({entry['ratio']:.0%})"
+        print(line)
+
+    results = []
+    for suite in args.suite:
+        results += SUITES[suite](args, progress)
+    write_results(results, args.output)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, read_results(args.baseline), args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['suite']} {r['name']} {json.dumps(r['params'])}: "
+                  f"{r['baseline_s'] * 1000:.2f} ms -> {r['current_s'] * 1000:.2f} ms ({r['change']:+.0%})")
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,69 @@
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..bitflux_catcher_api.standin import StandinCatcher
+from ..downloadstats.tool import (
+    add_time_column,
+    download_stats_by_machine_key,
+    scale_bitflux_data,
+    strip_warmup,
+    summarize_bitflux_data,
+    transform_data_format,
+)
+from .runner import measure, record
+from .synthetic import synthetic_payload, synthetic_ring_buffer
+
+SUITE = 'downloadstats'
+DEFAULT_ROWS = [1_000, 100_000, 1_000_000, 5_000_000]
+DEFAULT_SAMPLE_RATES = [1, 60, 300]
+MACHINE_KEY = 'bench-machine'
+
+
+def run(rows: Sequence[int] = DEFAULT_ROWS, sample_rates: Sequence[int] = DEFAULT_SAMPLE_RATES,
+        repeat: int = 3, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Time each stage of the downloadstats pipeline over synthetic ring buffers.
+
+    Every combination of rows, sample rate and wrapped/unwrapped buffer is
+    timed stage by stage on in-memory frames, then end to end with
+    download_stats_by_machine_key against a local stand-in catcher.
+
+    Args:
+        rows: Ring buffer sizes to generate
+        sample_rates: Seconds between samples
+        repeat: Timed calls per stage, the fastest is reported as min_s
+        progress: Called with each record as soon as it is measured
+
+    Returns:
+        One record per stage and parameter combination
+    """
+    results = []
+
+    def add(name: str, params: Dict[str, Any], fn: Callable[[], Any], **extra: Any) -> None:
+        timing = measure(fn, repeat)
+        timing['rows_per_s'] = params['rows'] / timing['min_s'] if timing['min_s'] else 0.0
+        entry = record(SUITE, name, params, {**timing, **extra})
+        results.append(entry)
+        if progress is not None:
+            progress(entry)
+
+    with StandinCatcher() as catcher:
+        for n, sample_rate, wrapped in itertools.product(rows, sample_rates, (False, True)):
+            params = {'rows': n, 'sample_rate': sample_rate, 'wrapped': wrapped}
+            stats, raw = synthetic_ring_buffer(n, sample_rate, wrapped)
+
+            scaled = scale_bitflux_data(stats, raw)
+            timed = add_time_column(stats, scaled)
+            stripped = strip_warmup(stats, timed)
+            add('scale_bitflux_data', params, lambda: scale_bitflux_data(stats, raw))
+            add('add_time_column', params, lambda: add_time_column(stats, scaled))
+            add('strip_warmup', params, lambda: strip_warmup(stats, timed))
+            add('transform_data_format', params, lambda: transform_data_format(stripped))
+            add('summarize_bitflux_data', params, lambda: summarize_bitflux_data(stats, stripped))
+
+            payload = synthetic_payload(stats, raw)
+            catcher.add_stats(MACHINE_KEY, payload)
+            add('download_stats_by_machine_key', params,
+                lambda: download_stats_by_machine_key(MACHINE_KEY, catcher.url),
+                payload_bytes=len(payload))
+    return results
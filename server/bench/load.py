@@ -0,0 +1,221 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+from ..bitflux_catcher_api.standin import StandinCatcher
+from ..serving import free_port, wait_for_port
+from .catcher import DEFAULT_ACCOUNT_ID, instance_id_for, machine_key_for, populate
+from .runner import DEFAULT_OUTPUT, record, write_results
+
+SUITE = 'load'
+# Relative weight of each tool in the call mix
+DEFAULT_MIX = {
+    'download_stats_by_machine_key': 4,
+    'download_stats_by_instance_id': 2,
+    'list_machines_by_region': 1,
+    'get_ec2_pricing': 2,
+}
+PRICING_QUERIES = ['m5.large', 'r5.large', 'm5.*']
+REGION = 'us-east-1'
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """Parse 'tool=weight,tool=weight' into a mix dictionary."""
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = int(weight or 1)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise ValueError(f"Unknown tools in mix: {sorted(unknown)}, expected {sorted(DEFAULT_MIX)}")
+    return mix
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of values, q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(-(-q * len(ordered) // 100))))
+    return ordered[rank - 1]
+
+
+def tool_arguments(tool: str, fleet: List[Tuple[str, str]], rng: random.Random) -> Dict[str, Any]:
+    machine_key, instance_id = rng.choice(fleet)
+    if tool == 'download_stats_by_machine_key':
+        return {'machine_key': machine_key}
+    if tool == 'download_stats_by_instance_id':
+        return {'instance_id': instance_id}
+    if tool == 'list_machines_by_region':
+        return {'region': REGION}
+    return {'region': REGION, 'instance_type': rng.choice(PRICING_QUERIES)}
+
+
+def _failed(result: Any) -> bool:
+    """Tool errors come back either as isError or as a {'status': 'error'} payload."""
+    if result.isError:
+        return True
+    for content in result.content:
+        text = getattr(content, 'text', '')
+        if text.startswith('{') and '"status": "error"' in text:
+            return True
+    return False
+
+
+async def run_session(url: str, mix: Dict[str, int], fleet: List[Tuple[str, str]], deadline: float,
+                      seed: int, samples: List[Tuple[str, float, bool]]) -> None:
+    """Open one MCP session and call tools drawn from mix until deadline."""
+    rng = random.Random(seed)
+    tools, weights = list(mix), list(mix.values())
+    async with sse_client(url, timeout=30, sse_read_timeout=600) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            while time.monotonic() < deadline:
+                tool = rng.choices(tools, weights)[0]
+                start = time.perf_counter()
+                try:
+                    failed = _failed(await session.call_tool(tool, tool_arguments(tool, fleet, rng)))
+                except Exception:
+                    failed = True
+                samples.append((tool, time.perf_counter() - start, failed))
+
+
+async def run_step(url: str, sessions: int, duration: float, mix: Dict[str, int],
+                   fleet: List[Tuple[str, str]], seed: int = 0) -> Tuple[List[Tuple[str, float, bool]], float]:
+    """Run sessions concurrent sessions for duration seconds, returning the samples and elapsed time."""
+    samples: List[Tuple[str, float, bool]] = []
+    start = time.monotonic()
+    deadline = start + duration
+    results = await asyncio.gather(
+        *[run_session(url, mix, fleet, deadline, seed + n, samples) for n in range(sessions)],
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            samples.append(('session', 0.0, True))
+    return samples, time.monotonic() - start
+
+
+def summarize(samples: List[Tuple[str, float, bool]], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    """Per tool, and 'all', call counts, errors, throughput and latency percentiles in seconds."""
+    by_tool: Dict[str, List[Tuple[float, bool]]] = {}
+    for tool, latency, failed in samples:
+        by_tool.setdefault(tool, []).append((latency, failed))
+        by_tool.setdefault('all', []).append((latency, failed))
+    summary = {}
+    for tool, entries in sorted(by_tool.items()):
+        latencies = [latency for latency, failed in entries if not failed]
+        summary[tool] = {
+            'calls': len(entries),
+            'errors': sum(1 for _, failed in entries if failed),
+            'calls_per_s': len(entries) / elapsed if elapsed else 0.0,
+            'p50_s': percentile(latencies, 50),
+            'p95_s': percentile(latencies, 95),
+            'p99_s': percentile(latencies, 99),
+            'max_s': max(latencies, default=0.0),
+        }
+    return summary
+
+
+@contextlib.contextmanager
+def stubbed_server(catcher_url: str, machines: int, account_id: str = DEFAULT_ACCOUNT_ID,
+                   extra_args: Sequence[str] = (), transport: str = 'sse') -> Iterator[str]:
+    """
+    Start the MCP server in a subprocess with stubbed AWS and a fresh cache.
+
+    Args:
+        transport: 'sse' or 'http' for streamable HTTP
+
+    Yields:
+        The SSE or streamable HTTP endpoint url
+    """
+    port = free_port()
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    with tempfile.TemporaryDirectory() as cache:
+        env = {**os.environ, 'BITFLUX_CACHE_DIR': cache}
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'server.bench.stubbed_server', '--machines', str(machines),
+             '--account_id', account_id, f'--{transport}', '--port', str(port), '--bitflux_url', catcher_url, *extra_args],
+            cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(port, process)
+            yield f'http://127.0.0.1:{port}' + ('/sse' if transport == 'sse' else '/mcp')
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def run(sessions: Sequence[int] = (1, 4, 16), duration: float = 10.0, mix: Optional[Dict[str, int]] = None,
+        machines: int = 20, rows: int = 10_000, latency: float = 0.0, url: str = '',
+        progress: Optional[Any] = None, workers: int = 1) -> List[Dict[str, Any]]:
+    """
+    Load test the SSE server with an increasing number of concurrent sessions.
+
+    Each step keeps sessions concurrent MCP sessions calling tools back to
+    back for duration seconds. Unless url is given, a stand-in catcher with a
+    synthetic fleet and a stubbed-AWS server subprocess are started for the
+    run, serving from workers processes; a server at url must use
+    'main.py standin' with the same machines.
+
+    Returns:
+        One record per step and tool (plus 'all') with calls_per_s and p50/p95/p99 latency
+    """
+    mix = mix or DEFAULT_MIX
+    results = []
+    with contextlib.ExitStack() as stack:
+        if url:
+            # The server's catcher is expected to be 'main.py standin' with the same --machines
+            fleet = [(machine_key_for(n), instance_id_for(n)) for n in range(machines)]
+        else:
+            catcher = stack.enter_context(StandinCatcher(latency=latency))
+            fleet = populate(catcher, machines, rows)
+            url = stack.enter_context(stubbed_server(catcher.url, machines, extra_args=['--workers', str(workers)]))
+        for count in sessions:
+            samples, elapsed = asyncio.run(run_step(url, count, duration, mix, fleet))
+            for tool, stats in summarize(samples, elapsed).items():
+                params = {'sessions': count, 'machines': machines, 'rows': rows, 'latency': latency, 'mix': mix,
+                          'workers': workers}
+                entry = record(SUITE, tool, params, {**stats, 'duration_s': elapsed})
+                results.append(entry)
+                if progress is not None:
+                    progress(entry)
+    return results
+
+
+def manual() -> None:
+    parser = argparse.ArgumentParser(description="Load test the MCP server over SSE")
+    parser.add_argument("--sessions", type=int, nargs="*", default=[1, 4, 16], help="Concurrent sessions per step")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per step")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()), help="Tool weights as tool=weight,...")
+    parser.add_argument("--machines", type=int, default=20, help="Machines in the synthetic fleet")
+    parser.add_argument("--rows", type=int, default=10_000, help="Samples per machine")
+    parser.add_argument("--latency", type=float, default=0.0, help="Catcher response latency in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes of the stubbed server")
+    parser.add_argument("--url", default="", help="SSE url of a running server backed by 'main.py standin', instead of starting a stubbed one")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="File to append JSON lines results to")
+    args = parser.parse_args()
+
+    print(f"{'sessions':>8} {'tool':<30} {'calls':>6} {'errors':>6} {'calls/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+
+    def progress(entry):
+        print(f"{entry['params']['sessions']:>8} {entry['name']:<30} {entry['calls']:>6} {entry['errors']:>6} "
+              f"{entry['calls_per_s']:>8.1f} {entry['p50_s'] * 1000:>8.1f} {entry['p95_s'] * 1000:>8.1f} {entry['p99_s'] * 1000:>8.1f}")
+
+    results = run(args.sessions, args.duration, parse_mix(args.mix), args.machines, args.rows,
+                  args.latency, args.url, progress, args.workers)
+    write_results(results, args.output)
+    print(f"Wrote {len(results)} results to {args.output}")
@@ -0,0 +1,132 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..bitflux_catcher_api.standin import StandinCatcher
+from .runner import record
+from .startup import ROOT
+from .synthetic import synthetic_payload, synthetic_ring_buffer
+
+SUITE = 'memory'
+DEFAULT_ROWS = [1_000_000, 10_000_000]
+# 'stream' is download_bitflux_data, 'preload' reads the whole body and parses it in memory as it used to,
+# 'summary' loads the scaled frame and summarizes it, 'chunked' summarizes chunk by chunk
+MODES = ['preload', 'stream', 'summary', 'chunked']
+MACHINE_KEY = 'bench-machine'
+WARMUP_KEY = 'bench-warmup'
+
+
+def _preload(url: str, machine_key: str) -> Any:
+    import io
+
+    import polars as pl
+
+    from ..bitflux_catcher_api import ApiClient, Configuration, DefaultApi, DownloadStatsRequest, downloadstats_pb2
+
+    with ApiClient(Configuration(host=url)) as api_client:
+        response = DefaultApi(api_client).download_stats(download_stats_request=DownloadStatsRequest(machine_key=machine_key))
+    statspb = downloadstats_pb2.Stats()
+    statspb.ParseFromString(response)
+    return pl.read_parquet(io.BytesIO(statspb.bitflux))
+
+
+def _stream(url: str, machine_key: str) -> Any:
+    from ..downloadstats.tool import download_bitflux_data
+
+    return download_bitflux_data(machine_key, url)[1]
+
+
+def _summary(url: str, machine_key: str) -> Any:
+    from ..downloadstats.tool import load_bitflux_data, summarize_bitflux_data
+
+    stats, df = load_bitflux_data(machine_key, url)
+    return summarize_bitflux_data(stats, df)
+
+
+def _chunked(url: str, machine_key: str) -> Any:
+    from ..downloadstats.chunked import summarize_stats_by_machine_key
+
+    return summarize_stats_by_machine_key(machine_key, url)
+
+
+OPERATIONS = {'preload': 'download_bitflux_data', 'stream': 'download_bitflux_data',
+              'summary': 'summarize_bitflux_data', 'chunked': 'summarize_chunked'}
+FETCH = {'preload': _preload, 'stream': _stream, 'summary': _summary, 'chunked': _chunked}
+
+
+def _rss(field: str) -> int:
+    """VmRSS or VmHWM of this process in bytes. ru_maxrss is no use here, it survives exec."""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError(f"{field} not in /proc/self/status")
+
+
+def child(url: str, mode: str) -> Dict[str, Any]:
+    """
+    Download MACHINE_KEY in this process and report how much its peak RSS grew.
+
+    frame_bytes is the size of the decoded frame, 0 for the summary modes
+    which do not return one.
+
+    A small download first loads the libraries and warms their allocators,
+    so the growth is the download itself and the decoded frame. Linux only.
+    """
+    import time
+
+    fetch = FETCH[mode]
+    fetch(url, WARMUP_KEY)
+    # Reset the high water mark to the current RSS
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+    baseline = _rss('VmRSS')
+    start = time.perf_counter()
+    result = fetch(url, MACHINE_KEY)
+    seconds = time.perf_counter() - start
+    frame_bytes = result.estimated_size() if hasattr(result, 'estimated_size') else 0
+    return {'seconds': seconds, 'peak_growth_bytes': _rss('VmHWM') - baseline, 'frame_bytes': frame_bytes}
+
+
+def run(rows: Sequence[int] = DEFAULT_ROWS, repeat: int = 1,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Measure peak memory of downloading and decoding a large stats payload.
+
+    Each download runs in a fresh interpreter, the stand-in catcher stays
+    in this one so its copy of the payload is not counted.
+
+    Returns:
+        One record per rows and mode with the payload size, the decoded
+        frame size and the peak RSS growth beyond the frame in payloads
+    """
+    results = []
+    with StandinCatcher() as catcher, tempfile.TemporaryDirectory() as cache:
+        catcher.add_stats(WARMUP_KEY, synthetic_payload(*synthetic_ring_buffer(10_000, 60)))
+        env = {**os.environ, 'BITFLUX_CACHE_DIR': cache}
+        for n in rows:
+            payload = synthetic_payload(*synthetic_ring_buffer(n, 60))
+            catcher.add_stats(MACHINE_KEY, payload)
+            for mode in MODES:
+                samples = []
+                for _ in range(max(1, repeat)):
+                    code = f'import json\nfrom server.bench.memory import child\nprint(json.dumps(child({catcher.url!r}, {mode!r})))\n'
+                    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                                         capture_output=True, text=True, check=True).stdout
+                    samples.append(json.loads(out.strip().splitlines()[-1]))
+                best = min(samples, key=lambda s: s['peak_growth_bytes'])
+                entry = record(SUITE, OPERATIONS[mode], {'rows': n, 'mode': mode}, {
+                    'min_s': min(s['seconds'] for s in samples),
+                    'repeat': len(samples),
+                    'payload_bytes': len(payload),
+                    'frame_bytes': best['frame_bytes'],
+                    'peak_rss_growth_bytes': best['peak_growth_bytes'],
+                    'payloads_beyond_frame': (best['peak_growth_bytes'] - best['frame_bytes']) / len(payload),
+                })
+                results.append(entry)
+                if progress is not None:
+                    progress(entry)
+    return results
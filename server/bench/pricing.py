@@ -0,0 +1,75 @@
+import os
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..ec2_tools.ec2_pricing import _get_location_for_region, get_ec2_prices_full, get_page_iterator, get_prices_per_page
+from ..ec2_tools.pricing_fixtures import load_fixture, replay_pricing
+from .runner import measure, record
+from .synthetic import synthetic_price_fixture
+
+SUITE = 'pricing'
+DEFAULT_QUERIES = ['m5.large', 'm5.*', '*']
+
+
+def peak_memory(fn: Callable[[], Any]) -> int:
+    """Peak bytes allocated by Python while fn runs, measured in a separate untimed call."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(fixtures: Sequence[str] = (), queries: Sequence[str] = DEFAULT_QUERIES, repeat: int = 3,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Time price list ingestion against recorded or synthetic Pricing API pages.
+
+    For each fixture and query, get_ec2_prices_full is timed end to end with
+    the pricing client replaced by a replay stub, and get_prices_per_page is
+    timed on the already fetched pages to isolate the flattening.
+
+    Args:
+        fixtures: Fixture files from ec2_pricing --record, a synthetic '*' price
+                  list is used when empty
+        queries: Instance types or wildcard patterns to query
+        repeat: Timed calls per benchmark, the fastest is reported as min_s
+        progress: Called with each record as soon as it is measured
+
+    Returns:
+        One record per benchmark with rows, rows_per_s and peak_bytes
+    """
+    loaded = [(os.path.basename(path), load_fixture(path)) for path in fixtures]
+    if not loaded:
+        loaded = [('synthetic', synthetic_price_fixture())]
+
+    results = []
+
+    def add(name: str, params: Dict[str, Any], fn: Callable[[], List[Any]]) -> None:
+        rows = len(fn())
+        timing = measure(fn, repeat)
+        timing['rows'] = rows
+        timing['rows_per_s'] = rows / timing['min_s'] if timing['min_s'] else 0.0
+        timing['peak_bytes'] = peak_memory(fn)
+        entry = record(SUITE, name, params, timing)
+        results.append(entry)
+        if progress is not None:
+            progress(entry)
+
+    for fixture_name, fixture in loaded:
+        region = fixture['region']
+        with replay_pricing([fixture]):
+            for query in queries:
+                params = {'fixture': fixture_name, 'query': query}
+                try:
+                    get_ec2_prices_full(region, query)
+                except LookupError:
+                    # The fixture was recorded for a narrower query
+                    continue
+                add('get_ec2_prices_full', params, lambda: get_ec2_prices_full(region, query))
+                location = _get_location_for_region(region)
+                pages = list(get_page_iterator(region, query, location))
+                add('get_prices_per_page', params,
+                    lambda: [row for page in pages for row in get_prices_per_page(page)])
+    return results
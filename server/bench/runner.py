@@ -0,0 +1,94 @@
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Default file the benchmark records are appended to
+DEFAULT_OUTPUT = 'bench_output.txt'
+# A benchmark counts as a regression when it is this much slower than the baseline
+REGRESSION_THRESHOLD = 0.2
+
+
+def measure(fn: Callable[[], Any], repeat: int = 3) -> Dict[str, float]:
+    """
+    Call fn repeat times and return the wall clock timings in seconds.
+
+    The min is the most stable figure for comparing runs; median and max
+    show how noisy the measurement was.
+    """
+    timings = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'max_s': max(timings),
+        'repeat': len(timings),
+    }
+
+
+def record(suite: str, name: str, params: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """Build one benchmark record with enough context to compare it across machines."""
+    return {
+        'suite': suite,
+        'name': name,
+        'params': params,
+        **result,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def key(entry: Dict[str, Any]) -> str:
+    """Identity of a benchmark, independent of when and how fast it ran."""
+    return json.dumps([entry['suite'], entry['name'], entry['params']], sort_keys=True)
+
+
+def write_results(results: Iterable[Dict[str, Any]], path: str) -> None:
+    """Append results to path as JSON lines."""
+    with open(path, 'a') as f:
+        for entry in results:
+            f.write(json.dumps(entry, sort_keys=True) + '\n')
+
+
+def read_results(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            threshold: float = REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compare results against a baseline run.
+
+    When the baseline holds several runs of the same benchmark the most recent
+    one is used. Benchmarks missing from the baseline are skipped.
+
+    Returns:
+        One entry per benchmark whose min_s grew by more than threshold, with
+        the baseline and current timings and the relative change
+    """
+    previous: Dict[str, Dict[str, Any]] = {}
+    for entry in baseline:
+        previous[key(entry)] = entry
+    regressions = []
+    for entry in results:
+        old: Optional[Dict[str, Any]] = previous.get(key(entry))
+        if old is None or not old.get('min_s'):
+            continue
+        change = entry['min_s'] / old['min_s'] - 1
+        if change > threshold:
+            regressions.append({
+                'suite': entry['suite'],
+                'name': entry['name'],
+                'params': entry['params'],
+                'baseline_s': old['min_s'],
+                'current_s': entry['min_s'],
+                'change': change,
+            })
+    return regressions
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+from .runner import record
+
+SUITE = 'startup'
+# Modules that must only load on first tool use, not when the server starts
+HEAVY_MODULES = ['polars', 'boto3', 'botocore', 'google.protobuf', 'api_client', 'urllib3']
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def imported_modules(module: str = 'server.cli', preload: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Import module in a fresh interpreter.
+
+    Returns:
+        'seconds' spent importing module after the preload modules, and
+        'loaded', the HEAVY_MODULES that importing it pulled in
+    """
+    code = (
+        'import json, sys, time\n'
+        + ''.join(f'import {name}\n' for name in preload)
+        + 'start = time.perf_counter()\n'
+        + f'import {module}\n'
+        + 'seconds = time.perf_counter() - start\n'
+        + f'print(json.dumps({{"seconds": seconds, "loaded": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n'
+    )
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+async def time_to_ready(args: Sequence[str] = ()) -> Dict[str, float]:
+    """
+    Spawn 'main.py' over stdio and time it until it answers.
+
+    Returns:
+        Seconds from spawning the process to a completed initialize and to the
+        first list_tools response
+    """
+    with tempfile.TemporaryDirectory() as cache:
+        params = StdioServerParameters(command=sys.executable, args=[os.path.join(ROOT, 'main.py'), *args],
+                                       cwd=ROOT, env={**os.environ, 'BITFLUX_CACHE_DIR': cache})
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as errlog:
+            async with stdio_client(params, errlog=errlog) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    initialized = time.perf_counter() - start
+                    await session.list_tools()
+                    listed = time.perf_counter() - start
+    return {'initialize_s': initialized, 'list_tools_s': listed}
+
+
+def run(repeat: int = 3, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Measure how quickly the MCP server becomes usable.
+
+    'import_server' times 'import server.cli' in a fresh interpreter with and
+    without the MCP SDK already loaded, which separates this package's import
+    cost from the SDK's. 'cold_start_to_ready' spawns the stdio server and
+    times it until initialize and list_tools complete.
+
+    Returns:
+        One record per benchmark with min_s/median_s/max_s
+    """
+    results = []
+
+    def add(name: str, params: Dict[str, Any], result: Dict[str, Any]) -> None:
+        entry = record(SUITE, name, params, result)
+        results.append(entry)
+        if progress is not None:
+            progress(entry)
+
+    for preload in ([], ['mcp.server.fastmcp']):
+        samples = [imported_modules(preload=preload) for _ in range(max(1, repeat))]
+        add('import_server', {'preload': preload},
+            {**_timings([s['seconds'] for s in samples]), 'heavy_modules': samples[-1]['loaded']})
+
+    ready = [asyncio.run(time_to_ready()) for _ in range(max(1, repeat))]
+    add('cold_start_to_ready', {'transport': 'stdio'},
+        {**_timings([r['list_tools_s'] for r in ready]),
+         'initialize_min_s': min(r['initialize_s'] for r in ready)})
+    return results
+
+
+def _timings(timings: List[float]) -> Dict[str, float]:
+    """Same summary as runner.measure, for timings taken in other processes."""
+    return {
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'max_s': max(timings),
+        'repeat': len(timings),
+    }
@@ -0,0 +1,32 @@
+"""
+Run the MCP server with AWS replaced by in-memory stubs.
+
+The ec2 stub lists the same synthetic fleet as 'main.py standin', so
+pointing --bitflux_url at a stand-in catcher with the same --machines gives
+a server whose tools all work offline. Every other argument is passed on to
+the server, e.g.:
+
+    python -m server.bench.stubbed_server --machines 50 --sse --port 8888 --bitflux_url http://127.0.0.1:8889
+"""
+import argparse
+import sys
+
+from .aws import install_aws_stubs
+from .catcher import DEFAULT_ACCOUNT_ID, instance_id_for
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--machines", type=int, default=10, help="Number of instances in the stubbed fleet")
+    parser.add_argument("--account_id", default=DEFAULT_ACCOUNT_ID, help="Account returned by the stubbed STS")
+    args, rest = parser.parse_known_args()
+
+    install_aws_stubs([instance_id_for(n) for n in range(args.machines)], args.account_id)
+
+    from ..cli import main as server_main
+    sys.argv = [sys.argv[0]] + rest
+    server_main()
+
+
+if __name__ == '__main__':
+    main()
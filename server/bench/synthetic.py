@@ -0,0 +1,221 @@
+import io
+import json
+from typing import Any, Dict, Tuple
+
+import polars as pl
+from google.protobuf import json_format
+
+from ..bitflux_catcher_api import downloadstats_pb2
+from ..ec2_tools.pricing_fixtures import FIXTURE_VERSION
+
+# Memory columns are stored in units of unitsize, idle_cpu in percent
+MEMORY_COLUMNS = ['free', 'cached', 'swap_used', 'swap_cached', 'reclaimable']
+UNITSIZE = 4096
+MEM_TOTAL = 16 * 1024**3
+SWAP_TOTAL = 4 * 1024**3
+TIMESTAMP = '2025-05-10T12:00:00Z'
+
+
+def synthetic_ring_buffer(rows: int, sample_rate: int = 1, wrapped: bool = False,
+                          seed: int = 0) -> Tuple[Dict[str, Any], pl.DataFrame]:
+    """
+    Build a raw bitflux ring buffer with a daily usage cycle and noise.
+
+    The first tenth of the samples ramps reclaimable memory up so strip_warmup
+    has a warmup period to find. When wrapped is True the oldest sample sits
+    a third of the way into the buffer, so scale_bitflux_data has to stitch
+    the tail and head back together.
+
+    Args:
+        rows: Number of samples in the buffer
+        sample_rate: Seconds between samples
+        wrapped: Whether the ring buffer has wrapped around
+        seed: Seed for the noise
+
+    Returns:
+        The stats metadata, shaped like the downloadstats response after
+        MessageToDict, and the raw DataFrame in buffer order
+    """
+    pages = MEM_TOTAL // UNITSIZE
+    t = pl.int_range(0, rows, dtype=pl.Int64)
+    # Position in the day in [0, 1), then a triangle wave peaking at midday
+    day = ((t * sample_rate) % 86400) / 86400
+    cycle = 1 - (2 * day - 1).abs()
+    noise = (t.hash(seed) % 1000) / 1000
+    warmup = pl.min_horizontal((t * 10 / max(rows, 1)), pl.lit(1.0))
+
+    time_ordered = pl.select(
+        free=(pages * (0.3 - 0.2 * cycle + 0.05 * noise)),
+        cached=(pages * (0.2 + 0.05 * noise)),
+        swap_used=(SWAP_TOTAL // UNITSIZE * 0.1 * cycle),
+        swap_cached=(SWAP_TOTAL // UNITSIZE * 0.01 * noise),
+        reclaimable=(pages * 0.15 * warmup * (1 + 0.1 * noise)),
+        idle_cpu=(100 * (0.9 - 0.6 * cycle * noise)),
+    ).with_columns(
+        pl.col(MEMORY_COLUMNS).cast(pl.UInt32),
+        pl.col('idle_cpu').cast(pl.Float32),
+    )
+
+    tail = rows // 3 if wrapped and rows > 1 else 0
+    head = (tail - 1) % rows if rows else 0
+    # Rotate so the oldest sample lands at index tail
+    df = pl.concat([time_ordered.slice(rows - tail, tail), time_ordered.slice(0, rows - tail)])
+
+    stats = {
+        'timestamp': TIMESTAMP,
+        'sampleRate': str(sample_rate),
+        'unitsize': UNITSIZE,
+        'head': head,
+        'tail': tail,
+        'length': rows,
+        'system': {
+            'memTotal': str(MEM_TOTAL),
+            'swapTotal': str(SWAP_TOTAL),
+            'numCpus': '4',
+        },
+    }
+    return stats, df
+
+
+def synthetic_payload(stats: Dict[str, Any], df: pl.DataFrame, compression: str = 'zstd') -> bytes:
+    """Serialize stats and df into a downloadstats_pb2.Stats response body, compressing the parquet with compression."""
+    statspb = downloadstats_pb2.Stats()
+    json_format.ParseDict(stats, statspb)
+    buffer = io.BytesIO()
+    df.write_parquet(buffer, compression=compression)
+    statspb.bitflux = buffer.getvalue()
+    return statspb.SerializeToString()
+
+
+
+# Instance families and sizes used for synthetic price lists, with memory GiB per vCPU
+PRICE_FAMILIES = {
+    't3': 2, 't3a': 2, 't4g': 2, 'm5': 4, 'm5a': 4, 'm6i': 4, 'm6g': 4, 'm7i': 4, 'm7g': 4,
+    'c5': 2, 'c5a': 2, 'c6i': 2, 'c6g': 2, 'c7i': 2, 'c7g': 2,
+    'r5': 8, 'r5a': 8, 'r6i': 8, 'r6g': 8, 'r7i': 8, 'r7g': 8, 'x2idn': 16,
+}
+PRICE_SIZES = {
+    'medium': 1, 'large': 2, 'xlarge': 4, '2xlarge': 8, '4xlarge': 16, '8xlarge': 32,
+    '12xlarge': 48, '16xlarge': 64, '24xlarge': 96, 'metal': 96,
+}
+# Reserved offerings as (LeaseContractLength, OfferingClass, PurchaseOption)
+RESERVED_OPTIONS = [
+    (lease, offering, purchase)
+    for lease in ('1yr', '3yr')
+    for offering in ('standard', 'convertible')
+    for purchase in ('No Upfront', 'Partial Upfront', 'All Upfront')
+]
+
+
+def _price_item(instance_type: str, vcpu: int, memory: int, region: str, location: str, n: int) -> str:
+    sku = f'SKU{n:012d}'
+    hourly = 0.0125 * vcpu + 0.005 * memory
+
+    def dimension(code: str, unit: str, price: float, description: str) -> Dict[str, Any]:
+        return {
+            'unit': unit,
+            'endRange': 'Inf',
+            'description': description,
+            'appliesTo': [],
+            'rateCode': f'{sku}.{code}',
+            'beginRange': '0',
+            'pricePerUnit': {'USD': f'{price:.10f}'},
+        }
+
+    on_demand = {
+        f'{sku}.JRTCKXETXF': {
+            'priceDimensions': {
+                f'{sku}.JRTCKXETXF.6YS6EN2CT7': dimension('JRTCKXETXF.6YS6EN2CT7', 'Hrs', hourly,
+                                                          f'${hourly:.4f} per On Demand Linux {instance_type} Instance Hour'),
+            },
+            'sku': sku,
+            'effectiveDate': '2025-05-01T00:00:00Z',
+            'offerTermCode': 'JRTCKXETXF',
+            'termAttributes': {},
+        },
+    }
+    reserved = {}
+    for i, (lease, offering, purchase) in enumerate(RESERVED_OPTIONS):
+        code = f'RSV{i:07d}'
+        years = int(lease[0])
+        discount = (0.6 if offering == 'standard' else 0.7) - 0.05 * years
+        dimensions = {}
+        if purchase != 'No Upfront':
+            upfront = hourly * discount * 8760 * years * (1 if purchase == 'All Upfront' else 0.5)
+            dimensions[f'{sku}.{code}.2TG2D8R56U'] = dimension(f'{code}.2TG2D8R56U', 'Quantity', upfront, 'Upfront Fee')
+        rate = 0 if purchase == 'All Upfront' else hourly * discount * (1 if purchase == 'No Upfront' else 0.5)
+        dimensions[f'{sku}.{code}.6YS6EN2CT7'] = dimension(f'{code}.6YS6EN2CT7', 'Hrs', rate,
+                                                           f'Linux/UNIX (Amazon VPC), {instance_type} reserved instance applied')
+        reserved[f'{sku}.{code}'] = {
+            'priceDimensions': dimensions,
+            'sku': sku,
+            'effectiveDate': '2025-05-01T00:00:00Z',
+            'offerTermCode': code,
+            'termAttributes': {
+                'LeaseContractLength': lease,
+                'OfferingClass': offering,
+                'PurchaseOption': purchase,
+            },
+        }
+    return json.dumps({
+        'product': {
+            'productFamily': 'Compute Instance',
+            'attributes': {
+                'instanceType': instance_type,
+                'instanceFamily': 'General purpose',
+                'vcpu': str(vcpu),
+                'memory': f'{memory} GiB',
+                'location': location,
+                'regionCode': region,
+                'locationType': 'AWS Region',
+                'operatingSystem': 'Linux',
+                'preInstalledSw': 'NA',
+                'tenancy': 'Shared',
+                'capacitystatus': 'Used',
+                'servicecode': 'AmazonEC2',
+                'usagetype': f'BoxUsage:{instance_type}',
+                'operation': 'RunInstances',
+            },
+            'sku': sku,
+        },
+        'serviceCode': 'AmazonEC2',
+        'terms': {'OnDemand': on_demand, 'Reserved': reserved},
+        'version': '20250501000000',
+        'publicationDate': '2025-05-01T00:00:00Z',
+    })
+
+
+def synthetic_price_fixture(region: str = 'us-east-1', location: str = 'US East (N. Virginia)',
+                            page_size: int = 100) -> Dict[str, Any]:
+    """
+    Build a pricing fixture shaped like a recording of a '*' query.
+
+    Each instance type has one On Demand term and twelve Reserved terms, like
+    the real Price List API, so flattening produces a comparable row count.
+    """
+    items = [
+        _price_item(f'{family}.{size}', vcpu, vcpu * gib_per_vcpu, region, location, n)
+        for n, (family, gib_per_vcpu, size, vcpu) in enumerate(
+            (family, gib_per_vcpu, size, vcpu)
+            for family, gib_per_vcpu in PRICE_FAMILIES.items()
+            for size, vcpu in PRICE_SIZES.items()
+        )
+    ]
+    filters = {
+        'location': location,
+        'operatingSystem': 'Linux',
+        'preInstalledSw': 'NA',
+        'tenancy': 'Shared',
+        'capacitystatus': 'Used',
+    }
+    return {
+        'version': FIXTURE_VERSION,
+        'region': region,
+        'instance_type': '*',
+        'calls': [
+            {'filters': {'regionCode': region}, 'pages': [{'PriceList': items[:1]}]},
+            {'filters': filters, 'pages': [
+                {'PriceList': items[i:i + page_size]} for i in range(0, len(items), page_size)
+            ]},
+        ],
+    }
@@ -0,0 +1,136 @@
+import time
+
+import pytest
+
+from ..bitflux_catcher_api.standin import StandinCatcher
+from ..cache import reset_store
+from ..downloadstats.tool import download_stats_by_machine_key, scale_bitflux_data
+from ..machine_lookup.tool import request_machines
+from ..machine_lookup.instance_index import sha256_hex
+from . import catcher, downloadstats, load, memory, pricing, startup, transfer
+from .runner import compare, record
+from .synthetic import synthetic_payload, synthetic_ring_buffer
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    # Downloads keep their last payload in the cache directory
+    monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+    reset_store()
+    yield
+    reset_store()
+
+
+class TestSyntheticRingBuffer:
+
+    def test_wrapped_and_unwrapped_linearize_the_same(self):
+        """scale_bitflux_data recovers the same time ordered series from both layouts"""
+        stats, raw = synthetic_ring_buffer(300, 60)
+        wrapped_stats, wrapped_raw = synthetic_ring_buffer(300, 60, wrapped=True)
+        assert wrapped_stats['tail'] > wrapped_stats['head']
+        assert not raw.equals(wrapped_raw)
+        assert scale_bitflux_data(stats, raw).equals(scale_bitflux_data(wrapped_stats, wrapped_raw))
+
+
+class TestRunner:
+
+    def test_downloadstats_suite(self):
+        results = downloadstats.run(rows=[200], sample_rates=[1], repeat=1)
+        assert len(results) == 12
+        assert {r['name'] for r in results} >= {'strip_warmup', 'download_stats_by_machine_key'}
+        assert all(r['min_s'] > 0 for r in results)
+
+    def test_pricing_suite(self):
+        results = pricing.run(queries=['m5.large'], repeat=1)
+        assert [r['name'] for r in results] == ['get_ec2_prices_full', 'get_prices_per_page']
+        # One On Demand row plus twelve Reserved offerings, eight of them with an upfront fee
+        assert [r['rows'] for r in results] == [21, 21]
+        assert all(r['peak_bytes'] > 0 for r in results)
+
+    def test_transfer_suite(self):
+        results = transfer.run(rows=[2000], links=['home'], repeat=1)
+        identity = [r for r in results if r['params']['encoding'] == 'identity']
+        assert len(identity) == 2
+        assert all(r['wire_bytes'] == r['payload_bytes'] for r in identity)
+        gzip = [r for r in results if r['params']['encoding'] == 'gzip' and r['params']['parquet'] == 'uncompressed']
+        assert gzip[0]['wire_bytes'] < gzip[0]['payload_bytes']
+
+    def test_memory_suite(self):
+        results = memory.run(rows=[50_000])
+        assert [r['params']['mode'] for r in results] == memory.MODES
+        assert all(r['peak_rss_growth_bytes'] > 0 for r in results)
+        assert [r['frame_bytes'] > 0 for r in results] == [True, True, False, False]
+
+    def test_compare_flags_regressions(self):
+        params = {'rows': 10}
+        baseline = [record('s', 'fast', params, {'min_s': 1.0}), record('s', 'slow', params, {'min_s': 1.0})]
+        results = [record('s', 'fast', params, {'min_s': 1.1}), record('s', 'slow', params, {'min_s': 2.0})]
+        regressions = compare(results, baseline, threshold=0.2)
+        assert [r['name'] for r in regressions] == ['slow']
+        assert regressions[0]['change'] == 1.0
+
+
+class TestStandinCatcher:
+
+    def test_synthetic_fleet(self):
+        with StandinCatcher() as standin:
+            fleet = catcher.populate(standin, machines=3, rows=500)
+            machines = request_machines(standin.url, account_hash=sha256_hex(catcher.DEFAULT_ACCOUNT_ID))
+            assert sorted(m['machineKey'] for m in machines) == sorted(key for key, _ in fleet)
+            stats = download_stats_by_machine_key(fleet[1][0], standin.url)
+        assert stats['sample_rate'] == '60'
+        assert len(stats['data']['used']) == 60
+
+    def test_error_injection(self):
+        with StandinCatcher(error_rate=1.0) as standin:
+            catcher.populate(standin, machines=1, rows=100)
+            with pytest.raises(Exception):
+                download_stats_by_machine_key(catcher.machine_key_for(0), standin.url)
+        assert standin.errors['/downloadstats'] >= 1
+
+    def test_bandwidth_limit(self):
+        payload = synthetic_payload(*synthetic_ring_buffer(5000))
+        with StandinCatcher(bandwidth=len(payload) * 4) as standin:
+            standin.add_stats('k', payload)
+            start = time.perf_counter()
+            download_stats_by_machine_key('k', standin.url)
+            assert time.perf_counter() - start >= 0.25
+
+
+class TestLoad:
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        assert [load.percentile(values, q) for q in (50, 95, 99)] == [50.0, 95.0, 99.0]
+        assert load.percentile([], 50) == 0.0
+
+    def test_parse_mix(self):
+        assert load.parse_mix('get_ec2_pricing=3,list_machines_by_region') == {
+            'get_ec2_pricing': 3, 'list_machines_by_region': 1}
+        with pytest.raises(ValueError):
+            load.parse_mix('nope=1')
+
+    def test_against_stubbed_server(self):
+        results = load.run(sessions=[2], duration=1.0, machines=3, rows=500)
+        summary = {r['name']: r for r in results}
+        assert summary['all']['calls'] > 0
+        assert summary['all']['errors'] == 0
+        assert set(summary) <= {'all', *load.DEFAULT_MIX}
+
+
+class TestStartup:
+    # Generous enough for a slow CI machine, the import takes ~20 ms locally
+    IMPORT_BUDGET_S = 0.3
+
+    def test_heavy_modules_load_lazily(self):
+        assert startup.imported_modules()['loaded'] == []
+
+    def test_import_time_budget(self):
+        # The MCP SDK is preloaded so only this package's import time is measured
+        seconds = min(startup.imported_modules(preload=['mcp.server.fastmcp'])['seconds'] for _ in range(3))
+        assert seconds < self.IMPORT_BUDGET_S
+
+    def test_cold_start_to_ready(self):
+        results = startup.run(repeat=1)
+        assert [r['name'] for r in results] == ['import_server', 'import_server', 'cold_start_to_ready']
+        assert 0 < results[-1]['initialize_min_s'] <= results[-1]['min_s']
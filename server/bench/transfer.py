@@ -0,0 +1,67 @@
+import itertools
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..bitflux_catcher_api import ApiClient, Configuration, DefaultApi, DownloadStatsRequest
+from ..bitflux_catcher_api.standin import StandinCatcher
+from .runner import measure, record
+from .synthetic import synthetic_payload, synthetic_ring_buffer
+
+SUITE = 'transfer'
+DEFAULT_ROWS = [100_000]
+# Simulated links as (bytes per second, seconds of latency per request)
+LINKS = {
+    'home': (50e6 / 8, 0.02),
+    'vpn': (10e6 / 8, 0.05),
+}
+# Accept-Encoding values compared, identity is the uncompressed baseline
+ENCODINGS = ['identity', 'gzip', 'zstd']
+# Parquet codecs inside the payload, compressed parquet leaves HTTP compression little to do
+PARQUET_COMPRESSION = ['zstd', 'uncompressed']
+MACHINE_KEY = 'bench-machine'
+
+
+def download(url: str, machine_key: str, encoding: str) -> bytes:
+    """Fetch a decoded /downloadstats body, asking for encoding."""
+    with ApiClient(Configuration(host=url)) as api_client:
+        return DefaultApi(api_client).download_stats(download_stats_request=DownloadStatsRequest(machine_key=machine_key),
+                                                     _headers={'Accept-Encoding': encoding})
+
+
+def run(rows: Sequence[int] = DEFAULT_ROWS, links: Sequence[str] = tuple(LINKS), repeat: int = 3,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Time /downloadstats over slow links with and without HTTP compression.
+
+    Each combination of rows, link, parquet codec and Accept-Encoding is
+    downloaded from a stand-in catcher limited to the link's bandwidth and
+    latency. zstd is skipped when no zstd module is installed.
+
+    Returns:
+        One record per combination with min_s, the payload size and the
+        bytes sent over the link per download
+    """
+    results = []
+    with StandinCatcher() as catcher:
+        encodings = [e for e in ENCODINGS if e == 'identity' or e in catcher.encodings]
+        for n, compression in itertools.product(rows, PARQUET_COMPRESSION):
+            payload = synthetic_payload(*synthetic_ring_buffer(n, 60), compression=compression)
+            catcher.add_stats(MACHINE_KEY, payload)
+            for link, encoding in itertools.product(links, encodings):
+                catcher.bandwidth, catcher.latency = 0.0, 0.0
+                # Compresses the payload once, like a server keeping the encoded body
+                download(catcher.url, MACHINE_KEY, encoding)
+                catcher.bandwidth, catcher.latency = LINKS[link]
+                sent = catcher.bytes_sent.get('/downloadstats', 0)
+                timing = measure(lambda: download(catcher.url, MACHINE_KEY, encoding), repeat)
+                wire_bytes = (catcher.bytes_sent['/downloadstats'] - sent) // timing['repeat']
+                params = {'rows': n, 'link': link, 'parquet': compression, 'encoding': encoding}
+                entry = record(SUITE, 'download_stats', params, {
+                    **timing,
+                    'payload_bytes': len(payload),
+                    'wire_bytes': wire_bytes,
+                    'ratio': wire_bytes / len(payload),
+                })
+                results.append(entry)
+                if progress is not None:
+                    progress(entry)
+    return results
@@ -3,3 +3,5 @@ from api_client.configuration import Configuration
 from api_client import ApiClient
 from api_client.models.download_stats_request import DownloadStatsRequest
 from api_client.models.machine_lookup_request import MachineLookupRequest
+from api_client.exceptions import ApiException
+from .resilience import CatcherUnavailable, CircuitOpen, call_catcher, catcher_snapshot, get_endpoint, reset_endpoints, response_started
@@ -0,0 +1,364 @@
+import collections
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+import urllib3
+
+from api_client.exceptions import ApiException
+
+from ..metrics import get_metrics
+from ..tracing import current_span
+
+T = TypeVar('T')
+
+# Per endpoint: seconds a call may take including retries, attempts per call,
+# and whether a slow attempt is hedged with a second request. Both endpoints
+# are read-only lookups, so repeating them is safe. With 'idle' the deadline
+# only runs until the response headers arrive; the body then takes as long
+# as it needs, as long as no read waits more than idle seconds for data.
+ENDPOINT_POLICIES: Dict[str, Dict[str, Any]] = {
+    'machinelookup': {'deadline': 10.0, 'attempts': 3, 'hedge': True, 'idle': None},
+    'downloadstats': {'deadline': 60.0, 'attempts': 3, 'hedge': False, 'idle': 30.0},
+    '*': {'deadline': 30.0, 'attempts': 2, 'hedge': False, 'idle': None},
+}
+# Seconds allowed to open a connection, within the call's deadline
+CONNECT_TIMEOUT = 3.0
+# HTTP statuses worth another attempt, 0 is a transport error
+RETRY_STATUSES = {0, 408, 429, 500, 502, 503, 504}
+# Backoff before a retry: uniform in [0, min(RETRY_CAP, RETRY_BASE * 2**attempt)]
+RETRY_BASE = 0.1
+RETRY_CAP = 2.0
+# A hedge is sent once the first attempt is slower than this quantile of
+# recent successful attempts, but only after MIN_HEDGE_SAMPLES of them
+HEDGE_QUANTILE = 0.95
+LATENCY_WINDOW = 200
+MIN_HEDGE_SAMPLES = 20
+MIN_HEDGE_DELAY = 0.01
+# At most this fraction of calls send a hedge, so a slow catcher does not get twice the load
+HEDGE_BUDGET = 0.1
+# Consecutive failed calls that open the circuit, and seconds it stays open
+# before one probe call is let through
+FAILURE_THRESHOLD = 5
+OPEN_SECONDS = 30.0
+# Threads running catcher attempts, hedges included
+MAX_IN_FLIGHT = 32
+
+
+class CatcherUnavailable(Exception):
+    """The catcher kept failing, missed the deadline, or its circuit is open."""
+
+
+class CircuitOpen(CatcherUnavailable):
+    pass
+
+
+class LatencyTracker:
+    """Recent successful attempt latencies of one endpoint."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self._samples: Deque[float] = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """The q quantile of the window, or None with fewer than min_samples samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while an endpoint is down.
+
+    Closed, calls go through. After FAILURE_THRESHOLD consecutive failures
+    it opens and rejects calls for OPEN_SECONDS. Then it is half open: one
+    probe call goes through, success closes the circuit and failure opens
+    it again.
+    """
+
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS) -> None:
+        self.threshold = threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if now - self.opened_at < self.open_seconds:
+            return 'open'
+        return 'half_open'
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. In half open state only the first caller gets True."""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            self._probing = False
+            if success:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+def retry_delay(attempt: int) -> float:
+    """Full jitter exponential backoff before retrying after the given attempt, starting at 1."""
+    return random.uniform(0, min(RETRY_CAP, RETRY_BASE * 2 ** attempt))
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an attempt that raised error may succeed when repeated."""
+    if isinstance(error, ApiException):
+        return (error.status or 0) in RETRY_STATUSES
+    return isinstance(error, (urllib3.exceptions.HTTPError, OSError))
+
+
+def hedged_endpoints() -> Optional[List[str]]:
+    """
+    Endpoints to hedge from BITFLUX_CATCHER_HEDGE, or None for the ENDPOINT_POLICIES defaults.
+
+    Takes a comma separated list of endpoints, 'all' or 'none'.
+    """
+    value = os.environ.get('BITFLUX_CATCHER_HEDGE', '').strip().lower()
+    if not value:
+        return None
+    if value == 'all':
+        return [name for name in ENDPOINT_POLICIES if name != '*']
+    if value == 'none':
+        return []
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+# Set by the attempt a request runs in, see response_started
+_response_started: contextvars.ContextVar[Optional[threading.Event]] = contextvars.ContextVar(
+    'catcher_response_started', default=None)
+
+
+def response_started() -> None:
+    """
+    Mark the current attempt's response headers as received.
+
+    Requests call it before reading the body, so on an endpoint with an
+    'idle' policy the deadline stops at the headers.
+    """
+    event = _response_started.get()
+    if event is not None:
+        event.set()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _submit(fn: Callable[..., T], *args: Any) -> 'Future[T]':
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(MAX_IN_FLIGHT, thread_name_prefix='catcher')
+    # Attempts stay in the caller's trace
+    return _executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+class Endpoint:
+    """
+    Deadline, retries, hedging and circuit breaker for one catcher endpoint at one url.
+
+    Each attempt runs in a worker thread, so the deadline holds even when a
+    response trickles in slower than the socket timeouts notice.
+    """
+
+    def __init__(self, url: str, name: str) -> None:
+        policy = ENDPOINT_POLICIES.get(name, ENDPOINT_POLICIES['*'])
+        hedged = hedged_endpoints()
+        self.url = url
+        self.name = name
+        self.deadline = policy['deadline']
+        self.attempts = policy['attempts']
+        self.hedge = policy['hedge'] if hedged is None else name in hedged
+        self.idle: Optional[float] = policy.get('idle')
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker()
+        self.counts: Dict[str, int] = collections.Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, result: str) -> None:
+        with self._lock:
+            self.counts[result] += 1
+        get_metrics().catcher_request(self.name, result)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for the first attempt before hedging, or None to not hedge."""
+        if not self.hedge:
+            return None
+        with self._lock:
+            if self.counts['hedged'] > HEDGE_BUDGET * (self.counts['ok'] + self.counts['error']):
+                return None
+        delay = self.latency.quantile(HEDGE_QUANTILE, MIN_HEDGE_SAMPLES)
+        return None if delay is None else max(MIN_HEDGE_DELAY, delay)
+
+    def call(self, request: Callable[[Tuple[float, float]], T]) -> T:
+        """
+        Run request(timeout) within the endpoint's deadline.
+
+        request is passed the (connect, read) _request_timeout for one
+        attempt. Transport errors, timeouts and 5xx/429 answers are retried
+        after a jittered backoff, other errors are raised as they are.
+
+        Raises:
+            CircuitOpen: The endpoint failed repeatedly and is not being called
+            CatcherUnavailable: No attempt succeeded within the deadline
+        """
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise CircuitOpen(f"catcher /{self.name} at {self.url} is failing, retrying in at most {self.breaker.open_seconds:.0f}s")
+        deadline = time.monotonic() + self.deadline
+        # Recorded on the caller's span, e.g. catcher.download
+        s = current_span()
+        attempt = 0
+        while True:
+            attempt += 1
+            s.set('attempts', attempt)
+            try:
+                result = self._attempt(request, deadline)
+            except Exception as e:
+                retry = is_retryable(e)
+                delay = retry_delay(attempt)
+                if retry and attempt < self.attempts and time.monotonic() + delay < deadline:
+                    self._count('retried')
+                    time.sleep(delay)
+                    continue
+                # Answers like 404 say nothing about the catcher's health
+                self.breaker.record(success=not retry)
+                self._count('error')
+                if retry:
+                    raise CatcherUnavailable(f"catcher /{self.name} at {self.url} failed after {attempt} attempts: {e}") from e
+                raise
+            self.breaker.record(success=True)
+            self._count('ok')
+            return result
+
+    def _timed(self, request: Callable[[Tuple[float, float]], T], timeout: Tuple[float, float],
+               started: threading.Event) -> T:
+        token = _response_started.set(started)
+        try:
+            start = time.perf_counter()
+            result = request(timeout)
+            self.latency.observe(time.perf_counter() - start)
+            return result
+        finally:
+            _response_started.reset(token)
+
+    def _start(self, request: Callable[[Tuple[float, float]], T], deadline: float,
+               started: Dict['Future[T]', threading.Event]) -> 'Future[T]':
+        remaining = deadline - time.monotonic()
+        # With an idle policy the read timeout bounds each wait for data, the
+        # wait for the headers is bounded by the deadline in _attempt
+        read = remaining if self.idle is None else max(remaining, self.idle)
+        event = threading.Event()
+        future = _submit(self._timed, request, (min(CONNECT_TIMEOUT, remaining), read), event)
+        started[future] = event
+        return future
+
+    def _attempt(self, request: Callable[[Tuple[float, float]], T], deadline: float) -> T:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"deadline of {self.deadline}s exceeded")
+        started: Dict['Future[T]', threading.Event] = {}
+        primary = self._start(request, deadline, started)
+        pending = {primary}
+        delay = self.hedge_delay()
+        if delay is not None and delay < remaining:
+            done, _ = wait(pending, timeout=delay)
+            if not done:
+                self._count('hedged')
+                current_span().set('hedged', True)
+                pending.add(self._start(request, deadline, started))
+        error: Optional[BaseException] = None
+        while pending:
+            # Once a body is streaming only its read timeout can stop it
+            streaming = self.idle is not None and any(started[f].is_set() for f in pending)
+            timeout = None if streaming else max(0.0, deadline - time.monotonic())
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if self.idle is not None and any(started[f].is_set() for f in pending):
+                    continue
+                # The slow attempts finish in the background, bounded by their socket timeouts
+                raise TimeoutError(f"deadline of {self.deadline}s exceeded")
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count('hedge_won')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self.counts)
+        return {
+            'url': self.url,
+            'endpoint': self.name,
+            'circuit': self.breaker.state,
+            'p95_s': self.latency.quantile(0.95),
+            **counts,
+        }
+
+
+_endpoints: Dict[Tuple[str, str], Endpoint] = {}
+_endpoints_lock = threading.Lock()
+
+
+def get_endpoint(url: str, name: str) -> Endpoint:
+    """Return the process-wide Endpoint for /name at url."""
+    key = (url, name)
+    with _endpoints_lock:
+        endpoint = _endpoints.get(key)
+        if endpoint is None:
+            endpoint = Endpoint(url, name)
+            _endpoints[key] = endpoint
+        return endpoint
+
+
+def reset_endpoints() -> None:
+    with _endpoints_lock:
+        _endpoints.clear()
+
+
+def catcher_snapshot() -> List[Dict[str, Any]]:
+    with _endpoints_lock:
+        endpoints = list(_endpoints.values())
+    return [e.snapshot() for e in endpoints]
+
+
+def call_catcher(url: str, name: str, request: Callable[[Tuple[float, float]], T]) -> T:
+    """Call request(timeout) through the Endpoint for /name at url, see Endpoint.call."""
+    return get_endpoint(url, name).call(request)
@@ -0,0 +1,244 @@
+import gzip
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from . import downloadstats_pb2
+
+# Same zstd module urllib3 decodes with, when installed
+try:
+    if sys.version_info >= (3, 14):
+        from compression import zstd
+    else:
+        from backports import zstd
+except ImportError:
+    zstd = None
+
+# Response bodies are written in chunks of this size when bandwidth is limited
+CHUNK_SIZE = 16 * 1024
+# Content codings offered by default, in order of preference
+DEFAULT_ENCODINGS = ('zstd', 'gzip')
+# Smaller bodies are sent as they are
+MIN_COMPRESS_SIZE = 1024
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+class StandinCatcher:
+    """
+    Local stand-in for catcher.bitflux.ai serving /machinelookup and /downloadstats.
+
+    Machines and stats payloads are registered in memory. Requests are counted
+    per path so tests can assert how many round trips a client made.
+
+    Network conditions can be injected, and changed while the server runs:
+        latency: Seconds to wait before answering each request
+        jitter: Up to this many extra seconds, drawn uniformly per request
+        bandwidth: Bytes per second the response body is written at, 0 for unlimited
+        error_rate: Fraction of requests answered with 503 instead
+
+    Response bodies are compressed with the first of encodings the request's
+    Accept-Encoding allows, zstd only when a zstd module is installed. Pass
+    encodings=() to emulate a catcher without compression. Bytes written
+    per path, after compression, are counted in bytes_sent.
+
+    Usage:
+        with StandinCatcher(latency=0.05) as catcher:
+            catcher.add_machine('key', instance_hash, account_hash)
+            machine_lookup('i-...', '', catcher.url)
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 bandwidth: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None,
+                 encodings: Sequence[str] = DEFAULT_ENCODINGS) -> None:
+        self.machines: List[Dict[str, str]] = []
+        self.stats: Dict[str, Union[bytes, Callable[[], bytes]]] = {}
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.bytes_sent: Dict[str, int] = {}
+        self.bodies: List[Dict[str, Any]] = []
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.encodings = [e for e in encodings if e != 'zstd' or zstd is not None]
+        self._encoded: Dict[Tuple[str, str], Tuple[bytes, bytes]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_machine(self, machine_key: str, instance_hash: str, account_hash: str = '', ami_id: str = '') -> None:
+        self.machines.append({
+            'machine_key': machine_key,
+            'instance_id': instance_hash,
+            'account_id': account_hash,
+            'ami_id': ami_id,
+        })
+
+    def add_stats(self, machine_key: str, payload: Union[bytes, Callable[[], bytes]]) -> None:
+        """
+        Register a serialized downloadstats_pb2.Stats message for machine_key.
+
+        payload may also be a function returning the message, which is called
+        on the first download and its result kept, so large fleets can be
+        registered without building every payload up front.
+        """
+        self.stats[machine_key] = payload
+
+    def lookup(self, request: Dict[str, Any]) -> bytes:
+        """Build the MachineLookupList for a /machinelookup request body."""
+        hashes = set(request.get('instance_hashes') or [])
+        if request.get('instance_hash'):
+            hashes.add(request['instance_hash'])
+        account_hash = request.get('account_hash') or ''
+        mlist = downloadstats_pb2.MachineLookupList()
+        for machine in self.machines:
+            if hashes and machine['instance_id'] not in hashes:
+                continue
+            if account_hash and machine['account_id'] != account_hash:
+                continue
+            if not hashes and not account_hash:
+                continue
+            mlist.machines.add(**machine)
+        return mlist.SerializeToString()
+
+    def download(self, request: Dict[str, Any]) -> Optional[bytes]:
+        machine_key = request.get('machineKey', '')
+        with self._lock:
+            payload = self.stats.get(machine_key)
+        if callable(payload):
+            factory, payload = payload, payload()
+            with self._lock:
+                if self.stats.get(machine_key) is factory:
+                    self.stats[machine_key] = payload
+        return payload
+
+    def negotiate(self, accept_encoding: str) -> str:
+        """The content coding to answer a request with, '' for none."""
+        accepted = {}
+        for item in accept_encoding.split(','):
+            name, _, params = item.strip().partition(';')
+            q = params.strip()[2:] if params.strip().startswith('q=') else '1'
+            try:
+                accepted[name.strip().lower()] = float(q) > 0
+            except ValueError:
+                accepted[name.strip().lower()] = False
+        for encoding in self.encodings:
+            if accepted.get(encoding, accepted.get('*', False)):
+                return encoding
+        return ''
+
+    def encode(self, body: bytes, encoding: str, key: str = '') -> bytes:
+        """
+        Compress body with encoding.
+
+        Results are kept per key while the body stays the same, so a stats
+        payload is compressed once like a real server would keep it.
+        """
+        if key:
+            with self._lock:
+                cached = self._encoded.get((key, encoding))
+            if cached is not None and cached[0] is body:
+                return cached[1]
+        if encoding == 'zstd':
+            encoded = zstd.compress(body, level=ZSTD_LEVEL)
+        else:
+            encoded = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        if key:
+            with self._lock:
+                self._encoded[(key, encoding)] = (body, encoded)
+        return encoded
+
+    def _inject(self) -> bool:
+        """Sleep for the configured latency and return True if this request should fail."""
+        with self._lock:
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay)
+        return fail
+
+    def _handler_class(self):
+        catcher = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return self._reply(400, b'invalid json', 'text/plain')
+                with catcher._lock:
+                    catcher.requests[self.path] = catcher.requests.get(self.path, 0) + 1
+                    catcher.bodies.append(request)
+                if catcher._inject():
+                    with catcher._lock:
+                        catcher.errors[self.path] = catcher.errors.get(self.path, 0) + 1
+                    return self._reply(503, b'injected failure', 'text/plain')
+                if self.path == '/machinelookup':
+                    return self._reply(200, catcher.lookup(request))
+                if self.path == '/downloadstats':
+                    payload = catcher.download(request)
+                    if payload is None:
+                        return self._reply(404, b'machine not found', 'text/plain')
+                    return self._reply(200, payload, key=request.get('machineKey', ''))
+                return self._reply(404, b'not found', 'text/plain')
+
+            def _reply(self, status: int, body: bytes, content_type: str = 'application/x-protobuf', key: str = ''):
+                encoding = catcher.negotiate(self.headers.get('Accept-Encoding', '')) if status == 200 else ''
+                if encoding and len(body) >= MIN_COMPRESS_SIZE:
+                    body = catcher.encode(body, encoding, key)
+                else:
+                    encoding = ''
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if encoding:
+                    self.send_header('Content-Encoding', encoding)
+                self.send_header('Vary', 'Accept-Encoding')
+                self.end_headers()
+                with catcher._lock:
+                    catcher.bytes_sent[self.path] = catcher.bytes_sent.get(self.path, 0) + len(body)
+                bandwidth = catcher.bandwidth
+                if not bandwidth:
+                    self.wfile.write(body)
+                    return
+                for start in range(0, len(body), CHUNK_SIZE):
+                    chunk = body[start:start + CHUNK_SIZE]
+                    time.sleep(len(chunk) / bandwidth)
+                    self.wfile.write(chunk)
+
+        return Handler
+
+    def start(self) -> 'StandinCatcher':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> 'StandinCatcher':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
@@ -0,0 +1,213 @@
+import threading
+import time
+
+import pytest
+
+from ..bench import catcher
+from ..bench.synthetic import synthetic_payload, synthetic_ring_buffer
+from ..cache import get_store, reset_store
+from ..downloadstats.tool import download_bitflux_data, download_stats_by_machine_key
+from ..machine_lookup import registry
+from ..machine_lookup.instance_index import sha256_hex
+from ..machine_lookup.tool import machines_by_account_hash, request_machines
+from ..metrics import get_metrics
+from . import ApiException, CatcherUnavailable, CircuitOpen, get_endpoint, reset_endpoints, resilience
+from .standin import StandinCatcher
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+    monkeypatch.delenv('BITFLUX_CATCHER_HEDGE', raising=False)
+    monkeypatch.setattr(resilience, 'RETRY_BASE', 0.01)
+    reset_store()
+    registry.reset_registry()
+    reset_endpoints()
+    get_metrics().reset()
+    yield
+    reset_store()
+    registry.reset_registry()
+    reset_endpoints()
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_probes(self):
+        breaker = resilience.CircuitBreaker(threshold=2, open_seconds=0.05)
+        breaker.record(success=False)
+        assert breaker.allow()
+        breaker.record(success=False)
+        assert breaker.state == 'open' and not breaker.allow()
+        time.sleep(0.06)
+        assert breaker.state == 'half_open'
+        # Only one probe at a time
+        assert breaker.allow() and not breaker.allow()
+        breaker.record(success=False)
+        assert breaker.state == 'open'
+        time.sleep(0.06)
+        assert breaker.allow()
+        breaker.record(success=True)
+        assert breaker.state == 'closed' and breaker.allow()
+
+
+class TestEndpoint:
+
+    def test_retries_transient_errors(self):
+        with StandinCatcher(error_rate=0.5, seed=3) as standin:
+            standin.add_stats('k', b'')
+            for _ in range(10):
+                download_bitflux_data('k', standin.url)
+        counts = get_endpoint(standin.url, 'downloadstats').counts
+        assert counts['ok'] == 10 and counts['retried'] > 0
+        assert standin.requests['/downloadstats'] == 10 + counts['retried']
+
+    def test_client_errors_are_not_retried(self):
+        with StandinCatcher() as standin:
+            with pytest.raises(Exception, match='404'):
+                download_bitflux_data('missing', standin.url)
+        assert standin.requests['/downloadstats'] == 1
+        assert get_endpoint(standin.url, 'downloadstats').breaker.state == 'closed'
+
+    def test_deadline(self, monkeypatch):
+        monkeypatch.setitem(resilience.ENDPOINT_POLICIES, 'machinelookup',
+                            {'deadline': 0.3, 'attempts': 3, 'hedge': False})
+        with StandinCatcher(latency=2.0) as standin:
+            start = time.perf_counter()
+            with pytest.raises(CatcherUnavailable):
+                request_machines(standin.url, account_hash='unknown')
+            assert time.perf_counter() - start < 1.0
+
+    def test_deadline_stops_at_the_response_headers(self, monkeypatch):
+        monkeypatch.setitem(resilience.ENDPOINT_POLICIES, 'downloadstats',
+                            {'deadline': 0.3, 'attempts': 1, 'hedge': False, 'idle': 1.0})
+        endpoint = resilience.Endpoint('http://catcher', 'downloadstats')
+
+        def streaming(timeout):
+            resilience.response_started()
+            time.sleep(0.6)
+            return timeout
+
+        # The body outlasts the deadline, and each read may wait for the idle timeout
+        assert endpoint.call(streaming)[1] >= 1.0
+        with pytest.raises(CatcherUnavailable):
+            endpoint.call(lambda timeout: time.sleep(0.6))
+
+    def test_slow_body_finishes_past_the_deadline(self, monkeypatch):
+        monkeypatch.setitem(resilience.ENDPOINT_POLICIES, 'downloadstats',
+                            {'deadline': 0.5, 'attempts': 1, 'hedge': False, 'idle': 2.0})
+        stats, df = synthetic_ring_buffer(20000, 60)
+        payload = synthetic_payload(stats, df)
+        # About a second to send the body
+        with StandinCatcher(bandwidth=len(payload)) as standin:
+            standin.add_stats('k', payload)
+            start = time.perf_counter()
+            _, frame = download_bitflux_data('k', standin.url)
+            assert time.perf_counter() - start > 0.5
+        assert len(frame) == 20000 and standin.requests['/downloadstats'] == 1
+
+    def test_hedge_answers_before_slow_attempt(self):
+        endpoint = resilience.Endpoint('http://catcher', 'machinelookup')
+        for _ in range(resilience.MIN_HEDGE_SAMPLES):
+            endpoint.call(lambda timeout: time.sleep(0.01))
+        calls = []
+        lock = threading.Lock()
+
+        def request(timeout):
+            with lock:
+                calls.append(timeout)
+                first = len(calls) == 1
+            time.sleep(2.0 if first else 0.01)
+            return 'second' if not first else 'first'
+
+        start = time.perf_counter()
+        assert endpoint.call(request) == 'second'
+        assert time.perf_counter() - start < 0.5
+        assert endpoint.counts['hedged'] == 1 and endpoint.counts['hedge_won'] == 1
+
+    def test_hedges_stay_within_budget(self):
+        endpoint = resilience.Endpoint('http://catcher', 'machinelookup')
+        for _ in range(resilience.MIN_HEDGE_SAMPLES):
+            endpoint.call(lambda timeout: time.sleep(0.005))
+        for _ in range(10):
+            endpoint.call(lambda timeout: time.sleep(0.05))
+        assert endpoint.counts['hedged'] <= resilience.HEDGE_BUDGET * 30 + 1
+
+    def test_circuit_opens_and_serves_cached_stats(self):
+        with StandinCatcher() as standin:
+            fleet = catcher.populate(standin, machines=1, rows=500)
+            machine_key = fleet[0][0]
+            fresh = download_stats_by_machine_key(machine_key, standin.url)
+            assert 'stale_since' not in fresh
+
+            standin.error_rate = 1.0
+            for _ in range(resilience.FAILURE_THRESHOLD):
+                stale = download_stats_by_machine_key(machine_key, standin.url)
+                assert stale['stale_since'] and stale['summary'] == fresh['summary']
+            requests = standin.requests['/downloadstats']
+            assert get_endpoint(standin.url, 'downloadstats').breaker.state == 'open'
+
+            # Open circuit, no request is made
+            stale = download_stats_by_machine_key(machine_key, standin.url)
+            assert stale['stale_since']
+            assert standin.requests['/downloadstats'] == requests
+            with pytest.raises(Exception, match='failing'):
+                download_bitflux_data('never-downloaded', standin.url)
+        catcher_requests = get_metrics().snapshot()['catcher_requests']['downloadstats']
+        assert catcher_requests['fallback'] == resilience.FAILURE_THRESHOLD + 1
+        assert catcher_requests['short_circuited'] == 2
+
+    def test_account_lookup_falls_back_to_registry(self, capsys):
+        account_hash = sha256_hex(catcher.DEFAULT_ACCOUNT_ID)
+        with StandinCatcher() as standin:
+            catcher.populate(standin, machines=2, rows=100)
+            assert len(machines_by_account_hash(account_hash, standin.url)) == 2
+            get_store().delete('account_lookup')
+            standin.error_rate = 1.0
+            assert len(machines_by_account_hash(account_hash, standin.url)) == 2
+        assert get_metrics().snapshot()['catcher_requests']['machinelookup']['fallback'] == 1
+        # stdout is the MCP channel of the stdio transport
+        out, err = capsys.readouterr()
+        assert out == ''
+        assert 'using cached machines' in err
+
+    def test_short_circuit_is_unavailable(self):
+        endpoint = resilience.Endpoint('http://catcher', 'downloadstats')
+        endpoint.breaker.opened_at = time.monotonic()
+
+        def request(timeout):
+            raise ApiException(status=503)
+
+        with pytest.raises(CircuitOpen):
+            endpoint.call(request)
+
+
+@pytest.fixture(scope='module')
+def payload():
+    return synthetic_payload(*synthetic_ring_buffer(5000, 60), compression='uncompressed')
+
+
+class TestCompression:
+
+    def test_negotiate(self):
+        standin = StandinCatcher(encodings=('zstd', 'gzip'))
+        assert standin.negotiate('gzip, deflate') == 'gzip'
+        assert standin.negotiate('gzip;q=0, deflate') == ''
+        assert standin.negotiate('identity') == ''
+        assert standin.negotiate('*') == standin.encodings[0]
+
+    @pytest.mark.parametrize('encoding', ['gzip', 'zstd'])
+    def test_downloads_are_compressed(self, payload, encoding):
+        with StandinCatcher(encodings=(encoding,)) as standin:
+            if encoding not in standin.encodings:
+                pytest.skip(f'no {encoding} module installed')
+            standin.add_stats('k', payload)
+            stats, df = download_bitflux_data('k', standin.url)
+        assert len(df) == 5000
+        assert standin.bytes_sent['/downloadstats'] < 0.9 * len(payload)
+
+    def test_without_compression(self, payload):
+        with StandinCatcher(encodings=()) as standin:
+            standin.add_stats('k', payload)
+            stats, df = download_bitflux_data('k', standin.url)
+        assert len(df) == 5000
+        assert standin.bytes_sent['/downloadstats'] == len(payload)
@@ -0,0 +1 @@
+from .store import KVStore, cache_dir, connect, get_store, reset_store
@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+def cache_dir() -> Path:
+    """
+    Return the directory used for on-disk caches, creating it if needed.
+
+    BITFLUX_CACHE_DIR overrides the location, otherwise it follows
+    XDG_CACHE_HOME (default ~/.cache) under a bitflux_mcp subdirectory.
+    """
+    path = os.environ.get('BITFLUX_CACHE_DIR')
+    if not path:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        path = os.path.join(base, 'bitflux_mcp')
+    p = Path(path)
+    p.mkdir(parents=True, exist_ok=True)
+    return p
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open a SQLite connection configured for sharing between threads and processes."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class KVStore:
+    """
+    Namespaced key/value store kept in a single SQLite file.
+
+    Values are stored as JSON together with the time they were written so
+    callers can apply their own max_age. Each thread gets its own connection
+    and the database runs in WAL mode, so several threads or processes can
+    share one file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS kv ('
+                ' namespace TEXT NOT NULL,'
+                ' key TEXT NOT NULL,'
+                ' value TEXT NOT NULL,'
+                ' updated_at REAL NOT NULL,'
+                ' PRIMARY KEY (namespace, key))'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str, max_age: Optional[float] = None) -> Optional[Any]:
+        """Return the value for key, or None if missing or older than max_age seconds."""
+        row = self._connect().execute(
+            'SELECT value, updated_at FROM kv WHERE namespace = ? AND key = ?',
+            (namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        if max_age is not None and time.time() - row[1] > max_age:
+            return None
+        return json.loads(row[0])
+
+    def get_all(self, namespace: str, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """Return every entry in namespace that is not older than max_age seconds."""
+        query = 'SELECT key, value FROM kv WHERE namespace = ?'
+        params: tuple = (namespace,)
+        if max_age is not None:
+            query += ' AND updated_at >= ?'
+            params = (namespace, time.time() - max_age)
+        rows = self._connect().execute(query, params).fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def put(self, namespace: str, key: str, value: Any) -> None:
+        self.put_many(namespace, {key: value})
+
+    def put_many(self, namespace: str, items: Dict[str, Any]) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)',
+                [(namespace, k, json.dumps(v), now) for k, v in items.items()],
+            )
+
+    def delete(self, namespace: str, keys: Optional[Iterable[str]] = None) -> None:
+        """Delete keys from namespace, or the whole namespace if keys is None."""
+        with self._connect() as conn:
+            if keys is None:
+                conn.execute('DELETE FROM kv WHERE namespace = ?', (namespace,))
+            else:
+                conn.executemany(
+                    'DELETE FROM kv WHERE namespace = ? AND key = ?',
+                    [(namespace, k) for k in keys],
+                )
+
+
+_store: Optional[KVStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> KVStore:
+    """Return the process-wide KVStore located in cache_dir()."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = KVStore(cache_dir() / 'cache.sqlite')
+        return _store
+
+
+def reset_store() -> None:
+    """Forget the process-wide store so the next get_store() reopens it (used by tests)."""
+    global _store
+    with _store_lock:
+        _store = None
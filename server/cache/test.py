@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+from .store import KVStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return KVStore(tmp_path / 'cache.sqlite')
+
+
+class TestKVStore:
+
+    def test_put_get(self, store):
+        store.put('ns', 'a', {'x': 1})
+        assert store.get('ns', 'a') == {'x': 1}
+        assert store.get('ns', 'missing') is None
+        assert store.get('other', 'a') is None
+
+    def test_max_age(self, store):
+        store.put('ns', 'a', 1)
+        assert store.get('ns', 'a', max_age=60) == 1
+        time.sleep(0.02)
+        assert store.get('ns', 'a', max_age=0.01) is None
+        assert store.get_all('ns', max_age=0.01) == {}
+
+    def test_get_all_and_delete(self, store):
+        store.put_many('ns', {'a': 1, 'b': 2})
+        assert store.get_all('ns') == {'a': 1, 'b': 2}
+        store.delete('ns', ['a'])
+        assert store.get_all('ns') == {'b': 2}
+        store.delete('ns')
+        assert store.get_all('ns') == {}
+
+    def test_shared_between_instances(self, tmp_path):
+        KVStore(tmp_path / 'cache.sqlite').put('ns', 'a', 'v')
+        assert KVStore(tmp_path / 'cache.sqlite').get('ns', 'a') == 'v'
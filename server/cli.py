@@ -2,13 +2,27 @@
 # SPDX-License-Identifier: MIT
 
 import argparse
-from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.fastmcp import Context
+from starlette.requests import Request
+from starlette.responses import Response
 from typing import Any, Dict, List, Optional
 from server.tools.get_ec2_pricing import GetEC2PricingTool
 from server.tools.list_ec2_instances import ListEC2InstancesTool
 from server.tools.downloadstats import DownloadStatsByMachineKeyTool, DownloadStatsByInstanceIdTool
+from server.downloadstats.constants import DEFAULT_CANDIDATES, DEFAULT_MAX_POINTS, DEFAULT_QUERY_ROWS
+from server.tools.resample_stats import ResampleStatsTool
+from server.tools.summarize_stats import SummarizeStatsTool
+from server.tools.fleet_percentiles import FleetPercentilesTool
+from server.tools.query_stats import QueryStatsTool
+from server.tools.simulate_instances import SimulateInstancesTool
+from server.tools.simulate_cpu_credits import SimulateCpuCreditsTool
 from server.tools.machine_lookup import MachineLookupByInstanceIdTool, MachineLookupByAccountIdTool, ListMachinesByRegionTool
 from server.tools.recommendation import BitfluxRecommendationTool, BitfluxRecommendationPrompt
+from server.tools.server_metrics import ServerMetricsTool
+from server.tracing import configure_tracing
+from server.profiling import configure_profiling
+from server.prewarm import start_prewarm
+from server.metrics import InstrumentedFastMCP, OPENMETRICS_CONTENT_TYPE, get_metrics
 from server.ec2_tools import AmiIdTool, get_generic_ami_id, get_bitflux_ami_id
 
 def main():
@@ -16,24 +30,75 @@ def main():
     parser = argparse.ArgumentParser(description='MCP server to analyze memory usage of EC2 instances with bitflux and suggest instance sizes')
     parser.add_argument('--full', action='store_true', help='Enable full toolset')
     parser.add_argument('--sse', action='store_true', help='Use SSE transport')
+    parser.add_argument('--http', action='store_true', help='Use streamable HTTP transport')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Address to listen on with --sse or --http')
     parser.add_argument('--port', type=int, default=8888, help='Port to run the server on')
+    parser.add_argument('--workers', type=int, default=1, help='Serve --sse or --http from this many processes behind one listener')
+    parser.add_argument('--worker_index', type=int, default=-1, help=argparse.SUPPRESS)
     parser.add_argument('--bitflux_url', type=str, default="https://catcher.bitflux.ai", help='Bitflux URL')
 
+    parser.add_argument('--trace_file', type=str, default="", help='Append a JSON line per traced span to this file (or set BITFLUX_TRACE_FILE)')
+    parser.add_argument('--otlp_endpoint', type=str, default="", help='Send traces to this OTLP/HTTP collector, e.g. http://localhost:4318 (or set BITFLUX_OTLP_ENDPOINT)')
+
+    parser.add_argument('--profile_dir', type=str, default="", help='Write a cProfile and tracemalloc report per tool call under this directory (or set BITFLUX_PROFILE_DIR)')
+    parser.add_argument('--profile_every', type=int, default=0, help='Only profile every Nth call of each tool (or set BITFLUX_PROFILE_EVERY)')
+
+    parser.add_argument('--prewarm_regions', type=str, nargs='*', default=[], help='Fill the AWS, catcher and pricing caches for these regions in the background at startup (or set BITFLUX_PREWARM_REGIONS)')
+
     args = parser.parse_args()
+    if args.workers > 1:
+        if not (args.sse or args.http):
+            parser.error('--workers needs --sse or --http')
+        from server.serving import serve
+        serve(args.workers, args.host, args.port)
+        return
+
+    configure_tracing(args.trace_file, args.otlp_endpoint)
+    configure_profiling(args.profile_dir, args.profile_every)
 
-    mcp = FastMCP(name="bitflux",)
+    mcp = InstrumentedFastMCP(name="bitflux",)
 
     @mcp.tool(name=GetEC2PricingTool.name, description=GetEC2PricingTool.description)
     async def get_ec2_pricing(region: str, instance_type: str, ctx: Context) -> Dict[str, Any]:
         return await GetEC2PricingTool.execute(region, instance_type, ctx)
 
     @mcp.tool(name=DownloadStatsByMachineKeyTool.name, description=DownloadStatsByMachineKeyTool.description)
-    async def download_stats_by_machine_key(machine_key: str, ctx: Context) -> Dict[str, Any]:
-        return await DownloadStatsByMachineKeyTool.execute(machine_key, args.bitflux_url, ctx)
+    async def download_stats_by_machine_key(machine_key: str, ctx: Context, max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, Any]:
+        return await DownloadStatsByMachineKeyTool.execute(machine_key, max_points, args.bitflux_url, ctx)
 
     @mcp.tool(name=DownloadStatsByInstanceIdTool.name, description=DownloadStatsByInstanceIdTool.description)
-    async def download_stats_by_instance_id(instance_id: str, ctx: Context) -> Dict[str, Any]:
-        return await DownloadStatsByInstanceIdTool.execute(instance_id, args.bitflux_url, ctx)
+    async def download_stats_by_instance_id(instance_id: str, ctx: Context, max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, Any]:
+        return await DownloadStatsByInstanceIdTool.execute(instance_id, max_points, args.bitflux_url, ctx)
+
+    @mcp.tool(name=ResampleStatsTool.name, description=ResampleStatsTool.description)
+    async def resample_stats(machine_key: str, ctx: Context, every: str = '1h', aggs: Optional[List[str]] = None,
+                             history: bool = False) -> Dict[str, Any]:
+        return await ResampleStatsTool.execute(machine_key, every, aggs, history, args.bitflux_url, ctx)
+
+    @mcp.tool(name=SummarizeStatsTool.name, description=SummarizeStatsTool.description)
+    async def summarize_stats(machine_key: str, ctx: Context) -> Dict[str, Any]:
+        return await SummarizeStatsTool.execute(machine_key, args.bitflux_url, ctx)
+
+    @mcp.tool(name=FleetPercentilesTool.name, description=FleetPercentilesTool.description)
+    async def fleet_percentiles(ctx: Context, machine_keys: Optional[List[str]] = None, region: str = '',
+                                percentiles: Optional[List[str]] = None, columns: Optional[List[str]] = None) -> Dict[str, Any]:
+        return await FleetPercentilesTool.execute(machine_keys, region, percentiles, columns, args.bitflux_url, ctx)
+
+    @mcp.tool(name=QueryStatsTool.name, description=QueryStatsTool.description)
+    async def query_stats(query: str, ctx: Context, max_rows: int = DEFAULT_QUERY_ROWS, region: str = '') -> Dict[str, Any]:
+        return await QueryStatsTool.execute(query, max_rows, region, ctx)
+
+    @mcp.tool(name=SimulateInstancesTool.name, description=SimulateInstancesTool.description)
+    async def simulate_instance_sizes(machine_key: str, ctx: Context, region: str = '', instance_types: str = '*',
+                                      history: bool = False, max_candidates: int = DEFAULT_CANDIDATES) -> Dict[str, Any]:
+        return await SimulateInstancesTool.execute(machine_key, region, instance_types, history, max_candidates,
+                                                   args.bitflux_url, ctx)
+
+    @mcp.tool(name=SimulateCpuCreditsTool.name, description=SimulateCpuCreditsTool.description)
+    async def simulate_cpu_credits(machine_key: str, ctx: Context, region: str = '', instance_types: str = 't*',
+                                   history: bool = False, every: str = '1h') -> Dict[str, Any]:
+        return await SimulateCpuCreditsTool.execute(machine_key, region, instance_types, history, every,
+                                                    args.bitflux_url, ctx)
 
     @mcp.tool(name=ListMachinesByRegionTool.name, description=ListMachinesByRegionTool.description)
     async def list_machines_by_region(region: str, ctx: Context) -> Dict[str, Any]:
@@ -72,10 +137,28 @@ def main():
         async def bitflux_instance_recommendation(stats: str, ec2_instance_type_details: str, ctx: Context) -> str:
             return await BitfluxRecommendationPrompt.execute(stats, ec2_instance_type_details, ctx)
 
+    if args.sse or args.http:
+        @mcp.custom_route("/metrics", methods=["GET"])
+        async def metrics(request: Request) -> Response:
+            return Response(get_metrics().render(), media_type=OPENMETRICS_CONTENT_TYPE)
+    else:
+        @mcp.tool(name=ServerMetricsTool.name, description=ServerMetricsTool.description)
+        async def server_metrics(ctx: Context) -> Dict[str, Any]:
+            return await ServerMetricsTool.execute(ctx)
+
+    # Runs in a daemon thread, the server accepts sessions while caches fill
+    start_prewarm(args.prewarm_regions, args.bitflux_url)
+
     # Run server with appropriate transport
-    if args.sse:
+    if args.sse or args.http:
+        mcp.settings.host = args.host
         mcp.settings.port = args.port
-        mcp.run(transport='sse')
+        if args.worker_index >= 0:
+            # Lets the gateway route a session's messages back to this worker
+            from server.serving import exit_with_gateway, worker_message_path
+            mcp.settings.message_path = worker_message_path(args.worker_index)
+            exit_with_gateway()
+        mcp.run(transport='sse' if args.sse else 'streamable-http')
     else:
         mcp.run()
 
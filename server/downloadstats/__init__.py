@@ -1,3 +1,24 @@
-# import tool functions
-from .tool import download_stats_by_instance_id,download_stats_by_machine_key
-from .tool import manual
+from typing import Any
+
+from .constants import DEFAULT_MAX_POINTS
+
+# Tool functions load polars, protobuf and the catcher client, so they are
+# imported from their module on first access instead of when the package loads.
+_TOOL_EXPORTS = {
+    'download_stats_by_instance_id': 'tool',
+    'download_stats_by_machine_key': 'tool',
+    'resample_stats_by_machine_key': 'tool',
+    'summarize_stats_by_machine_key': 'chunked',
+    'fleet_percentiles': 'fleet',
+    'run_query': 'query',
+    'simulate_instances': 'whatif',
+    'simulate_cpu_credits': 'whatif',
+    'manual': 'tool',
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in _TOOL_EXPORTS:
+        import importlib
+        return getattr(importlib.import_module(f'.{_TOOL_EXPORTS[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
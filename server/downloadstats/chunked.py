@@ -0,0 +1,137 @@
+import io
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+import polars as pl
+
+from ..tracing import span
+from .sketch import ColumnAggregate
+from .summaries import save_summary
+from .tool import (
+    fetch_bitflux_download,
+    max_warmup_samples,
+    ring_buffer_ranges,
+    save_download,
+    scale_columns,
+    stats_metadata,
+    summary_percentiles,
+    summary_requirements,
+    warmup_strip_count,
+)
+
+# Rows decoded and scaled at a time, the row group size polars writes by default
+CHUNK_ROWS = 512 * 512
+
+
+def iter_chunks(source: Union[str, io.BytesIO], ranges: Sequence[Tuple[int, int]],
+                chunk_rows: int = CHUNK_ROWS) -> Iterator[pl.DataFrame]:
+    """
+    Decode the rows of a parquet file in the given (offset, length) runs, at most chunk_rows at a time.
+
+    Each slice is pushed down to the reader, so only the row groups
+    covering it are read.
+    """
+    scan = pl.scan_parquet(source)
+    for offset, length in ranges:
+        for start in range(offset, offset + length, chunk_rows):
+            yield scan.slice(start, min(chunk_rows, offset + length - start)).collect()
+
+
+def aggregate_chunked(stats: Dict[str, Any], source: Union[str, io.BytesIO],
+                      chunk_rows: int = CHUNK_ROWS) -> Dict[str, ColumnAggregate]:
+    """
+    Aggregate a raw ring buffer column by column, one chunk at a time.
+
+    Chunks are read in time order, scaled and added to a ColumnAggregate
+    per column, so memory is bounded by chunk_rows and not by the length
+    of the series. The samples strip_warmup might remove, at most an hour's
+    worth, are held back until the whole series has been seen and the
+    warmup can be decided.
+
+    Args:
+        stats: Dictionary containing metadata about the stats
+        source: The parquet file, as returned by SpillBuffer.source()
+        chunk_rows: Rows decoded at a time
+
+    Returns:
+        A ColumnAggregate per column of the scaled data, warmup stripped
+
+    Raises:
+        ValueError: The ring buffer holds no samples
+    """
+    rows = pl.scan_parquet(source).select(pl.len()).collect().item()
+    ranges = ring_buffer_ranges(stats, rows) if stats.get('length', 0) else []
+    total_samples = sum(length for _, length in ranges)
+    if total_samples == 0:
+        raise ValueError("No data available for summary")
+
+    sample_rate = int(stats['sampleRate'])
+    warmup = max_warmup_samples(sample_rate, total_samples)
+    held_back: List[pl.DataFrame] = []
+    aggregates: Dict[str, ColumnAggregate] = {}
+    reclaimable_sum = 0
+    held = 0
+
+    def aggregate(chunk: pl.DataFrame) -> None:
+        for col in chunk.columns:
+            aggregates.setdefault(col, ColumnAggregate()).update(chunk[col])
+
+    for chunk in iter_chunks(source, ranges, chunk_rows):
+        chunk = scale_columns(stats, chunk)
+        reclaimable_sum += chunk['reclaimable'].sum()
+        if held < warmup:
+            part = chunk.head(warmup - held)
+            held_back.append(part)
+            held += len(part)
+            chunk = chunk.slice(len(part))
+        aggregate(chunk)
+
+    head = pl.concat(held_back) if held_back else None
+    strip_count = 0
+    if head is not None:
+        # Means of the series from each warmup candidate on, from the total and the held back prefix
+        prefix = [0] + head['reclaimable'].cum_sum().to_list()
+        strip_count = warmup_strip_count(
+            sample_rate, total_samples,
+            lambda start: (reclaimable_sum - prefix[start]) / (total_samples - start))
+        aggregate(head.slice(strip_count))
+    return aggregates
+
+
+def summarize_aggregates(stats: Dict[str, Any], aggregates: Dict[str, ColumnAggregate]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    The summary and the requirements, as from summarize_bitflux_data, of column aggregates.
+
+    Counts, sums, means, min and max are exact, percentiles are within the
+    sketch's relative accuracy.
+    """
+    samples = max(agg.count + agg.null_count for agg in aggregates.values())
+    percentiles = summary_percentiles(samples)
+    summary = {col: agg.summary(percentiles, with_sum=col != 'idle_cpu') for col, agg in aggregates.items()}
+    return summary, summary_requirements(stats, summary)
+
+
+def summarize_chunked(stats: Dict[str, Any], source: Union[str, io.BytesIO],
+                      chunk_rows: int = CHUNK_ROWS) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Summarize a raw ring buffer like summarize_bitflux_data, one chunk at a time, see aggregate_chunked."""
+    return summarize_aggregates(stats, aggregate_chunked(stats, source, chunk_rows))
+
+
+def summarize_stats_by_machine_key(machine_key: str, url: str, chunk_rows: int = CHUNK_ROWS) -> Dict[str, Any]:
+    """Download stats for a machine and summarize them with summarize_chunked, without decoding them whole"""
+    stats, download = fetch_bitflux_download(machine_key, url)
+    if download.parquet.size == 0:
+        raise Exception(f"No bitflux data received for {machine_key}")
+    output = stats_metadata(stats)
+    with span('summarize.chunked', bytes=download.parquet.size, chunk_rows=chunk_rows):
+        try:
+            aggregates = aggregate_chunked(stats, download.parquet.source(), chunk_rows)
+        except pl.exceptions.PolarsError as e:
+            raise Exception(f"Failed to read Parquet: {e}")
+        summary, requirements = summarize_aggregates(stats, aggregates)
+    # Only a download that decoded is worth falling back to
+    if 'staleSince' not in stats:
+        save_download(machine_key, download)
+        save_summary(machine_key, stats, summary, requirements, aggregates)
+    output['summary'] = summary
+    output['summary_requirements'] = requirements
+    return output
@@ -0,0 +1,9 @@
+# Default number of samples per column returned for charting
+DEFAULT_MAX_POINTS = 60
+# Reconstructed sample time column added by add_time_column
+TIME_COLUMN = 'time'
+# Rows returned by default, and at most, by query_stats
+DEFAULT_QUERY_ROWS = 200
+MAX_QUERY_ROWS = 10000
+# Candidates returned by default by simulate_instance_sizes
+DEFAULT_CANDIDATES = 20
@@ -0,0 +1,113 @@
+from typing import Any, Dict, Tuple
+
+import polars as pl
+
+from ..ec2_tools.price_catalog import with_credit_specs
+from .constants import TIME_COLUMN
+
+# Price of a surplus vCPU hour when a Linux t3, t3a or t4g runs in unlimited mode
+UNLIMITED_SURPLUS_PRICE = 0.05
+# Share of max_credits under which a sample counts as low on credits
+LOW_BALANCE = 0.1
+# Samples credit_balance computes a running sum over at a time
+BALANCE_BLOCK = 4096
+
+
+def credit_balance(delta: pl.Series, cap: float, start: float) -> pl.Series:
+    """
+    The balance after each sample, b[t] = min(cap, max(0, b[t-1] + delta[t])) with b[-1] = start.
+
+    The clamped running sum is computed in phases of vectorized passes.
+    Until the balance reaches cap it is the running sum reflected at 0,
+    s - min(0, cummin(s)), and from then on, until it runs out, the running
+    sum reflected at cap, s - max(0, cummax(s) - cap). Each pass covers at
+    most BALANCE_BLOCK samples, so a series that drains and refills often
+    does not cost a pass over the rest of it every time.
+    """
+    delta = delta.cast(pl.Float64)
+    parts = []
+    level = float(start)
+    # Whether the current phase is reflected at 0 rather than at cap
+    floor = True
+    while len(delta):
+        s = delta[:BALANCE_BLOCK].cum_sum() + level
+        if floor:
+            balance = s - s.cum_min().clip(upper_bound=0)
+            crossed = (balance > cap).arg_true()
+        else:
+            balance = s - (s.cum_max() - cap).clip(lower_bound=0)
+            crossed = (balance < 0).arg_true()
+        if crossed.is_empty():
+            parts.append(balance)
+            level = balance[-1]
+            delta = delta[len(balance):]
+            continue
+        end = crossed[0]
+        level = float(cap) if floor else 0.0
+        parts += [balance[:end], pl.Series([level])]
+        delta = delta[end + 1:]
+        floor = not floor
+    return pl.concat(parts) if parts else pl.Series([], dtype=pl.Float64)
+
+
+def simulate_credits(stats: Dict[str, Any], df: pl.DataFrame, candidates: pl.DataFrame,
+                     every: str = '1h') -> Tuple[pl.DataFrame, pl.DataFrame]:
+    """
+    Replay a machine's CPU usage against the credit balance of every burstable candidate.
+
+    The busy vCPUs of a sample, (100 - idle_cpu) / 100 * numCpus of the
+    machine capped at the candidate's vCPUs, spend a credit per vCPU
+    minute while credits_per_hour accrue, up to max_credits. Candidates
+    start with a full balance, like an instance that has run for a day.
+    In standard mode a sample that would overdraw the balance is held to
+    the baseline, in unlimited mode it is billed as surplus. Candidates
+    with the same vCPUs and baseline share one simulation.
+
+    Args:
+        stats: Dictionary containing metadata including sampleRate and system.numCpus
+        df: Scaled samples with TIME_COLUMN and idle_cpu
+        candidates: Rows of price_catalog(), instance types that are not burstable are left out
+        every: Width of the trajectory buckets
+
+    Returns:
+        The burstable candidates with their credit specification and
+        throttling_risk (fraction of samples held to the baseline),
+        low_balance (fraction of samples under LOW_BALANCE of max_credits),
+        min_balance and final_balance (fractions of max_credits) and
+        surplus_cost_per_hour (in unlimited mode), and the trajectories:
+        TIME_COLUMN (bucket start) and the lowest balance in credits of
+        each candidate, one column per '<region>/<instance_type>' as
+        candidates may cover several regions
+    """
+    burstable = with_credit_specs(candidates).filter(pl.col('baseline').is_not_null())
+    seconds = int(stats['sampleRate'])
+    hours = len(df) * seconds / 3600
+    busy = (100 - df['idle_cpu'].cast(pl.Float64)) / 100 * int(stats['system']['numCpus'])
+    profiles = {}
+    for vcpu, credits_per_hour, cap in burstable.select('vcpu', 'credits_per_hour', 'max_credits').unique().iter_rows():
+        delta = credits_per_hour * seconds / 3600 - busy.clip(upper_bound=vcpu) * seconds / 60
+        balance = credit_balance(delta, cap, cap)
+        before = balance.shift(1, fill_value=cap) + delta
+        profiles[vcpu, credits_per_hour] = balance, {
+            'throttling_risk': (before < 0).mean() if len(before) else 0.0,
+            'low_balance': (balance < LOW_BALANCE * cap).mean() if len(balance) else 0.0,
+            'min_balance': (balance.min() if len(balance) else cap) / cap,
+            'final_balance': (balance[-1] if len(balance) else cap) / cap,
+            'surplus_cost_per_hour': (-before).clip(lower_bound=0).sum() / 60 * UNLIMITED_SURPLUS_PRICE / hours if hours else 0.0,
+        }
+    results = pl.DataFrame(
+        [profiles[row['vcpu'], row['credits_per_hour']][1] for row in burstable.iter_rows(named=True)],
+        schema={name: pl.Float64 for name in ('throttling_risk', 'low_balance', 'min_balance',
+                                              'final_balance', 'surplus_cost_per_hour')},
+    )
+    balances = df.select(TIME_COLUMN).with_columns(
+        profiles[vcpu, credits_per_hour][0].alias(f'{region}/{instance_type}')
+        for region, instance_type, vcpu, credits_per_hour
+        in burstable.select('region', 'instance_type', 'vcpu', 'credits_per_hour').iter_rows()
+    )
+    trajectories = (
+        balances.sort(TIME_COLUMN)
+        .group_by_dynamic(TIME_COLUMN, every=every, closed='left', label='left')
+        .agg(pl.exclude(TIME_COLUMN).min())
+    )
+    return pl.concat([burstable, results], how='horizontal'), trajectories
@@ -0,0 +1,123 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..machine_lookup.tool import lookup_machines_by_region
+from ..metrics import get_metrics
+from ..tracing import span
+from .chunked import summarize_stats_by_machine_key
+from .sketch import ColumnAggregate
+from .summaries import SUMMARY_MAX_AGE, cached_summary
+
+# Machines summarized at once when their cached summaries are missing or too old
+REFRESH_WORKERS = 4
+DEFAULT_PERCENTILES = ['p90', 'p99']
+
+
+def parse_percentile(spec: str) -> float:
+    """The quantile for 'pNN', e.g. 0.999 for 'p99.9'."""
+    try:
+        quantile = float(spec[1:]) / 100 if spec.startswith('p') else -1
+    except ValueError:
+        quantile = -1
+    if not 0 <= quantile <= 1:
+        raise ValueError(f"Unknown percentile '{spec}', expected pNN (e.g. p90, p99.9)")
+    return quantile
+
+
+def _machine_aggregates(machine_key: str, url: str, max_age: Optional[float]) -> Tuple[Dict[str, ColumnAggregate], bool]:
+    """The column aggregates of machine_key, and whether they had to be downloaded."""
+    cached = cached_summary(machine_key, max_age)
+    get_metrics().cache('stats_summaries', hit=cached is not None)
+    if cached is not None:
+        return cached['aggregates'], False
+    summarize_stats_by_machine_key(machine_key, url)
+    cached = cached_summary(machine_key, max_age=None)
+    if cached is None:
+        # A stale download is not saved, so only an older summary can stand in for it
+        raise Exception(f"No summary available for {machine_key}")
+    return cached['aggregates'], True
+
+
+def fleet_percentiles(machine_keys: Sequence[str], url: str, percentiles: Optional[List[str]] = None,
+                      columns: Optional[List[str]] = None, max_age: Optional[float] = SUMMARY_MAX_AGE) -> Dict[str, Any]:
+    """
+    Percentiles of each stats column across a group of machines, by merging their quantile sketches.
+
+    Every summarized download keeps a mergeable ColumnAggregate per column
+    next to its summary, so the group's percentiles cost a merge per machine
+    instead of a pass over every sample. Machines without a summary younger
+    than max_age seconds are summarized first, chunk by chunk.
+
+    Args:
+        machine_keys: The machines in the group
+        url: The catcher URL
+        percentiles: 'pNN' entries, defaults to p90 and p99
+        columns: Columns to report, defaults to every column
+        max_age: Oldest cached summary used, None for any
+
+    Returns:
+        Dictionary with 'machines' merged, 'refreshed' (how many were
+        downloaded), 'failed' ({machine_key: error}) and 'columns' with
+        count, mean, min, max and the percentiles of each column over the
+        samples of all machines
+    """
+    percentiles = percentiles or DEFAULT_PERCENTILES
+    quantiles = {spec: parse_percentile(spec) for spec in percentiles}
+    machine_keys = list(dict.fromkeys(machine_keys))
+
+    def load(machine_key: str) -> Tuple[str, Any]:
+        try:
+            return machine_key, _machine_aggregates(machine_key, url, max_age)
+        except Exception as e:
+            return machine_key, e
+
+    with span('fleet.load', machines=len(machine_keys)):
+        with ThreadPoolExecutor(max(1, min(REFRESH_WORKERS, len(machine_keys))), thread_name_prefix='fleet') as pool:
+            # Refreshes stay in the caller's trace
+            futures = [pool.submit(contextvars.copy_context().run, load, key) for key in machine_keys]
+            loaded = [future.result() for future in futures]
+
+    merged: Dict[str, ColumnAggregate] = {}
+    failed = {}
+    refreshed = 0
+    with span('fleet.merge'):
+        for machine_key, result in loaded:
+            if isinstance(result, Exception):
+                failed[machine_key] = str(result)
+                continue
+            aggregates, downloaded = result
+            refreshed += downloaded
+            for col, aggregate in aggregates.items():
+                if columns is None or col in columns:
+                    merged.setdefault(col, ColumnAggregate()).merge(aggregate)
+
+    unknown = set(columns or []) - set(merged)
+    if unknown and merged:
+        raise ValueError(f"Unknown columns {sorted(unknown)}, expected some of {sorted(merged)}")
+    return {
+        'machines': len(machine_keys) - len(failed),
+        'refreshed': refreshed,
+        'failed': failed,
+        'columns': {
+            col: {
+                'count': aggregate.count,
+                'mean': aggregate.mean if aggregate.count else None,
+                'min': aggregate.min,
+                'max': aggregate.max,
+                **{spec: aggregate.quantile(q) for spec, q in quantiles.items()},
+            }
+            for col, aggregate in merged.items()
+        },
+    }
+
+
+def fleet_percentiles_by_group(url: str, machine_keys: Optional[Sequence[str]] = None, region: str = '',
+                               **kwargs: Any) -> Dict[str, Any]:
+    """fleet_percentiles over machine_keys and the running machines with bitflux in region, see lookup_machines_by_region."""
+    keys = list(machine_keys or [])
+    if region:
+        keys += lookup_machines_by_region(region, url)['machineKey']
+    if not keys:
+        raise ValueError("No machines given, pass machine_keys or a region with bitflux machines")
+    return fleet_percentiles(keys, url, **kwargs)
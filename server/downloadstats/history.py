@@ -0,0 +1,229 @@
+import argparse
+import contextlib
+import hashlib
+import os
+import shutil
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import polars as pl
+
+from ..cache import cache_dir
+from .constants import TIME_COLUMN
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, appends from several processes are not serialized
+    fcntl = None
+
+# Accumulated samples per machine, under cache_dir(), one hive partition per UTC day
+HISTORY_DIR = 'history'
+PARTITION_COLUMN = 'date'
+# Days of history kept, BITFLUX_HISTORY_DAYS overrides it and 0 turns the history off
+HISTORY_DAYS = 90
+# A day's partition is compacted into one file once it has this many parts
+COMPACT_PARTS = 8
+# Holds the machine key in each machine's directory, whose name is its hash
+MACHINE_KEY_FILE = 'machine_key'
+
+
+def history_days() -> int:
+    """Days of history kept, from BITFLUX_HISTORY_DAYS or HISTORY_DAYS."""
+    value = os.environ.get('BITFLUX_HISTORY_DAYS', '').strip()
+    return max(0, int(value)) if value else HISTORY_DAYS
+
+
+def machine_history_dir(machine_key: str) -> Path:
+    """The directory holding machine_key's partitions."""
+    name = hashlib.sha256(machine_key.encode()).hexdigest()
+    return cache_dir() / HISTORY_DIR / name
+
+
+@contextlib.contextmanager
+def _locked(directory: Path) -> Iterator[None]:
+    """Serialize appends and compactions of one machine's history across processes."""
+    directory.mkdir(parents=True, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(directory / '.lock', 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _partitions(directory: Path) -> Dict[date, Path]:
+    """Partition directories by day, oldest first."""
+    partitions = {}
+    prefix = f'{PARTITION_COLUMN}='
+    if directory.is_dir():
+        for entry in directory.iterdir():
+            if entry.is_dir() and entry.name.startswith(prefix):
+                partitions[date.fromisoformat(entry.name[len(prefix):])] = entry
+    return dict(sorted(partitions.items()))
+
+
+def _parts(partition: Path) -> List[Path]:
+    return sorted(partition.glob('*.parquet'))
+
+
+def _write(df: pl.DataFrame, partition: Path, name: str) -> Path:
+    """Write df to partition/name atomically."""
+    partition.mkdir(parents=True, exist_ok=True)
+    path = partition / name
+    tmp = partition / f'.{name}.{os.getpid()}.tmp'
+    df.write_parquet(tmp)
+    os.replace(tmp, path)
+    return path
+
+
+def last_sample_time(machine_key: str) -> Optional[datetime]:
+    """Time of the newest sample in machine_key's history, None if it has none."""
+    partitions = _partitions(machine_history_dir(machine_key))
+    for partition in reversed(partitions.values()):
+        parts = _parts(partition)
+        if parts:
+            return pl.scan_parquet(parts).select(pl.col(TIME_COLUMN).max()).collect().item()
+    return None
+
+
+def compact_partition(partition: Path) -> int:
+    """
+    Rewrite a partition's parts as one file, sorted and deduplicated on TIME_COLUMN.
+
+    Returns:
+        Number of part files removed
+    """
+    parts = _parts(partition)
+    if len(parts) < 2:
+        return 0
+    df = (
+        pl.concat([pl.read_parquet(p) for p in parts], how='diagonal_relaxed')
+        .unique(subset=TIME_COLUMN, keep='last', maintain_order=True)
+        .sort(TIME_COLUMN)
+    )
+    compacted = _write(df, partition, f'part-{time.time_ns()}-compacted.parquet')
+    for p in parts:
+        if p != compacted:
+            p.unlink()
+    return len(parts)
+
+
+def apply_retention(directory: Path, days: int, today: Optional[date] = None) -> int:
+    """Remove the partitions of days before the last days ones, returns how many."""
+    cutoff = (today or datetime.now(timezone.utc).date()) - timedelta(days=days)
+    removed = 0
+    for day, partition in _partitions(directory).items():
+        if day < cutoff:
+            shutil.rmtree(partition)
+            removed += 1
+    return removed
+
+
+def append_history(machine_key: str, stats: Dict[str, Any], df: pl.DataFrame) -> int:
+    """
+    Add the samples of df newer than machine_key's history to it.
+
+    Consecutive downloads mostly overlap, and the reconstructed time of a
+    sample moves by a little each time, so samples within half a sample
+    interval of the newest stored one are the same sample and skipped.
+    New samples go to one part file per day. Partitions with COMPACT_PARTS
+    parts are compacted and days beyond history_days() are removed.
+
+    Args:
+        machine_key: The machine the samples are from
+        stats: Dictionary containing metadata including sampleRate
+        df: DataFrame with TIME_COLUMN, as returned by load_bitflux_data
+
+    Returns:
+        Number of samples added
+    """
+    days = history_days()
+    if days == 0 or df.is_empty():
+        return 0
+    directory = machine_history_dir(machine_key)
+    with _locked(directory):
+        last = last_sample_time(machine_key)
+        new = df
+        if last is not None:
+            new = df.filter(pl.col(TIME_COLUMN) > last + timedelta(seconds=int(stats['sampleRate']) / 2))
+        if new.is_empty():
+            return 0
+        marker = directory / MACHINE_KEY_FILE
+        if not marker.exists():
+            marker.write_text(machine_key)
+        name = f'part-{time.time_ns()}.parquet'
+        for (day,), rows in new.group_by(pl.col(TIME_COLUMN).dt.date(), maintain_order=True):
+            partition = directory / f'{PARTITION_COLUMN}={day.isoformat()}'
+            _write(rows, partition, name)
+            if len(_parts(partition)) >= COMPACT_PARTS:
+                compact_partition(partition)
+        apply_retention(directory, days)
+    return len(new)
+
+
+def compact_history(machine_key: str) -> Dict[str, int]:
+    """Compact every partition of machine_key's history and apply retention."""
+    directory = machine_history_dir(machine_key)
+    with _locked(directory):
+        removed = apply_retention(directory, history_days() or HISTORY_DAYS)
+        partitions = _partitions(directory)
+        parts = sum(compact_partition(p) for p in partitions.values())
+    return {'partitions': len(partitions), 'parts_compacted': parts, 'partitions_removed': removed}
+
+
+def history_machine_keys() -> List[str]:
+    """The machines with a local history."""
+    root = cache_dir() / HISTORY_DIR
+    if not root.is_dir():
+        return []
+    return sorted(marker.read_text() for marker in root.glob(f'*/{MACHINE_KEY_FILE}'))
+
+
+def scan_history(machine_key: str, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> Optional[pl.LazyFrame]:
+    """
+    The stored samples of machine_key from start up to end, in time order.
+
+    Only the partitions of the days in range are read.
+
+    Returns:
+        A LazyFrame like the DataFrame of load_bitflux_data, but with the
+        warmup samples of the first downloads, or None without history
+    """
+    directory = machine_history_dir(machine_key)
+    files = [p for partition in _partitions(directory).values() for p in _parts(partition)]
+    if not files:
+        return None
+    lf = pl.scan_parquet(str(directory / '**' / '*.parquet'), hive_partitioning=True)
+    if start is not None:
+        lf = lf.filter(pl.col(PARTITION_COLUMN) >= start.astimezone(timezone.utc).date(), pl.col(TIME_COLUMN) >= start)
+    if end is not None:
+        lf = lf.filter(pl.col(PARTITION_COLUMN) <= end.astimezone(timezone.utc).date(), pl.col(TIME_COLUMN) < end)
+    return lf.drop(PARTITION_COLUMN).unique(subset=TIME_COLUMN, keep='last').sort(TIME_COLUMN)
+
+
+def manual() -> None:
+    import json
+    parser = argparse.ArgumentParser(description="Bitflux local stats history")
+    parser.add_argument("--machine_key", required=True, help="Machine UUID")
+    parser.add_argument("--compact", action="store_true", help="Compact every partition and apply retention")
+    args = parser.parse_args()
+
+    if args.compact:
+        print(json.dumps(compact_history(args.machine_key), indent=4))
+    lf = scan_history(args.machine_key)
+    if lf is None:
+        print("No history stored")
+        return
+    print(lf.select(pl.len().alias('samples'), pl.col(TIME_COLUMN).min().alias('first'),
+                    pl.col(TIME_COLUMN).max().alias('last')).collect())
+
+
+if __name__ == "__main__":
+    manual()
@@ -0,0 +1,192 @@
+import re
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import polars as pl
+
+from ..cache import get_store
+from ..ec2_tools.price_catalog import price_catalog
+from ..machine_lookup.registry import get_registry
+from ..tracing import span
+from .constants import DEFAULT_QUERY_ROWS, MAX_QUERY_ROWS, TIME_COLUMN
+from .history import history_machine_keys, scan_history
+from .summaries import _SUMMARY_NAMESPACE
+from .tool import format_time_columns
+
+# Table functions that would read files outside the registered tables
+_FILE_FUNCTIONS = re.compile(r'\bread_\w+\s*\(', re.IGNORECASE)
+# String literals, quoted identifiers and comments, matched from wherever the first one starts
+_TOKENS = re.compile(r"'(?:[^']|'')*'|\"((?:[^\"]|\"\")*)\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+# A file scan in a query plan, with the id of the LazyFrame scanning it
+_PLAN_SCAN = re.compile(r'^\s*\w+ SCAN \[.*?(?:\[id: (\w+)\])?\s*$', re.MULTILINE)
+
+
+def history_table() -> pl.LazyFrame:
+    """The local history of every machine, with a machine_key column."""
+    frames = []
+    for machine_key in history_machine_keys():
+        lf = scan_history(machine_key)
+        if lf is not None:
+            frames.append(lf.select(pl.lit(machine_key).alias('machine_key'), pl.all()))
+    if not frames:
+        return pl.LazyFrame(schema={'machine_key': pl.String, TIME_COLUMN: pl.Datetime('ms', 'UTC')})
+    return pl.concat(frames, how='diagonal_relaxed')
+
+
+def _percentile_column(stat: str) -> str:
+    """'99.9%' -> 'p99_9', so percentiles are plain SQL identifiers."""
+    return 'p' + stat[:-1].replace('.', '_') if stat.endswith('%') else stat
+
+
+def summaries_table() -> pl.LazyFrame:
+    """The cached summaries, one row per machine and stats column."""
+    rows = []
+    for machine_key, cached in get_store().get_all(_SUMMARY_NAMESPACE).items():
+        machine = {
+            'machine_key': machine_key,
+            'timestamp': datetime.fromisoformat(cached['timestamp']),
+            'sample_rate': cached['sample_rate'],
+            'mem_total': cached['mem_total'],
+            'num_cpus': cached['num_cpus'],
+            'vcpu_usage': cached['summary_requirements']['vcpu_usage'],
+        }
+        for column, stats in cached['summary'].items():
+            row = {**machine, 'column': column}
+            row.update({_percentile_column(stat): value for stat, value in stats.items()})
+            rows.append(row)
+    if not rows:
+        return pl.LazyFrame(schema={'machine_key': pl.String, 'column': pl.String})
+    return pl.from_dicts(rows, infer_schema_length=None).lazy()
+
+
+def machines_table() -> pl.LazyFrame:
+    """The machine registry."""
+    rows = get_registry().rows()
+    if not rows:
+        return pl.LazyFrame(schema={'machine_key': pl.String, 'instance_id': pl.String})
+    return pl.from_dicts(rows).lazy().with_columns(pl.from_epoch('updated_at', time_unit='s').dt.replace_time_zone('UTC'))
+
+
+# Tables run_query can read, built only when a query names them
+TABLES: Dict[str, Callable[..., pl.LazyFrame]] = {
+    'history': lambda region: history_table(),
+    'summaries': lambda region: summaries_table(),
+    'machines': lambda region: machines_table(),
+    'prices': lambda region: price_catalog(region).lazy(),
+}
+
+
+def _strip_query(query: str) -> str:
+    """
+    query with string literals emptied, comments removed and quoted identifiers unquoted.
+
+    They are matched in a single pass, so '--' in a literal is not taken for
+    a comment, and "read_csv" is seen as read_csv.
+    """
+    def replace(match: re.Match) -> str:
+        text = match.group(0)
+        if text.startswith("'"):
+            return "''"
+        if text.startswith('"'):
+            return re.sub(r'\W', '_', match.group(1))
+        return ' '
+    return _TOKENS.sub(replace, query)
+
+
+def check_query(query: str) -> None:
+    """Raise ValueError unless query is a single SELECT over the registered tables."""
+    statement = _strip_query(query).strip().rstrip(';').strip()
+    if not re.match(r'(select|with)\b', statement, re.IGNORECASE):
+        raise ValueError("Only SELECT queries are supported")
+    if ';' in statement:
+        raise ValueError("Only one statement per query is supported")
+    if _FILE_FUNCTIONS.search(statement):
+        raise ValueError(f"Only the tables {', '.join(TABLES)} can be queried")
+
+
+def _scan_ids(lf: pl.LazyFrame) -> List[Optional[str]]:
+    """The ids of the file scans in lf's plan, None for a scan without one."""
+    return [match.group(1) for match in _PLAN_SCAN.finditer(lf.explain(optimized=False))]
+
+
+def check_plan(lf: pl.LazyFrame, tables: Dict[str, pl.LazyFrame]) -> None:
+    """Raise ValueError if the plan of a query scans any file the registered tables do not."""
+    allowed = {scan for table in tables.values() for scan in _scan_ids(table)}
+    if any(scan is None or scan not in allowed for scan in _scan_ids(lf)):
+        raise ValueError(f"Only the tables {', '.join(TABLES)} can be queried")
+
+
+def _json_columns(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Temporal and decimal columns as strings and floats, so the output is JSON serializable.
+
+    Datetimes are formatted as by the other tools, those without a time
+    zone, e.g. from SQL casts, taken to be UTC like the tables' own.
+    """
+    naive = [name for name, dtype in df.schema.items() if isinstance(dtype, pl.Datetime) and dtype.time_zone is None]
+    return format_time_columns(df.with_columns(pl.col(naive).dt.replace_time_zone('UTC'))).with_columns(
+        pl.col(pl.Date, pl.Time, pl.Duration).cast(pl.String),
+        pl.col(pl.Decimal).cast(pl.Float64),
+    )
+
+
+def run_query(query: str, max_rows: int = DEFAULT_QUERY_ROWS, region: str = '') -> Dict[str, Any]:
+    """
+    Run a SQL SELECT over the local stats tables.
+
+    Tables are registered as LazyFrames, so filters and projections are
+    pushed down to the history's parquet files and joins and aggregations
+    run in polars before anything is returned. Besides check_query, the
+    plan is checked to scan no file the tables do not.
+
+    Tables:
+        history: Samples kept by the local history, per machine_key and time, warmup included
+        summaries: The last summary of each machine, one row per column
+        machines: The machine registry
+        prices: On demand prices of region, or of every cached region
+
+    Args:
+        query: A SELECT statement in polars SQL
+        max_rows: Rows returned at most, up to MAX_QUERY_ROWS
+        region: Region of the prices table
+
+    Returns:
+        Dictionary with 'columns' (names in order), 'data' ({column: values}),
+        'rows' returned and 'truncated' if the result had more
+    """
+    check_query(query)
+    max_rows = max(1, min(int(max_rows), MAX_QUERY_ROWS))
+    names = [name for name in TABLES if re.search(rf'\b{name}\b', query, re.IGNORECASE)]
+    with span('query', tables=','.join(names)) as s:
+        try:
+            tables = {name: TABLES[name](region) for name in names}
+            lf = pl.SQLContext(tables).execute(query, eager=False)
+            check_plan(lf, tables)
+            df = lf.head(max_rows + 1).collect()
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(f"Query failed: {e}") from e
+        s.set('rows', len(df))
+    truncated = len(df) > max_rows
+    df = _json_columns(df.head(max_rows))
+    return {
+        'columns': df.columns,
+        'data': df.to_dict(as_series=False),
+        'rows': len(df),
+        'truncated': truncated,
+    }
+
+
+def manual() -> None:
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="SQL over the local stats history, summaries, machine registry and prices")
+    parser.add_argument("query", help="SELECT statement, e.g. \"SELECT machine_key, COUNT(*) FROM history GROUP BY 1\"")
+    parser.add_argument("--max_rows", type=int, default=DEFAULT_QUERY_ROWS, help="Rows returned at most")
+    parser.add_argument("--region", default='', help="Region of the prices table, by default every cached one")
+    args = parser.parse_args()
+
+    print(json.dumps(run_query(args.query, args.max_rows, args.region), indent=4))
+
+
+if __name__ == "__main__":
+    manual()
@@ -0,0 +1,195 @@
+import math
+from typing import Any, Dict, Optional, Sequence, Union
+
+import polars as pl
+
+# Relative accuracy of QuantileSketch: every quantile is within this fraction of the exact value
+RELATIVE_ACCURACY = 0.01
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch for non-negative values, after DDSketch.
+
+    Values are counted in logarithmic buckets, bucket k holding the values
+    in (gamma**(k-1), gamma**k] with gamma = (1 + a) / (1 - a), so any
+    quantile is returned within relative accuracy a. The number of buckets
+    depends on the range of the values, not on how many there are: bytes
+    up to a TiB take at most about 1400 buckets at 1%. Zeros, and anything
+    below, are counted apart and reported as 0.
+
+    Two sketches with the same accuracy merge by adding their bucket counts,
+    so a sketch of the union of chunks, windows or machines is exact with
+    respect to the sketches of its parts.
+    """
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError(f"relative_accuracy must be in (0, 1), got {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, values: pl.Series) -> None:
+        """Count values, nulls are skipped."""
+        values = values.drop_nulls().cast(pl.Float64)
+        positive = values.filter(values > 0)
+        self.zero_count += len(values) - len(positive)
+        self.count += len(values)
+        if positive.is_empty():
+            return
+        keys = (positive.log() / self._log_gamma).ceil().cast(pl.Int32).value_counts()
+        for key, n in keys.iter_rows():
+            self.bins[key] = self.bins.get(key, 0) + n
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Add the values counted by other, which must have the same accuracy."""
+        if other.gamma != self.gamma:
+            raise ValueError(f"Cannot merge sketches with relative accuracy {self.relative_accuracy} and {other.relative_accuracy}")
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q quantile (0 <= q <= 1) of the values, None if there are none."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # Midpoint of the bucket in relative terms
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON serializable form, buckets as [key, count] pairs in key order."""
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'count': self.count,
+            'zero_count': self.zero_count,
+            'bins': [[key, self.bins[key]] for key in sorted(self.bins)],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'QuantileSketch':
+        sketch = cls(data['relative_accuracy'])
+        sketch.count = data['count']
+        sketch.zero_count = data['zero_count']
+        sketch.bins = {key: n for key, n in data['bins']}
+        return sketch
+
+
+class ColumnAggregate:
+    """
+    Mergeable summary of one column: counts, sum, min/max, mean and
+    variance, and a QuantileSketch for the percentiles.
+
+    Memory does not grow with the number of values, and aggregates of
+    disjoint parts of a column, or of the same column on different
+    machines, merge into the aggregate of the whole.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.null_count = 0
+        self.sum: Union[int, float] = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.mean = 0.0
+        # Sum of squared differences from the mean
+        self.m2 = 0.0
+        self.sketch = QuantileSketch()
+
+    def update(self, values: pl.Series) -> None:
+        """Add a chunk of the column."""
+        other = ColumnAggregate()
+        other.null_count = values.null_count()
+        other.count = len(values) - other.null_count
+        if other.count:
+            other.sum = values.sum()
+            other.min = values.min()
+            other.max = values.max()
+            other.mean = values.mean()
+            other.m2 = values.var(ddof=0) * other.count
+            other.sketch.add(values)
+        self.merge(other)
+
+    def merge(self, other: 'ColumnAggregate') -> None:
+        """Add the values aggregated by other."""
+        self.null_count += other.null_count
+        if not other.count:
+            return
+        count = self.count + other.count
+        # Chan et al.'s pairwise update of mean and variance
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The sketch's q quantile, clamped to the exact min and max."""
+        value = self.sketch.quantile(q)
+        if value is None:
+            return None
+        return float(min(max(value, self.min), self.max))
+
+    def summary(self, percentiles: Sequence[float], with_sum: bool = True) -> Dict[str, Any]:
+        """The statistics summarize_bitflux_data reports for a column, in the same order."""
+        summary = {
+            'count': float(self.count),
+            'null_count': float(self.null_count),
+            'mean': float(self.mean) if self.count else None,
+            'std': math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None,
+            'min': None if self.min is None else float(self.min),
+        }
+        for p in sorted(percentiles):
+            summary[f"{p * 100:g}%"] = self.quantile(p)
+        summary['max'] = None if self.max is None else float(self.max)
+        summary['median'] = self.quantile(0.5)
+        if with_sum:
+            summary['sum'] = float(self.sum)
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON serializable form, see from_dict."""
+        return {
+            'count': self.count,
+            'null_count': self.null_count,
+            'sum': self.sum,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.mean,
+            'm2': self.m2,
+            'sketch': self.sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ColumnAggregate':
+        aggregate = cls()
+        for field in ('count', 'null_count', 'sum', 'min', 'max', 'mean', 'm2'):
+            setattr(aggregate, field, data[field])
+        aggregate.sketch = QuantileSketch.from_dict(data['sketch'])
+        return aggregate
+
+
+def aggregate_frame(df: pl.DataFrame, columns: Optional[Sequence[str]] = None) -> Dict[str, ColumnAggregate]:
+    """A ColumnAggregate of each of columns of df, by default every numeric column."""
+    if columns is None:
+        columns = [c for c, dtype in df.schema.items() if dtype.is_numeric()]
+    aggregates = {}
+    for col in columns:
+        aggregates[col] = ColumnAggregate()
+        aggregates[col].update(df[col])
+    return aggregates
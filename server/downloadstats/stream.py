@@ -0,0 +1,224 @@
+import io
+import os
+import tempfile
+import weakref
+from typing import Any, BinaryIO, Optional, Tuple, Union
+
+from api_client.rest import RESTResponse
+
+from ..bitflux_catcher_api import ApiException, downloadstats_pb2, response_started
+
+# Bytes read from the response at a time
+CHUNK_SIZE = 1024 * 1024
+# Parquet blobs larger than this are spilled to a temporary file and memory mapped
+SPILL_THRESHOLD = 32 * 1024 * 1024
+# Field number of Stats.bitflux, the embedded parquet file
+BITFLUX_FIELD = downloadstats_pb2.Stats.DESCRIPTOR.fields_by_name['bitflux'].number
+
+# Protobuf wire types
+_VARINT, _FIXED64, _LENGTH_DELIMITED, _FIXED32 = 0, 1, 2, 5
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class SpillBuffer:
+    """
+    Write-once buffer kept in memory up to threshold bytes and in a file in directory beyond.
+
+    A spilled buffer's file is removed when the buffer is garbage collected,
+    unless persist() moved it elsewhere first. In memory the bytes are kept
+    in a BytesIO, whose getvalue() hands over its buffer without a copy;
+    polars reads neither a bytearray nor a memoryview.
+    """
+
+    def __init__(self, directory: str, threshold: int = SPILL_THRESHOLD) -> None:
+        self.directory = directory
+        self.threshold = threshold
+        self.size = 0
+        self.path: Optional[str] = None
+        self._memory: Optional[io.BytesIO] = io.BytesIO()
+        self._file: Optional[BinaryIO] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    @classmethod
+    def from_path(cls, path: str) -> 'SpillBuffer':
+        """A buffer over an existing file, which is left in place."""
+        buffer = cls(os.path.dirname(path))
+        buffer._memory = None
+        buffer.path = path
+        buffer.size = os.path.getsize(path)
+        return buffer
+
+    @property
+    def spilled(self) -> bool:
+        return self.path is not None
+
+    def write(self, data: Union[bytes, memoryview]) -> None:
+        if self._memory is not None and self.size + len(data) > self.threshold:
+            fd, self.path = tempfile.mkstemp(dir=self.directory, suffix='.parquet.tmp')
+            self._finalizer = weakref.finalize(self, _remove, self.path)
+            self._file = os.fdopen(fd, 'wb')
+            self._file.write(self._memory.getvalue())
+            self._memory = None
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._memory.write(data)
+        self.size += len(data)
+
+    def reset(self) -> None:
+        """Drop everything written so far."""
+        self.close()
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self.size = 0
+        self.path = None
+        self._memory = io.BytesIO()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def source(self) -> Union[str, io.BytesIO]:
+        """What to pass to pl.read_parquet: the file path, which polars memory maps, or the bytes, not copied."""
+        self.close()
+        if self.path is not None:
+            return self.path
+        return io.BytesIO(self._memory.getvalue())
+
+    def persist(self, path: str) -> None:
+        """Store the contents at path atomically, moving the spill file there."""
+        self.close()
+        if self.path is not None and self._finalizer is not None:
+            self._finalizer.detach()
+            self._finalizer = None
+            os.replace(self.path, path)
+            self.path = path
+            return
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            if self.path is not None:
+                with open(self.path, 'rb') as src:
+                    while chunk := src.read(CHUNK_SIZE):
+                        f.write(chunk)
+            else:
+                f.write(self._memory.getvalue())
+        os.replace(tmp, path)
+
+
+class StatsDownload:
+    """
+    A /downloadstats response split into the Stats message without its
+    bitflux field, which is small, and the parquet file from that field.
+    """
+
+    def __init__(self, meta: bytes, parquet: SpillBuffer) -> None:
+        self.meta = meta
+        self.parquet = parquet
+
+    @property
+    def size(self) -> int:
+        return len(self.meta) + self.parquet.size
+
+
+def _read_exact(reader: BinaryIO, n: int) -> bytes:
+    data = reader.read(n)
+    if len(data) != n:
+        raise ValueError(f"Truncated downloadstats response, expected {n} more bytes, got {len(data)}")
+    return data
+
+
+def _read_varint(reader: BinaryIO) -> Tuple[int, bytes]:
+    """Returns the value and its encoded bytes, value -1 at the end of the stream."""
+    raw = bytearray()
+    value = shift = 0
+    while True:
+        byte = reader.read(1)
+        if not byte:
+            if raw:
+                raise ValueError("Truncated varint in downloadstats response")
+            return -1, b''
+        raw += byte
+        value |= (byte[0] & 0x7f) << shift
+        if not byte[0] & 0x80:
+            return value, bytes(raw)
+        shift += 7
+
+
+def split_stats(reader: BinaryIO, directory: str, threshold: int = SPILL_THRESHOLD) -> StatsDownload:
+    """
+    Read a serialized Stats message from reader without holding it in memory.
+
+    Top level fields are copied to a small buffer as they are, the bitflux
+    field is streamed into a SpillBuffer in CHUNK_SIZE pieces, so the
+    parquet file exists once, in memory or in a file under directory.
+    """
+    meta = bytearray()
+    parquet = SpillBuffer(directory, threshold)
+    while True:
+        tag, raw_tag = _read_varint(reader)
+        if tag < 0:
+            break
+        field, wire_type = tag >> 3, tag & 7
+        if wire_type == _VARINT:
+            _, raw_value = _read_varint(reader)
+            meta += raw_tag + raw_value
+        elif wire_type == _FIXED64:
+            meta += raw_tag + _read_exact(reader, 8)
+        elif wire_type == _FIXED32:
+            meta += raw_tag + _read_exact(reader, 4)
+        elif wire_type == _LENGTH_DELIMITED:
+            length, raw_length = _read_varint(reader)
+            if length < 0:
+                raise ValueError("Truncated downloadstats response")
+            if field != BITFLUX_FIELD:
+                meta += raw_tag + raw_length + _read_exact(reader, length)
+                continue
+            # As for any non-repeated field the last occurrence wins
+            parquet.reset()
+            while length > 0:
+                chunk = _read_exact(reader, min(CHUNK_SIZE, length))
+                parquet.write(chunk)
+                length -= len(chunk)
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type} in downloadstats response")
+    parquet.close()
+    return StatsDownload(bytes(meta), parquet)
+
+
+def stream_download_stats(api_instance: Any, body: Any, directory: str,
+                          _request_timeout: Any = None) -> StatsDownload:
+    """
+    Call /downloadstats and split the response body with split_stats as it arrives.
+
+    Uses the generated client's _without_preload_content call, so urllib3
+    decompresses the body chunk by chunk instead of reading it whole. Once
+    the headers are in, the call's deadline no longer applies, only the
+    read timeout between chunks, see ENDPOINT_POLICIES.
+
+    Raises:
+        ApiException: The catcher answered with an error status
+    """
+    response = api_instance.download_stats_without_preload_content(
+        download_stats_request=body, _request_timeout=_request_timeout)
+    try:
+        if not 200 <= response.status <= 299:
+            error = RESTResponse(response)
+            error.read()
+            ApiException.from_response(http_resp=error, body=None, data=None)
+        response_started()
+        # Reading past the end must return b'', not fail on a closed response
+        response.auto_close = False
+        download = split_stats(io.BufferedReader(response, CHUNK_SIZE), directory, SPILL_THRESHOLD)
+    except BaseException:
+        response.close()
+        raise
+    response.release_conn()
+    return download
@@ -0,0 +1,36 @@
+from typing import Any, Dict, Optional
+
+from ..cache import get_store
+from .sketch import ColumnAggregate
+
+_SUMMARY_NAMESPACE = 'stats_summaries'
+# The ring buffer gains a sample every sample_rate seconds, so a summary
+# stands in for the machine in fleet percentiles for an hour at most
+SUMMARY_MAX_AGE = 3600
+
+
+def save_summary(machine_key: str, stats: Dict[str, Any], summary: Dict[str, Any],
+                 requirements: Dict[str, Any], aggregates: Dict[str, ColumnAggregate]) -> None:
+    """Keep the summary of machine_key's last download together with the column aggregates it was made from."""
+    get_store().put(_SUMMARY_NAMESPACE, machine_key, {
+        'timestamp': stats['timestamp'],
+        'sample_rate': stats['sampleRate'],
+        'mem_total': stats['system']['memTotal'],
+        'num_cpus': stats['system']['numCpus'],
+        'summary': summary,
+        'summary_requirements': requirements,
+        'aggregates': {col: aggregate.to_dict() for col, aggregate in aggregates.items()},
+    })
+
+
+def cached_summary(machine_key: str, max_age: Optional[float] = SUMMARY_MAX_AGE) -> Optional[Dict[str, Any]]:
+    """
+    The summary saved for machine_key, or None if there is none younger than max_age seconds.
+
+    Its 'aggregates' are ColumnAggregate objects, ready to merge.
+    """
+    cached = get_store().get(_SUMMARY_NAMESPACE, machine_key, max_age=max_age)
+    if cached is None:
+        return None
+    cached['aggregates'] = {col: ColumnAggregate.from_dict(data) for col, data in cached['aggregates'].items()}
+    return cached
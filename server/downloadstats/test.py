@@ -1,6 +1,30 @@
+import io
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
 import pytest
 import polars as pl
-from .tool import strip_warmup
+from google.protobuf import json_format
+from ..bench import catcher
+from ..bench.synthetic import synthetic_payload, synthetic_price_fixture, synthetic_ring_buffer
+from ..bitflux_catcher_api import downloadstats_pb2, reset_endpoints
+from ..bitflux_catcher_api.standin import StandinCatcher
+from ..cache import reset_store
+from ..ec2_tools.price_catalog import price_catalog
+from ..ec2_tools.pricing_fixtures import replay_pricing
+from ..machine_lookup.registry import get_registry, reset_registry
+from . import history, stream
+from .chunked import summarize_chunked, summarize_stats_by_machine_key
+from .fleet import fleet_percentiles
+from .query import check_plan, check_query, run_query
+from .whatif import exceedance, simulate_candidates, simulate_cpu_credits, simulate_instances
+from .credits import credit_balance, simulate_credits
+from .sketch import RELATIVE_ACCURACY, ColumnAggregate, QuantileSketch, aggregate_frame
+from .stream import split_stats
+from .constants import TIME_COLUMN
+from .tool import PAYLOAD_DIR, download_bitflux_data, download_stats_by_machine_key, format_time_columns, load_bitflux_data, resample_stats_by_machine_key
+from .tool import strip_warmup, strip_warmup_lazy, downsample_lttb, transform_data_format, add_time_column, resample_bitflux_data, scale_bitflux_data, summarize_bitflux_data
 
 
 def debug_strip_warmup(stats, df):
@@ -187,4 +211,559 @@ class TestStripWarmup:
         assert set(result.columns) == {'reclaimable', 'free', 'used'}
         # All columns should have same number of rows
         assert len(result['reclaimable']) == len(result['free']) == len(result['used'])
-    
+
+
+class TestDownsampleLttb:
+
+    def make_df(self, n):
+        return pl.DataFrame({
+            'used': [1000 + (i % 50) for i in range(n)],
+            'idle_cpu': [90 + (i % 7) for i in range(n)],
+        })
+
+    def test_small_dataframe_unchanged(self):
+        """Frames shorter than max_points are returned whole with an index"""
+        result = downsample_lttb(self.make_df(10), 60)
+        assert len(result) == 10
+        assert result['sample_index'].to_list() == list(range(10))
+
+    def test_bounded_and_keeps_endpoints(self):
+        """Output is bounded by max_points and always keeps first and last samples"""
+        result = downsample_lttb(self.make_df(10000), 60)
+        assert len(result) == 60
+        index = result['sample_index'].to_list()
+        assert index[0] == 0
+        assert index[-1] == 9999
+        assert index == sorted(index)
+
+    def test_spike_preserved(self):
+        """A single spike in the middle of a flat series is selected"""
+        df = pl.DataFrame({'used': [1000] * 5000})
+        df = df.with_columns(pl.when(pl.int_range(0, 5000) == 2500).then(9000).otherwise(pl.col('used')).alias('used'))
+        result = downsample_lttb(df, 20)
+        assert 9000 in result['used'].to_list()
+
+    def test_transform_data_format(self):
+        """Data is returned as a dict of lists with sample_index"""
+        result = transform_data_format(self.make_df(1000), max_points=25)
+        assert set(result.keys()) == {'sample_index', 'used', 'idle_cpu'}
+        assert all(len(v) == 25 for v in result.values())
+        assert transform_data_format(pl.DataFrame()) == {}
+
+
+class TestResample:
+
+    stats = {'timestamp': '2025-05-10T12:00:00Z', 'sampleRate': 60}
+
+    def make_df(self, n=180):
+        df = pl.DataFrame({
+            'used': [float(i) for i in range(n)],
+            'idle_cpu': [50.0] * n,
+        })
+        return add_time_column(self.stats, df)
+
+    def test_time_column(self):
+        """Sample times count back from the last timestamp by sampleRate"""
+        times = self.make_df(3)['time'].dt.strftime('%H:%M:%S').to_list()
+        assert times == ['11:58:00', '11:59:00', '12:00:00']
+
+    def test_hourly_buckets(self):
+        """Buckets are left closed and labelled by their start"""
+        result = resample_bitflux_data(self.make_df(), '1h', ['used:max', 'used:p50', 'idle_cpu:mean'])
+        assert result.columns == ['time', 'samples', 'used_max', 'used_p50', 'idle_cpu_mean']
+        assert result['samples'].to_list() == [59, 60, 60, 1]
+        assert result['used_max'].to_list() == [58.0, 118.0, 178.0, 179.0]
+        assert result['idle_cpu_mean'].to_list() == [50.0] * 4
+
+    def test_bare_aggregate_applies_to_all_columns(self):
+        result = resample_bitflux_data(self.make_df(), '1d', ['min'])
+        assert result.columns == ['time', 'samples', 'used_min', 'idle_cpu_min']
+
+    def test_invalid_specs(self):
+        with pytest.raises(ValueError):
+            resample_bitflux_data(self.make_df(), '1h', ['nope:max'])
+        with pytest.raises(ValueError):
+            resample_bitflux_data(self.make_df(), '1h', ['p200'])
+
+    def test_transform_formats_time(self):
+        result = transform_data_format(self.make_df(), max_points=10)
+        assert result['time'][-1] == '2025-05-10T12:00:00.000+00:00'
+
+
+@pytest.fixture(scope='module')
+def payload():
+    return synthetic_payload(*synthetic_ring_buffer(20_000, 60))
+
+
+class TestStreamedDownload:
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+        reset_endpoints()
+        yield tmp_path
+        reset_endpoints()
+
+    def test_split_matches_protobuf(self, tmp_path, payload):
+        expected = downloadstats_pb2.Stats()
+        expected.ParseFromString(payload)
+        for threshold in (len(payload), 1024):
+            download = split_stats(io.BytesIO(payload), str(tmp_path), threshold)
+            meta = downloadstats_pb2.Stats()
+            meta.ParseFromString(download.meta)
+            assert meta.bitflux == b'' and meta.length == expected.length and meta.system == expected.system
+            assert download.parquet.spilled == (threshold == 1024)
+            assert pl.read_parquet(download.parquet.source()).shape == (20_000, 6)
+
+    def test_spill_file_is_removed_with_the_buffer(self, tmp_path, payload):
+        download = split_stats(io.BytesIO(payload), str(tmp_path), 1024)
+        path = download.parquet.path
+        assert os.path.exists(path)
+        del download
+        assert not os.path.exists(path)
+
+    def test_in_memory_source_is_not_copied(self, tmp_path, payload):
+        download = split_stats(io.BytesIO(payload), str(tmp_path))
+        source = download.parquet.source()
+        assert not download.parquet.spilled
+        assert download.parquet.source().getvalue() is source.getvalue()
+        assert pl.read_parquet(source).shape == (20_000, 6)
+
+    def test_truncated(self, tmp_path, payload):
+        with pytest.raises(ValueError, match='Truncated'):
+            split_stats(io.BytesIO(payload[:-10]), str(tmp_path))
+
+    def test_no_samples_reported_on_stderr(self, cache, capsys):
+        stats, _ = synthetic_ring_buffer(10, 60)
+        statspb = downloadstats_pb2.Stats()
+        json_format.ParseDict(stats, statspb)
+        with StandinCatcher() as standin:
+            standin.add_stats('k', statspb.SerializeToString())
+            assert download_stats_by_machine_key('k', standin.url)['sampleRate'] == '60'
+        out, err = capsys.readouterr()
+        assert out == ''
+        assert 'No bitflux data received for k' in err
+
+    def test_spilled_download_is_kept_for_fallback(self, cache, payload, monkeypatch):
+        monkeypatch.setattr(stream, 'SPILL_THRESHOLD', 1024)
+        with StandinCatcher() as standin:
+            standin.add_stats('k', payload)
+            stats, df = download_bitflux_data('k', standin.url)
+            assert stats['length'] == 20_000 and len(df) == 20_000
+            files = os.listdir(cache / PAYLOAD_DIR)
+            assert sorted(os.path.splitext(f)[1] for f in files) == ['.parquet', '.pb']
+
+            standin.error_rate = 1.0
+            stale_stats, stale_df = download_bitflux_data('k', standin.url)
+        assert 'staleSince' in stale_stats
+        assert stale_df.equals(df)
+
+
+class TestChunkedSummary:
+
+    @staticmethod
+    def parquet(df, row_group_size=None):
+        buffer = io.BytesIO()
+        df.write_parquet(buffer, row_group_size=row_group_size)
+        return buffer
+
+    @pytest.mark.parametrize('wrapped', [False, True])
+    def test_matches_exact_summary(self, wrapped):
+        stats, df = synthetic_ring_buffer(20_000, 60, wrapped=wrapped)
+        exact, requirements = summarize_bitflux_data(stats, strip_warmup(stats, scale_bitflux_data(stats, df)))
+        summary, chunked_requirements = summarize_chunked(stats, self.parquet(df, 3000), chunk_rows=7000)
+        assert list(summary) == list(exact)
+        for col, values in exact.items():
+            assert list(summary[col]) == list(values)
+            for stat in ('count', 'null_count', 'min', 'max', 'sum'):
+                assert summary[col].get(stat) == values.get(stat)
+            assert summary[col]['mean'] == pytest.approx(values['mean'], rel=1e-6)
+            assert summary[col]['std'] == pytest.approx(values['std'], rel=1e-6)
+            for stat in [k for k in values if k.endswith('%')] + ['median']:
+                assert summary[col][stat] == pytest.approx(values[stat], rel=RELATIVE_ACCURACY)
+        assert chunked_requirements['used_memory'] == requirements['used_memory']
+
+    def test_warmup_is_held_back(self):
+        # A spike early on makes strip_warmup cut the series there
+        reclaimable = [100] * 100
+        reclaimable[10] = 100_000
+        df = pl.DataFrame({
+            'free': [1000] * 100, 'reclaimable': reclaimable, 'idle_cpu': [50.0] * 100,
+        }, schema_overrides={'free': pl.UInt32, 'reclaimable': pl.UInt32, 'idle_cpu': pl.Float32})
+        stats = {'sampleRate': '60', 'unitsize': 1, 'head': 99, 'tail': 0, 'length': 100,
+                 'system': {'memTotal': '1000000', 'numCpus': '2'}}
+        expected = strip_warmup(stats, scale_bitflux_data(stats, df))
+        assert len(expected) == 90
+        summary, _ = summarize_chunked(stats, self.parquet(df), chunk_rows=7)
+        assert summary['reclaimable']['count'] == 90
+        assert summary['reclaimable']['max'] == 100_000
+
+    def test_sketch_merges_and_stays_accurate(self):
+        values = pl.Series(range(100_000), dtype=pl.Float64) * 1.5
+        whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+        whole.add(values)
+        left.add(values[:30_000])
+        right.add(values[30_000:])
+        left.merge(right)
+        assert left.bins == whole.bins and left.zero_count == whole.zero_count == 1
+        for q in (0.5, 0.9, 0.99, 0.999):
+            assert whole.quantile(q) == pytest.approx(values.quantile(q, 'nearest'), rel=RELATIVE_ACCURACY)
+        assert len(whole.bins) < 1000
+        with pytest.raises(ValueError):
+            left.merge(QuantileSketch(0.05))
+
+    def test_summarize_stats_by_machine_key(self, tmp_path, monkeypatch, payload):
+        monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+        # Spilled, so the chunks are read from the memory mapped file
+        monkeypatch.setattr(stream, 'SPILL_THRESHOLD', 1024)
+        reset_store()
+        reset_endpoints()
+        with StandinCatcher() as standin:
+            standin.add_stats('k', payload)
+            output = summarize_stats_by_machine_key('k', standin.url, chunk_rows=4096)
+        reset_store()
+        reset_endpoints()
+        assert output['summary']['used']['count'] == 20_000
+        assert output['summary_requirements']['vcpu_usage'] > 0
+        assert 'data' not in output and 'stale_since' not in output
+        # Kept for fallback like any download that decoded
+        assert sorted(os.path.splitext(f)[1] for f in os.listdir(tmp_path / PAYLOAD_DIR)) == ['.parquet', '.pb']
+
+
+class TestFleetPercentiles:
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+        reset_store()
+        reset_endpoints()
+        yield tmp_path
+        reset_store()
+        reset_endpoints()
+
+    def test_aggregate_round_trips_through_json(self):
+        stats, df = synthetic_ring_buffer(5000, 60)
+        aggregate = aggregate_frame(scale_bitflux_data(stats, df))['used']
+        restored = ColumnAggregate.from_dict(json.loads(json.dumps(aggregate.to_dict())))
+        assert restored.to_dict() == aggregate.to_dict()
+        assert restored.quantile(0.99) == aggregate.quantile(0.99)
+
+    def test_merged_sketches_match_concatenated_samples(self, cache):
+        with StandinCatcher() as standin:
+            keys = [key for key, _ in catcher.populate(standin, machines=3, rows=3000)]
+            # One machine summarized by the full download path, the others are refreshed
+            download_stats_by_machine_key(keys[0], standin.url)
+            result = fleet_percentiles(keys, standin.url, ['p50', 'p99'], ['used', 'idle_cpu'])
+            assert result['machines'] == 3 and result['refreshed'] == 2 and not result['failed']
+            requests = standin.requests['/downloadstats']
+            again = fleet_percentiles(keys, standin.url, ['p50', 'p99'], ['used', 'idle_cpu'])
+            assert again['refreshed'] == 0 and standin.requests['/downloadstats'] == requests
+            frames = [load_bitflux_data(key, standin.url)[1] for key in keys]
+        used = pl.concat(frames)['used']
+        assert sorted(result['columns']) == ['idle_cpu', 'used']
+        assert result['columns']['used']['count'] == len(used)
+        assert result['columns']['used']['max'] == used.max()
+        for spec, q in (('p50', 0.5), ('p99', 0.99)):
+            assert result['columns']['used'][spec] == pytest.approx(used.quantile(q, 'nearest'), rel=RELATIVE_ACCURACY)
+
+    def test_failed_machines_are_reported(self, cache):
+        with StandinCatcher() as standin:
+            key = catcher.populate(standin, machines=1, rows=500)[0][0]
+            result = fleet_percentiles([key, 'missing'], standin.url)
+        assert result['machines'] == 1 and list(result['failed']) == ['missing']
+        assert set(result['columns']['used']) == {'count', 'mean', 'min', 'max', 'p90', 'p99'}
+        with pytest.raises(ValueError):
+            fleet_percentiles([key], 'http://unused', ['q90'])
+
+
+class TestHistory:
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+        monkeypatch.delenv('BITFLUX_HISTORY_DAYS', raising=False)
+        reset_endpoints()
+        yield tmp_path
+        reset_endpoints()
+
+    @staticmethod
+    def frame(end, rows=3000, sample_rate=60):
+        stats, df = synthetic_ring_buffer(rows, sample_rate)
+        stats['timestamp'] = end.isoformat()
+        return stats, add_time_column(stats, scale_bitflux_data(stats, df))
+
+    def test_appends_only_new_samples(self, cache):
+        end = datetime.now(timezone.utc).replace(microsecond=0)
+        stats, df = self.frame(end)
+        assert history.append_history('k', stats, df) == 3000
+        # The next download overlaps, and its reconstructed times are off by a few ms
+        stats, df = self.frame(end + timedelta(minutes=10, milliseconds=7))
+        assert history.append_history('k', stats, df) == 10
+        stored = history.scan_history('k').collect()
+        assert len(stored) == 3010 and stored[TIME_COLUMN].is_sorted()
+        assert stored[TIME_COLUMN].max() == df[TIME_COLUMN].max()
+        recent = history.scan_history('k', start=end - timedelta(hours=1)).collect()
+        assert len(recent) == 71
+
+    def test_compaction_and_retention(self, cache, monkeypatch):
+        monkeypatch.setattr(history, 'COMPACT_PARTS', 3)
+        end = datetime.now(timezone.utc).replace(hour=12, minute=0, second=0, microsecond=0)
+        for i in range(3):
+            history.append_history('k', *self.frame(end + timedelta(minutes=10 * i), rows=100))
+        today = history.machine_history_dir('k') / f'{history.PARTITION_COLUMN}={end.date().isoformat()}'
+        # The third part compacted the partition into one file
+        assert len(list(today.glob('*.parquet'))) == 1
+        assert history.scan_history('k').select(pl.len()).collect().item() == 120
+
+        monkeypatch.setenv('BITFLUX_HISTORY_DAYS', '2')
+        old = end - timedelta(days=5)
+        monkeypatch.setattr(history, 'last_sample_time', lambda machine_key: None)
+        history.append_history('k', *self.frame(old, rows=10))
+        assert history.scan_history('k').select(pl.len()).collect().item() == 120
+
+    def test_disabled(self, cache, monkeypatch):
+        monkeypatch.setenv('BITFLUX_HISTORY_DAYS', '0')
+        assert history.append_history('k', *self.frame(datetime.now(timezone.utc))) == 0
+        assert history.scan_history('k') is None
+
+    def test_resample_history_outlives_the_ring_buffer(self, cache):
+        end = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        with StandinCatcher() as standin:
+            for i in range(2):
+                stats, df = synthetic_ring_buffer(1000, 60)
+                stats['timestamp'] = (end + timedelta(days=i)).isoformat()
+                standin.add_stats('k', synthetic_payload(stats, df))
+                buffer = resample_stats_by_machine_key('k', standin.url, '1d', ['used:max'])
+                stored = resample_stats_by_machine_key('k', standin.url, '1d', ['used:max'], history=True)
+        assert sum(buffer['data']['samples']) == 1000
+        assert sum(stored['data']['samples']) == 2000
+
+    def test_broken_history_does_not_fail_downloads(self, cache, capsys):
+        stats, df = synthetic_ring_buffer(100, 60)
+        stats['timestamp'] = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+        with StandinCatcher() as standin:
+            standin.add_stats('k', synthetic_payload(stats, df))
+            load_bitflux_data('k', standin.url)
+            # A part file that is not parquet
+            [part] = history.machine_history_dir('k').glob('*/*.parquet')
+            part.write_bytes(b'not parquet')
+            _, scaled_df = load_bitflux_data('k', standin.url)
+        assert len(scaled_df) == 100
+        out, err = capsys.readouterr()
+        assert out == ''
+        assert 'Failed to append to the history of k' in err
+
+    def test_history_keeps_the_warmup(self, cache):
+        stats, df = synthetic_ring_buffer(1000, 60)
+        stats['timestamp'] = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+        # A spike early on makes strip_warmup cut the series there
+        df = df.with_columns(pl.when(pl.int_range(pl.len()) == 10).then(2**32 - 1)
+                             .otherwise(pl.col('reclaimable')).cast(pl.UInt32).alias('reclaimable'))
+        with StandinCatcher() as standin:
+            standin.add_stats('k', synthetic_payload(stats, df))
+            _, scaled_df = load_bitflux_data('k', standin.url)
+            resampled = resample_stats_by_machine_key('k', standin.url, '1d', ['used:max'], history=True)
+        assert len(scaled_df) == 990
+        stored = history.scan_history('k')
+        assert stored.select(pl.len()).collect().item() == 1000
+        assert strip_warmup_lazy(stats, stored).collect().equals(strip_warmup(stats, stored.collect()))
+        assert sum(resampled['data']['samples']) == 990
+
+
+class TestQuery:
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+        monkeypatch.setenv('BITFLUX_HISTORY_DAYS', '10000')
+        reset_store()
+        reset_registry()
+        reset_endpoints()
+        yield tmp_path
+        reset_store()
+        reset_registry()
+        reset_endpoints()
+
+    def test_rejects_anything_but_a_select(self):
+        check_query("-- daily peaks\nWITH d AS (SELECT 1 AS x) SELECT x FROM d;")
+        check_query("SELECT '--;' AS \"read_x\" FROM history")
+        for query in ("DROP TABLE history", "SELECT 1; SELECT 2", "SELECT * FROM read_csv('/etc/passwd')",
+                      "SELECT '--' AS x, * FROM read_csv('/tmp/probe.csv')",
+                      "SELECT * FROM \"read_csv\"('/tmp/probe.csv')"):
+            with pytest.raises(ValueError):
+                check_query(query)
+
+    def test_plan_scans_only_the_tables(self, tmp_path):
+        pl.DataFrame({'a': [1]}).write_parquet(tmp_path / 'table.parquet')
+        pl.DataFrame({'b': [2]}).write_csv(tmp_path / 'probe.csv')
+        tables = {'history': pl.scan_parquet(tmp_path / 'table.parquet'), 'prices': pl.LazyFrame({'c': [3]})}
+        context = pl.SQLContext(tables)
+        check_plan(context.execute("SELECT * FROM history CROSS JOIN prices", eager=False), tables)
+        with pytest.raises(ValueError, match='Only the tables'):
+            check_plan(context.execute(f"SELECT * FROM read_csv('{tmp_path / 'probe.csv'}')", eager=False), tables)
+        with pytest.raises(ValueError, match='Only the tables'):
+            check_plan(context.execute(f"SELECT * FROM read_parquet('{tmp_path / 'table.parquet'}')", eager=False), tables)
+
+    def test_tables(self, cache):
+        with StandinCatcher() as standin:
+            keys = [key for key, _ in catcher.populate(standin, machines=2, rows=1000)]
+            for key in keys:
+                download_stats_by_machine_key(key, standin.url)
+        get_registry().record([{'machineKey': keys[0], 'instanceId': 'hash0', 'amiId': 'ami-1'}])
+
+        result = run_query("SELECT machine_key, COUNT(*) AS n, MAX(used) AS peak, MIN(time) AS first "
+                           "FROM history GROUP BY machine_key ORDER BY machine_key")
+        assert result['columns'] == ['machine_key', 'n', 'peak', 'first'] and result['rows'] == 2
+        assert result['data']['machine_key'] == sorted(keys)
+        assert result['data']['n'][0] <= 1000
+        first = history.scan_history(sorted(keys)[0]).select(pl.col(TIME_COLUMN).min()).collect()
+        assert result['data']['first'][0] == format_time_columns(first)[TIME_COLUMN][0]
+        assert result['data']['first'][0].endswith('+00:00')
+
+        result = run_query("SELECT s.machine_key, m.ami_id, s.median, s.p99 FROM summaries s "
+                           "JOIN machines m ON s.machine_key = m.machine_key WHERE s.\"column\" = 'used'")
+        assert result['data']['machine_key'] == [keys[0]] and result['data']['ami_id'] == ['ami-1']
+        assert result['data']['p99'][0] >= result['data']['median'][0]
+
+        result = run_query("SELECT updated_at, CAST(updated_at AS TIMESTAMP) AS naive FROM machines")
+        assert result['data']['updated_at'] == result['data']['naive']
+        assert result['data']['updated_at'][0].endswith('+00:00')
+
+        result = run_query("SELECT * FROM history", max_rows=5)
+        assert result['rows'] == 5 and result['truncated']
+        assert len(result['data']['used']) == 5
+
+        assert run_query("SELECT * FROM prices")['rows'] == 0
+        with pytest.raises(ValueError, match='Query failed'):
+            run_query("SELECT nope FROM history")
+
+
+class TestWhatIf:
+
+    def test_exceedance_matches_the_broadcast_matrix(self):
+        values = pl.Series([5.0, 1.0, None, 3.0, 3.0, 8.0])
+        thresholds = pl.Series([0.0, 3.0, 4.5, 8.0, 10.0])
+        fraction, excess = exceedance(values, thresholds)
+        matrix = pl.DataFrame({'v': values.drop_nulls()}).join(pl.DataFrame({'t': thresholds}), how='cross')
+        expected = (matrix.group_by('t', maintain_order=True)
+                    .agg(fraction=(pl.col('v') > pl.col('t')).mean(), excess=(pl.col('v') - pl.col('t')).clip(0).mean()))
+        assert fraction.to_list() == expected['fraction'].to_list()
+        assert excess.to_list() == pytest.approx(expected['excess'].to_list())
+
+    def test_candidates(self):
+        gib = 2**30
+        stats = {'system': {'numCpus': '4'}}
+        df = pl.DataFrame({
+            'used': [1 * gib, 2 * gib, 3 * gib, 6 * gib],
+            'reclaimable': [gib] * 4,
+            'swap_used': [0, 0, gib, gib],
+            # 1, 2, 3 and 4 busy vCPUs
+            'idle_cpu': [75.0, 50.0, 25.0, 0.0],
+        })
+        candidates = pl.DataFrame({'instance_type': ['small', 'large'], 'vcpu': [2, 8], 'memory_gib': [3.75, 16.0]})
+        small, large = simulate_candidates(stats, df, candidates, memory_overhead=0.25).iter_rows(named=True)
+        # 3.75 GiB less the overhead holds 3 GiB
+        assert small['over_capacity'] == 0.25 and small['cache_pressure'] == 0.5
+        assert small['swap_pressure'] == 0.5 and small['swap_max'] == pytest.approx(4 * gib)
+        assert small['cpu_saturation'] == 0.5 and small['cpu_excess'] == 0.75
+        assert large['over_capacity'] == large['swap_pressure'] == large['cpu_saturation'] == 0
+        assert large['swap_max'] == 0 and large['cpu_p99_utilization'] == 0.5
+
+    def test_simulate_instances(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+        reset_store()
+        reset_endpoints()
+        try:
+            with StandinCatcher() as standin, replay_pricing([synthetic_price_fixture()]):
+                key = catcher.populate(standin, machines=1, rows=2000)[0][0]
+                result = simulate_instances(key, standin.url, 'us-east-1', 'm5.*', max_candidates=4)
+        finally:
+            reset_store()
+            reset_endpoints()
+        data = result['data']
+        assert result['samples'] <= 2000 and result['candidates'] == 10 and len(data['instance_type']) == 4
+        assert all(t.startswith('m5.') for t in data['instance_type'])
+        if result['fitting']:
+            assert data['fits'][0] and data['price_per_hour'][0] == min(
+                p for p, fits in zip(data['price_per_hour'], data['fits']) if fits)
+
+
+class TestCpuCredits:
+
+    def test_balance_matches_the_clamped_recurrence(self, monkeypatch):
+        import random
+        from . import credits
+        random.seed(7)
+        # Small blocks so the test crosses block boundaries as well as the bounds
+        monkeypatch.setattr(credits, 'BALANCE_BLOCK', 16)
+        delta = [random.uniform(-3, 2.5) for _ in range(500)]
+        balance, expected = 10.0, []
+        for d in delta:
+            balance = min(40.0, max(0.0, balance + d))
+            expected.append(balance)
+        assert credit_balance(pl.Series(delta), 40, 10).to_list() == pytest.approx(expected)
+        assert credit_balance(pl.Series([], dtype=pl.Float64), 40, 10).is_empty()
+
+    def test_burstable_candidates(self):
+        # 2 busy vCPUs for 12 hours, then 12 idle hours, one sample a minute
+        stats = {'sampleRate': 60, 'system': {'numCpus': '2'}}
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        df = pl.DataFrame({
+            TIME_COLUMN: pl.datetime_range(start, start + timedelta(minutes=1439), '1m', eager=True),
+            'idle_cpu': [0.0] * 720 + [100.0] * 720,
+        })
+        candidates = pl.DataFrame({
+            'region': 'us-east-1', 'instance_type': ['t3.micro', 't3.2xlarge', 'm5.large'],
+            'vcpu': [2, 8, 2], 'memory_gib': [1.0, 32.0, 8.0], 'price_per_hour': [0.01, 0.33, 0.1],
+        })
+        results, trajectories = simulate_credits(stats, df, candidates, every='6h')
+        micro, large = results.iter_rows(named=True)
+        assert (micro['instance_type'], large['instance_type']) == ('t3.micro', 't3.2xlarge')
+        # t3.micro keeps 288 credits and earns 0.2 a minute while spending 2, so it runs out after 160 minutes
+        assert micro['max_credits'] == 288 and micro['min_balance'] == 0
+        assert micro['throttling_risk'] == pytest.approx((720 - 160) / 1440, abs=1 / 1440)
+        assert micro['surplus_cost_per_hour'] == pytest.approx(560 * 1.8 / 60 * 0.05 / 24, rel=0.01)
+        assert large['throttling_risk'] == 0 and large['final_balance'] == 1
+        assert trajectories.columns == [TIME_COLUMN, 'us-east-1/t3.micro', 'us-east-1/t3.2xlarge'] and len(trajectories) == 4
+        assert trajectories['us-east-1/t3.micro'].to_list()[:2] == [pytest.approx(0), 0]
+
+    def test_candidates_from_several_regions(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+        reset_store()
+        reset_endpoints()
+        try:
+            with StandinCatcher() as standin:
+                key = catcher.populate(standin, machines=1, rows=2000)[0][0]
+                for region, location in (('us-east-1', 'US East (N. Virginia)'), ('eu-west-1', 'EU (Ireland)')):
+                    with replay_pricing([synthetic_price_fixture(region, location)]):
+                        price_catalog(region)
+                # Without a region both cached price lists are candidates
+                result = simulate_cpu_credits(key, standin.url, instance_types='t3.*')
+                ranked = simulate_instances(key, standin.url, instance_types='t3.*')
+        finally:
+            reset_store()
+            reset_endpoints()
+        assert sorted(set(result['candidates']['region'])) == ['eu-west-1', 'us-east-1']
+        assert {'us-east-1/t3.large', 'eu-west-1/t3.large'} <= set(result['trajectories'])
+        risks = [r for r in ranked['data']['throttling_risk'] if r is not None]
+        assert len(risks) == len(result['candidates']['instance_type']) == 8
+
+    def test_simulate_cpu_credits(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+        reset_store()
+        reset_endpoints()
+        try:
+            with StandinCatcher() as standin, replay_pricing([synthetic_price_fixture()]):
+                key = catcher.populate(standin, machines=1, rows=2000)[0][0]
+                result = simulate_cpu_credits(key, standin.url, 'us-east-1')
+                ranked = simulate_instances(key, standin.url, max_candidates=500)
+        finally:
+            reset_store()
+            reset_endpoints()
+        candidates = result['candidates']
+        # The synthetic price list has medium to 2xlarge of each family
+        assert len(candidates['instance_type']) == 12 and set(candidates['instance_family']) == {'t3', 't3a', 't4g'}
+        assert candidates['throttling_risk'] == sorted(candidates['throttling_risk'])
+        assert set(result['trajectories']) == {TIME_COLUMN, *(f'us-east-1/{t}' for t in candidates['instance_type'])}
+        risks = dict(zip(ranked['data']['instance_type'], ranked['data']['throttling_risk']))
+        assert risks['m5.large'] is None and risks['t3.large'] == candidates['throttling_risk'][candidates['instance_type'].index('t3.large')]
@@ -3,48 +3,60 @@ from ..bitflux_catcher_api import DefaultApi
 from ..bitflux_catcher_api import Configuration
 from ..bitflux_catcher_api import ApiClient
 from ..bitflux_catcher_api import DownloadStatsRequest
-from ..machine_lookup import machine_lookup
+from ..machine_lookup import machine_key_by_instance_id
 from ..ec2_tools import get_ec2_instance_data
 from ..bitflux_catcher_api import downloadstats_pb2
+from ..bitflux_catcher_api import CatcherUnavailable, call_catcher
+from .stream import SpillBuffer, StatsDownload, stream_download_stats
+from .sketch import aggregate_frame
+from .summaries import save_summary
+from .history import append_history, scan_history
+from ..cache import cache_dir
+from ..metrics import get_metrics
 from google.protobuf import json_format
-from typing import Any, Dict, List
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 import polars as pl
-import io
+from ..tracing import span
+import hashlib
 import math
+import sys
+import os
+from .constants import DEFAULT_MAX_POINTS, TIME_COLUMN
 
-def strip_warmup(stats: Dict[str, Any], df: pl.DataFrame) -> pl.DataFrame:
-    """
-    Strip warmup period from the beginning of the data based on reclaimable memory stabilization.
-    Uses a simple sliding window approach - remove early samples that bring the average down >10%.
-
-    Args:
-        stats: Dictionary containing metadata including sample_rate
-        df: DataFrame containing the scaled data with 'reclaimable' column
-
-    Returns:
-        DataFrame with warmup period removed
-    """
-    if df.is_empty():
-        return df
+# Same format as the 'timestamp' field of the stats
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%S%.3f%:z'
+# Last good /downloadstats payload per machine, under cache_dir(), served while the catcher is unavailable
+PAYLOAD_DIR = 'downloadstats'
 
-    sample_rate = int(stats['sampleRate'])
-    total_samples = len(df)
+def max_warmup_samples(sample_rate: int, total_samples: int) -> int:
+    """The most samples strip_warmup may remove: an hour's worth or 30% of the series, whichever is less."""
     total_time_seconds = total_samples * sample_rate
 
     # Calculate maximum strip constraints
     max_strip_time_seconds = min(3600, total_time_seconds * 3 // 10)  # 1 hour or 30%
-    max_strip_samples = int(max_strip_time_seconds / sample_rate)
+    return int(max_strip_time_seconds / sample_rate)
 
-    # Get reclaimable values as a list for easier processing
-    reclaimable = df['reclaimable']
+def warmup_strip_count(sample_rate: int, total_samples: int, suffix_mean: Callable[[int], float]) -> int:
+    """
+    Number of samples strip_warmup removes from the beginning of a series.
+
+    Args:
+        sample_rate: Seconds between samples
+        total_samples: Length of the series
+        suffix_mean: Mean reclaimable memory of the samples from the given position on
+
+    Returns:
+        How many samples to strip
+    """
+    max_strip_samples = max_warmup_samples(sample_rate, total_samples)
 
     strip_count = max_strip_samples
-    last_mean = reclaimable.mean()
+    last_mean = suffix_mean(0)
 
     for i in range(max_strip_samples+1):
         strip_count = max_strip_samples - i
-        testcol = reclaimable[strip_count:]
-        testmean = testcol.mean()
+        testmean = suffix_mean(strip_count)
         testdelta = testmean - last_mean
         threshold = testmean * 0.1
 
@@ -55,37 +67,152 @@ def strip_warmup(stats: Dict[str, Any], df: pl.DataFrame) -> pl.DataFrame:
                 break
         last_mean = testmean
 
+    return strip_count
+
+def strip_warmup(stats: Dict[str, Any], df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Strip warmup period from the beginning of the data based on reclaimable memory stabilization.
+    Uses a simple sliding window approach - remove early samples that bring the average down >10%.
+
+    Args:
+        stats: Dictionary containing metadata including sample_rate
+        df: DataFrame containing the scaled data with 'reclaimable' column
+
+    Returns:
+        DataFrame with warmup period removed
+    """
+    if df.is_empty():
+        return df
+
+    total_samples = len(df)
+    reclaimable = df['reclaimable']
+    strip_count = warmup_strip_count(int(stats['sampleRate']), total_samples, lambda start: reclaimable[start:].mean())
     return df.slice(strip_count, total_samples - strip_count)
 
-def transform_data_format(scaled_df: pl.DataFrame) -> Dict[str, List[Any]]:
+def strip_warmup_lazy(stats: Dict[str, Any], lf: pl.LazyFrame) -> pl.LazyFrame:
     """
-    Transform data from a list of dictionaries to a dictionary of lists.
+    strip_warmup for a LazyFrame, as returned by scan_history.
+
+    Only the sample count, the reclaimable total and the samples that might
+    be stripped are collected, the rest of the series stays lazy.
+    """
+    total_samples, reclaimable_sum = lf.select(pl.len(), pl.col('reclaimable').sum()).collect().row(0)
+    if total_samples == 0:
+        return lf
+    sample_rate = int(stats['sampleRate'])
+    head = lf.select('reclaimable').head(max_warmup_samples(sample_rate, total_samples)).collect()
+    # Means of the series from each warmup candidate on, from the total and the prefix sums of the head
+    prefix = [0] + head['reclaimable'].cum_sum().to_list()
+    strip_count = warmup_strip_count(
+        sample_rate, total_samples,
+        lambda start: (reclaimable_sum - prefix[start]) / (total_samples - start))
+    return lf.slice(strip_count)
+
+def downsample_lttb(df: pl.DataFrame, max_points: int, index_column: str = 'sample_index') -> pl.DataFrame:
+    """
+    Downsample a DataFrame to at most max_points rows with Largest-Triangle-Three-Buckets.
+
+    The first and last rows are always kept and the rows in between are split
+    into max_points - 2 equal buckets. From each bucket the row forming the
+    largest triangle with the neighbouring buckets is kept, so peaks and dips
+    survive downsampling. To stay vectorized, the previous bucket is represented
+    by its average rather than by the row picked from it. Every numeric column
+    is scaled to [0, 1] and the triangle areas are summed, so the selected rows
+    preserve the shape of all series at once.
 
     Args:
-        scaled_df: Polars DataFrame containing the scaled data
+        df: DataFrame to downsample, in time order
+        max_points: Maximum number of rows to return (at least 3)
+        index_column: Name of the column added with each row's position in df
 
     Returns:
-        Dictionary where keys are column names and values are lists of data points
+        DataFrame with index_column followed by the selected rows of df
     """
+    indexed = df.with_row_index(index_column)
+    n = len(df)
+    max_points = max(3, max_points)
+    if n <= max_points:
+        return indexed
+
+    value_columns = [c for c, dtype in df.schema.items() if dtype.is_numeric()]
+    x = pl.col(index_column).cast(pl.Float64) / (n - 1)
+    scaled = indexed.select(
+        pl.col(index_column),
+        x.alias('_x'),
+        *[
+            ((pl.col(c) - pl.col(c).min()) / pl.when(pl.col(c).max() > pl.col(c).min())
+             .then(pl.col(c).max() - pl.col(c).min()).otherwise(1)).cast(pl.Float64).alias(f'_y{i}')
+            for i, c in enumerate(value_columns)
+        ],
+    )
+    ys = [f'_y{i}' for i in range(len(value_columns))]
+    first = scaled.row(0, named=True)
+    last = scaled.row(n - 1, named=True)
 
-    # Get the last 25 rows of the scaled DataFrame
-    num_rows = min(25, scaled_df.shape[0])
-    data_list = scaled_df.tail(num_rows).to_dicts()
+    buckets = max_points - 2
+    body = scaled.slice(1, n - 2).with_columns(
+        ((pl.col(index_column) - 1) * buckets // (n - 2)).alias('_bucket')
+    )
+    means = body.group_by('_bucket').agg(pl.col(['_x'] + ys).mean()).sort('_bucket')
+    neighbours = means.select(
+        pl.col('_bucket'),
+        *[pl.col(c).shift(1).fill_null(first[c]).alias(f'{c}_a') for c in ['_x'] + ys],
+        *[pl.col(c).shift(-1).fill_null(last[c]).alias(f'{c}_c') for c in ['_x'] + ys],
+    )
+    area = pl.sum_horizontal([
+        ((pl.col('_x_a') - pl.col('_x_c')) * (pl.col(y) - pl.col(f'{y}_a'))
+         - (pl.col('_x_a') - pl.col('_x')) * (pl.col(f'{y}_c') - pl.col(f'{y}_a'))).abs()
+        for y in ys
+    ]) if ys else pl.lit(0.0)
+    picked = (
+        body.join(neighbours, on='_bucket')
+        .with_columns(area.alias('_area'))
+        .group_by('_bucket')
+        .agg(pl.col(index_column).get(pl.col('_area').arg_max()))
+        .get_column(index_column)
+    )
+    keep = pl.concat([pl.Series([0, n - 1], dtype=picked.dtype), picked])
+    return indexed.filter(pl.col(index_column).is_in(keep.implode()))
+
+def transform_data_format(scaled_df: pl.DataFrame, max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, List[Any]]:
+    """
+    Downsample the data and transform it to a dictionary of lists.
 
-    if not data_list:
+    Args:
+        scaled_df: Polars DataFrame containing the scaled data
+        max_points: Maximum number of samples to return for each column
+
+    Returns:
+        Dictionary where keys are column names and values are lists of data points.
+        'sample_index' holds the position of each point in scaled_df and datetime
+        columns are ISO 8601 strings.
+    """
+    if scaled_df.is_empty():
         return {}
 
-    result = {}
-    # Initialize the result dictionary with empty lists for each key
-    for key in data_list[0].keys():
-        result[key] = []
+    return format_time_columns(downsample_lttb(scaled_df, max_points)).to_dict(as_series=False)
 
-    # Populate the lists
-    for data_point in data_list:
-        for key, value in data_point.items():
-            result[key].append(value)
+def ring_buffer_ranges(stats: Dict[str, Any], rows: int) -> List[Tuple[int, int]]:
+    """
+    The (offset, length) runs of a raw ring buffer of rows samples, oldest first.
+
+    Args:
+        stats: Dictionary containing metadata about the stats (head, tail, length)
+        rows: Number of rows in the raw DataFrame
+
+    Returns:
+        One run if the data is contiguous in the buffer, two if it wraps around
+    """
+    # Extract ring buffer parameters
+    head = stats.get('head', 0)
+    tail = stats.get('tail', 0)
+    length = stats.get('length', 0)
 
-    return result
+    if tail <= head:
+        # Data is contiguous in the buffer
+        return [(tail, max(0, min(length, rows - tail)))]
+    # Data wraps around the buffer: from tail to end, and from start to head
+    return [(tail, rows - tail), (0, head + 1)]
 
 def scale_bitflux_data(stats: Dict[str, Any], df: pl.DataFrame) -> pl.DataFrame:
     """
@@ -101,22 +228,24 @@ def scale_bitflux_data(stats: Dict[str, Any], df: pl.DataFrame) -> pl.DataFrame:
     if stats.get('length', 0) == 0:
         return df
 
-    # Extract ring buffer parameters
-    head = stats.get('head', 0)
-    tail = stats.get('tail', 0)
-    length = stats.get('length', 0)
-    unitsize = stats.get('unitsize', 1)
-
     # Reorder the dataframe to represent the correct time sequence
-    if tail <= head:
-        # Data is contiguous in the buffer
-        df_reordered = df.slice(tail, length)
-    else:
-        # Data wraps around the buffer
-        # Concatenate the two parts: from tail to end, and from start to head
-        df_tail_to_end = df.slice(tail, len(df) - tail)
-        df_start_to_head = df.slice(0, head + 1)
-        df_reordered = pl.concat([df_tail_to_end, df_start_to_head])
+    parts = [df.slice(offset, length) for offset, length in ring_buffer_ranges(stats, len(df))]
+    df_reordered = parts[0] if len(parts) == 1 else pl.concat(parts)
+
+    return scale_columns(stats, df_reordered)
+
+def scale_columns(stats: Dict[str, Any], df_reordered: pl.DataFrame) -> pl.DataFrame:
+    """
+    Scale values by unitsize and add the calculated 'used' memory column.
+
+    Args:
+        stats: Dictionary containing metadata about the stats (unitsize, system.memTotal)
+        df_reordered: DataFrame of raw samples, or any run of consecutive ones
+
+    Returns:
+        DataFrame with values properly scaled
+    """
+    unitsize = stats.get('unitsize', 1)
 
     # Scale all columns except idle_cpu by unitsize
     columns_to_scale = [col for col in df_reordered.columns if col != 'idle_cpu']
@@ -149,6 +278,79 @@ def scale_bitflux_data(stats: Dict[str, Any], df: pl.DataFrame) -> pl.DataFrame:
 
     return scaled_df
 
+def add_time_column(stats: Dict[str, Any], df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Add a datetime column with the time each sample was taken.
+
+    The stats only carry the time of the last sample and the interval between
+    samples, so sample i of n is at timestamp - (n - 1 - i) * sampleRate.
+
+    Args:
+        stats: Dictionary containing metadata including timestamp and sampleRate
+        df: DataFrame in time order, as returned by scale_bitflux_data
+
+    Returns:
+        DataFrame with a UTC TIME_COLUMN added
+    """
+    end = datetime.fromisoformat(stats['timestamp']).astimezone(timezone.utc)
+    sample_rate = int(stats['sampleRate'])
+    last = len(df) - 1
+    return df.with_columns(
+        (pl.lit(end) - pl.duration(seconds=(last - pl.int_range(0, pl.len(), dtype=pl.Int64)) * sample_rate))
+        .dt.convert_time_zone('UTC')
+        .alias(TIME_COLUMN)
+    )
+
+def resample_bitflux_data(df: Union[pl.DataFrame, pl.LazyFrame], every: str = '1h', aggs: Optional[List[str]] = None) -> pl.DataFrame:
+    """
+    Aggregate the data into fixed time buckets with group_by_dynamic.
+
+    Args:
+        df: DataFrame with TIME_COLUMN, as returned by load_bitflux_data, or
+            a LazyFrame like it, as returned by scan_history
+        every: Bucket width as a polars duration string (e.g. '15m', '1h', '1d')
+        aggs: Aggregates to compute. Each entry is either '<agg>' for every column
+              or '<column>:<agg>' for one column. <agg> is one of mean, min, max,
+              median, sum, std or pNN for the NNth percentile (e.g. p95, p99.9).
+              Defaults to ['mean', 'max', 'p95'].
+
+    Returns:
+        DataFrame with one row per bucket: TIME_COLUMN (bucket start), 'samples',
+        and one '<column>_<agg>' column per requested aggregate
+    """
+    aggs = aggs or ['mean', 'max', 'p95']
+    value_columns = [c for c, dtype in df.collect_schema().items() if dtype.is_numeric()]
+    exprs = []
+    for spec in aggs:
+        column, _, agg = spec.rpartition(':')
+        if column and column not in value_columns:
+            raise ValueError(f"Unknown column '{column}', expected one of {value_columns}")
+        for col in [column] if column else value_columns:
+            exprs.append(_aggregate_expr(col, agg).alias(f'{col}_{agg}'))
+    resampled = (
+        df.sort(TIME_COLUMN)
+        .group_by_dynamic(TIME_COLUMN, every=every, closed='left', label='left')
+        .agg(pl.len().alias('samples'), *exprs)
+    )
+    return resampled.collect() if isinstance(resampled, pl.LazyFrame) else resampled
+
+def _aggregate_expr(column: str, agg: str) -> pl.Expr:
+    col = pl.col(column)
+    if agg in ('mean', 'min', 'max', 'median', 'sum', 'std'):
+        return getattr(col, agg)()
+    if agg.startswith('p'):
+        try:
+            quantile = float(agg[1:]) / 100
+        except ValueError:
+            quantile = -1
+        if 0 <= quantile <= 1:
+            return col.quantile(quantile, 'nearest')
+    raise ValueError(f"Unknown aggregate '{agg}', expected mean, min, max, median, sum, std or pNN")
+
+def format_time_columns(df: pl.DataFrame) -> pl.DataFrame:
+    """Convert datetime columns to ISO 8601 strings so the output is JSON serializable."""
+    return df.with_columns(pl.col(pl.Datetime).dt.strftime(TIME_FORMAT))
+
 def format_bytes(bytes_value):
     """Convert bytes to human readable format (GiB, MiB, KiB, B)"""
     if bytes_value >= 1024**3:  # GiB
@@ -160,6 +362,31 @@ def format_bytes(bytes_value):
     else:  # Bytes
         return f"{bytes_value} B"
 
+def summary_percentiles(n: int) -> List[float]:
+    """Percentiles summarized for n samples: 90%, 95% and as many more nines as n supports, up to 99.999%."""
+    # 1. Decide max "9's" = floor(log10(n))
+    #    E.g. n=1000 → log10(1000)=3 → up to .999
+    max_nines = max(1, int(math.floor(math.log10(n))))
+
+    # (Optional) Cap it so you don't go crazy if n is huge
+    max_nines = min(max_nines, 5)  # at most .99999
+
+    # 2. Build percentiles: for k in 1..max_nines, percentile = 1 - 10**(-k)
+    percentiles = [1 - 10**(-k) for k in range(1, max_nines+1)]
+    # 3. Add 95th percentile for fun
+    percentiles.insert(1, 0.95)
+
+    return percentiles
+
+def summary_requirements(stats: Dict[str, Any], summary: Dict[str, Any]) -> Dict[str, Any]:
+    """The used memory and vCPUs the workload needs, from the median used memory and the 90th percentile of idle_cpu."""
+    requirements = {}
+    requirements['used_memory'] = format_bytes(summary['used']['median'])
+    cpu_usage = 100.0 - float(summary['idle_cpu']['90%'])
+    cpu_usage = cpu_usage / 100.0
+    requirements['vcpu_usage'] = cpu_usage * int(stats['system']['numCpus'])
+    return requirements
+
 def summarize_bitflux_data(stats: Dict[str,Any], df: pl.DataFrame) -> Dict[str, Any]:
     """
     Summarize bitflux data into a structured dictionary with statistical metrics.
@@ -173,20 +400,10 @@ def summarize_bitflux_data(stats: Dict[str,Any], df: pl.DataFrame) -> Dict[str,
     if df.is_empty():
         return {"error": "No data available for summary"}
 
-    # Suppose df is your DataFrame
-    n = len(df)
+    percentiles = summary_percentiles(len(df))
 
-    # 1. Decide max "9's" = floor(log10(n))
-    #    E.g. n=1000 → log10(1000)=3 → up to .999
-    max_nines = max(1, int(math.floor(math.log10(n))))
-
-    # (Optional) Cap it so you don't go crazy if n is huge
-    max_nines = min(max_nines, 5)  # at most .99999
-
-    # 2. Build percentiles: for k in 1..max_nines, percentile = 1 - 10**(-k)
-    percentiles = [1 - 10**(-k) for k in range(1, max_nines+1)]
-    # 3. Add 95th percentile for fun
-    percentiles.insert(1, 0.95)
+    # Only the measurements are summarized, not the reconstructed sample times
+    df = df.select(pl.exclude(TIME_COLUMN))
 
     # Get basic statistics using describe
     stats_df = df.describe(percentiles=percentiles)
@@ -226,79 +443,218 @@ def summarize_bitflux_data(stats: Dict[str,Any], df: pl.DataFrame) -> Dict[str,
         if col not in ['idle_cpu']:  # Add other columns to exclude if needed
             summary[col]['sum'] = float(df[col].sum())
 
-    requirements = {}
-    requirements['used_memory'] = format_bytes(summary['used']['median'])
-    cpu_usage = 100.0 - float(summary['idle_cpu']['90%'])
-    cpu_usage = cpu_usage / 100.0
-    requirements['vcpu_usage'] = cpu_usage * int(stats['system']['numCpus'])
-    return summary, requirements
+    return summary, summary_requirements(stats, summary)
+
+def _payload_paths(machine_key: str) -> Tuple[str, str]:
+    """Where the last good download of machine_key keeps its Stats message and its parquet file."""
+    directory = cache_dir() / PAYLOAD_DIR
+    directory.mkdir(exist_ok=True)
+    name = hashlib.sha256(machine_key.encode()).hexdigest()
+    return str(directory / f"{name}.pb"), str(directory / f"{name}.parquet")
+
+def save_download(machine_key: str, download: StatsDownload) -> None:
+    """Keep download as the last good download for machine_key, moving a spilled parquet file into place."""
+    meta_path, parquet_path = _payload_paths(machine_key)
+    download.parquet.persist(parquet_path)
+    tmp = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(download.meta)
+    os.replace(tmp, meta_path)
+
+def cached_download(machine_key: str) -> Optional[Tuple[StatsDownload, float]]:
+    """The last good download for machine_key and when it was saved, or None."""
+    meta_path, parquet_path = _payload_paths(machine_key)
+    try:
+        with open(meta_path, 'rb') as f:
+            meta = f.read()
+        return StatsDownload(meta, SpillBuffer.from_path(parquet_path)), os.path.getmtime(meta_path)
+    except FileNotFoundError:
+        return None
+
+def fetch_bitflux_download(machine_key: str, url: str) -> Tuple[Dict[str, Any], StatsDownload]:
+    """
+    Download the stats for a machine without decoding the ring buffer.
+
+    The response is streamed: the embedded parquet file is kept once, in
+    memory or beyond SPILL_THRESHOLD in a file that polars memory maps.
+    While the catcher is unavailable the last good download is used instead,
+    and the stats get a 'staleSince' field with the time it was made.
+    Pass a fresh download that decoded to save_download, so it can be
+    fallen back to.
 
-def download_stats_by_machine_key(machine_key: str, url: str) -> Dict[str, Any]:
-    # Initialize API client
-    configuration = Configuration(host=url)
+    Returns:
+        The stats metadata and the download with the parquet file
+    """
+    # Initialize API client, retries are left to call_catcher
+    configuration = Configuration(host=url, retries=False)
     with ApiClient(configuration) as api_client:
         api_instance = DefaultApi(api_client)
         body = DownloadStatsRequest(machine_key=machine_key)
-
-        response = None
-        try:
-            # Call the API
-            response = api_instance.download_stats(download_stats_request=body)
-        except Exception as e:
-            raise Exception(f"Error calling download_stats: {e}")
-
-        # Parse Protobuf response
+        directory = str(cache_dir() / PAYLOAD_DIR)
+        os.makedirs(directory, exist_ok=True)
+
+        stale_since = None
+        with span('catcher.download', machine_key=machine_key) as s:
+            try:
+                # Call the API
+                download = call_catcher(url, 'downloadstats', lambda timeout: stream_download_stats(
+                    api_instance, body, directory, _request_timeout=timeout))
+            except CatcherUnavailable as e:
+                cached = cached_download(machine_key)
+                if cached is None:
+                    raise Exception(f"Error calling download_stats: {e}")
+                download, stale_since = cached
+                get_metrics().catcher_request('downloadstats', 'fallback')
+                s.set('stale', True)
+            except Exception as e:
+                raise Exception(f"Error calling download_stats: {e}")
+            s.set('bytes', download.size)
+            s.set('spilled', download.parquet.spilled)
+
+    # Parse Protobuf response, without the parquet file
+    with span('protobuf.parse'):
         statspb = downloadstats_pb2.Stats()
-        statspb.ParseFromString(response)
-        bitfluxstats = statspb.bitflux
-        statspb.bitflux = b''
+        statspb.ParseFromString(download.meta)
         stats = json_format.MessageToDict(statspb)
-        stats.pop('bitflux', None)
-        if not len(bitfluxstats) > 0:
-            print("No bitflux data received")
-            return stats
+        if stale_since is not None:
+            stats['staleSince'] = datetime.fromtimestamp(stale_since, timezone.utc).isoformat(timespec='milliseconds')
+    return stats, download
 
-        try:
-            df = pl.read_parquet(io.BytesIO(bitfluxstats))
-        except Exception as e:
-            raise Exception(f"Failed to read Parquet: {e}")
-
-        # print(stats)
-        scaled_df = scale_bitflux_data(stats, df)
+def download_bitflux_data(machine_key: str, url: str) -> Tuple[Dict[str, Any], Optional[pl.DataFrame]]:
+    """
+    Download the stats for a machine and decode the raw ring buffer, see fetch_bitflux_download.
 
-        # Strip warmup period
-        scaled_df = strip_warmup(stats, scaled_df)
+    Returns:
+        The stats metadata and the raw DataFrame, or None if the machine sent no samples
+    """
+    stats, download = fetch_bitflux_download(machine_key, url)
+    df = None
+    if download.parquet.size > 0:
+        with span('parquet.decode', bytes=download.parquet.size) as s:
+            try:
+                df = pl.read_parquet(download.parquet.source())
+            except Exception as e:
+                raise Exception(f"Failed to read Parquet: {e}")
+            s.set('rows', len(df))
+    # Only a download that decoded is worth falling back to
+    if 'staleSince' not in stats:
+        save_download(machine_key, download)
+    return stats, df
+
+def load_bitflux_data(machine_key: str, url: str) -> Tuple[Dict[str, Any], Optional[pl.DataFrame]]:
+    """
+    Download the stats for a machine and return them as a time ordered, scaled DataFrame.
 
-        output = {}
-        output['timestamp'] = stats['timestamp']
-        output['sample_rate'] = stats['sampleRate']
-        output['mem_total'] = stats['system']['memTotal']
-        output['swap_total'] = stats['system'].get('swapTotal', 0)
-        output['num_cpus'] = stats['system']['numCpus']
-        output['instance_type'] = ""
+    The ring buffer is linearized and scaled, sample times are reconstructed in
+    TIME_COLUMN and the warmup period is stripped. Samples of a fresh download
+    that are not in the machine's local history yet are appended to it before
+    the warmup is stripped, so the history keeps the warmup and its readers
+    strip it themselves.
 
-        # Transform data from list of dicts to dict of lists
-        output['data'] = transform_data_format(scaled_df)
+    Returns:
+        The stats metadata and the DataFrame, or None if the machine sent no samples
+    """
+    stats, df = download_bitflux_data(machine_key, url)
+    if df is None:
+        return stats, None
 
+    with span('scale', rows=len(df)):
+        scaled_df = scale_bitflux_data(stats, df)
+    with span('add_time_column'):
+        scaled_df = add_time_column(stats, scaled_df)
+
+    if 'staleSince' not in stats:
+        # Keeps the samples that will fall out of the ring buffer
+        with span('history.append') as s:
+            try:
+                s.set('rows', append_history(machine_key, stats, scaled_df))
+            except (OSError, pl.exceptions.PolarsError) as e:
+                # The download is still good without its history
+                s.fail(str(e))
+                print(f"Failed to append to the history of {machine_key}: {e}", file=sys.stderr)
+
+    # Strip warmup period
+    with span('strip_warmup') as s:
+        scaled_df = strip_warmup(stats, scaled_df)
+        s.set('rows', len(scaled_df))
+    return stats, scaled_df
+
+def stats_metadata(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """The output fields describing the machine and the download, shared by the download and summarize tools."""
+    output = {}
+    output['timestamp'] = stats['timestamp']
+    output['sample_rate'] = stats['sampleRate']
+    output['mem_total'] = stats['system']['memTotal']
+    output['swap_total'] = stats['system'].get('swapTotal', 0)
+    output['num_cpus'] = stats['system']['numCpus']
+    output['instance_type'] = ""
+    if 'staleSince' in stats:
+        output['stale_since'] = stats['staleSince']
+    return output
+
+def download_stats_by_machine_key(machine_key: str, url: str, max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, Any]:
+    stats, scaled_df = load_bitflux_data(machine_key, url)
+    if scaled_df is None:
+        print(f"No bitflux data received for {machine_key}", file=sys.stderr)
+        return stats
+
+    output = stats_metadata(stats)
+
+    # Downsampled series over the whole window as a dict of lists
+    with span('downsample', max_points=max_points):
+        output['data'] = transform_data_format(scaled_df, max_points)
+
+    with span('summarize'):
         summary, requirements = summarize_bitflux_data(stats, scaled_df)
-        output['summary'] = summary
-        output['summary_requirements'] = requirements
-        #print(json.dumps(output, indent=4, default=str))
-        return output
+    if 'staleSince' not in stats:
+        # Mergeable column aggregates, for percentiles across machines
+        with span('sketch'):
+            save_summary(machine_key, stats, summary, requirements, aggregate_frame(scaled_df))
+    output['summary'] = summary
+    output['summary_requirements'] = requirements
+    return output
+
+def resample_stats_by_machine_key(machine_key: str, url: str, every: str = '1h', aggs: Optional[List[str]] = None,
+                                  history: bool = False) -> Dict[str, Any]:
+    """
+    Download stats for a machine and aggregate them into time buckets.
 
-def download_stats_by_instance_id(instance_id: str, url: str) -> Dict[str, Any]:
+    With history, the buckets cover the machine's local history, which
+    the download is added to first and whose warmup is stripped, instead
+    of the ring buffer alone.
+    """
+    stats, scaled_df = load_bitflux_data(machine_key, url)
+    if scaled_df is None:
+        raise Exception(f"No bitflux data received for {machine_key}")
+    source = scaled_df
+    if history:
+        with span('history.scan'):
+            source = scan_history(machine_key)
+            if source is not None:
+                source = strip_warmup_lazy(stats, source)
+        if source is None:
+            # Nothing stored, e.g. a stale download or BITFLUX_HISTORY_DAYS=0
+            source = scaled_df
+    with span('resample', every=every):
+        resampled = resample_bitflux_data(source, every, aggs)
+    output = {
+        'timestamp': stats['timestamp'],
+        'sample_rate': stats['sampleRate'],
+        'every': every,
+        'data': format_time_columns(resampled).to_dict(as_series=False),
+    }
+    if 'staleSince' in stats:
+        output['stale_since'] = stats['staleSince']
+    return output
+
+def download_stats_by_instance_id(instance_id: str, url: str, max_points: int = DEFAULT_MAX_POINTS) -> Dict[str, Any]:
     """Download stats from bitflux daemon by instance id"""
-    results = machine_lookup(instance_id, "", url)
-    if len(results) == 0:
-        raise Exception(f"No machines found for instance_id {instance_id}")
-    machine = results[0]
-    machine_key = machine.get('machineKey', None)
-    if machine_key is None:
-        raise Exception(f"No machine key found for instance_id {instance_id} {results}")
-    instance_type = get_ec2_instance_data(instance_id)['InstanceType']
+    machine_key = machine_key_by_instance_id(instance_id, url)
+    with span('ec2.describe_instances', instance_id=instance_id):
+        instance_type = get_ec2_instance_data(instance_id)['InstanceType']
     if instance_type is None:
-        raise Exception(f"No instance type found for instance_id {instance_id} {results}")
-    stats = download_stats_by_machine_key(machine_key, url)
+        raise Exception(f"No instance type found for instance_id {instance_id} {machine_key}")
+    stats = download_stats_by_machine_key(machine_key, url, max_points)
     stats['instance_type'] = instance_type
     return stats
 
@@ -309,13 +665,25 @@ def manual() -> None:
     parser.add_argument("--account_id", default="", help="Account ID (e.g., 1234567890)")
     parser.add_argument("--instance_id", default="", help="Instance ID (e.g., i-1234567890)")
     parser.add_argument("--url", default="https://catcher.bitflux.ai", help="API base URL")
+    parser.add_argument("--max_points", type=int, default=DEFAULT_MAX_POINTS, help="Maximum samples per column in 'data'")
+    parser.add_argument("--every", default="", help="Resample into buckets of this width (e.g., 1h) instead of downsampling")
+    parser.add_argument("--aggs", nargs="*", default=None, help="Aggregates for --every (e.g., used:p95 idle_cpu:min)")
+    parser.add_argument("--history", action="store_true", help="Resample the local history of the machine with --every, not only its ring buffer")
+    parser.add_argument("--chunked", action="store_true", help="Only summarize, reading the samples in bounded-memory chunks")
     args = parser.parse_args()
 
-    if args.machine_key != "":
-        stats = download_stats_by_machine_key(args.machine_key, args.url)
+    if args.machine_key != "" and args.chunked:
+        from .chunked import summarize_stats_by_machine_key
+        stats = summarize_stats_by_machine_key(args.machine_key, args.url)
+        print(json.dumps(stats, indent=4))
+    elif args.machine_key != "" and args.every != "":
+        stats = resample_stats_by_machine_key(args.machine_key, args.url, args.every, args.aggs, args.history)
+        print(json.dumps(stats, indent=4))
+    elif args.machine_key != "":
+        stats = download_stats_by_machine_key(args.machine_key, args.url, args.max_points)
         print(json.dumps(stats, indent=4))
     elif args.instance_id != "":
-        stats = download_stats_by_instance_id(args.instance_id, args.url)
+        stats = download_stats_by_instance_id(args.instance_id, args.url, args.max_points)
         print(json.dumps(stats, indent=4))
     else:
         print("Please provide either machine_key or instance_id")
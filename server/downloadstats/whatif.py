@@ -0,0 +1,210 @@
+from typing import Any, Dict, Tuple
+
+import polars as pl
+
+from ..ec2_tools.price_catalog import BURSTABLE_BASELINE, price_catalog
+from ..tracing import span
+from .constants import DEFAULT_CANDIDATES
+from .credits import simulate_credits
+from .history import scan_history
+from .tool import format_time_columns, load_bitflux_data, stats_metadata, strip_warmup
+
+# The calculated used memory runs about 10% below the actual usage, see the recommendation prompt
+MEMORY_OVERHEAD = 0.1
+# Fractions of samples over memory or CPU capacity a candidate may have and still fit
+OVER_CAPACITY_LIMIT = 0.001
+CPU_SATURATION_LIMIT = 0.01
+
+
+def exceedance(values: pl.Series, thresholds: pl.Series) -> Tuple[pl.Series, pl.Series]:
+    """
+    For every threshold, the fraction of values above it and the mean excess max(0, value - threshold).
+
+    Equivalent to broadcasting values against thresholds into a
+    samples x thresholds matrix, but the values are sorted once and each
+    threshold is located by binary search and answered from prefix sums,
+    so it takes O((samples + thresholds) log samples) time and no matrix.
+    """
+    values = values.drop_nulls().cast(pl.Float64).sort()
+    thresholds = thresholds.cast(pl.Float64)
+    n = len(values)
+    if n == 0:
+        zeros = pl.Series([0.0] * len(thresholds))
+        return zeros, zeros
+    below = values.search_sorted(thresholds, side='right')
+    above = n - below.cast(pl.Int64)
+    prefix = pl.concat([pl.Series([0.0]), values.cum_sum()])
+    excess = (values.sum() - prefix.gather(below)) - above * thresholds
+    return above / n, excess / n
+
+
+def simulate_candidates(stats: Dict[str, Any], df: pl.DataFrame, candidates: pl.DataFrame,
+                        memory_overhead: float = MEMORY_OVERHEAD) -> pl.DataFrame:
+    """
+    Replay a machine's samples against every candidate instance type.
+
+    Memory is compared with the candidate's memory less memory_overhead,
+    CPU with its vCPUs, the busy vCPUs of a sample being
+    (100 - idle_cpu) / 100 * numCpus of the machine.
+
+    Args:
+        stats: Dictionary containing metadata including system.numCpus
+        df: Scaled samples with used, reclaimable, swap_used and idle_cpu
+        candidates: Rows of price_catalog()
+
+    Returns:
+        candidates with, per row:
+        over_capacity: Fraction of samples whose used memory does not fit, so
+            memory in use would have to be swapped out
+        cache_pressure: Fraction of samples whose used memory and reclaimable cache do not both fit
+        swap_pressure: Fraction of samples with memory in swap, taking the
+            used and swapped memory of a sample as what has to fit
+        swap_mean, swap_max: Bytes in swap, mean and peak over the samples
+        cpu_saturation: Fraction of samples needing more vCPUs than the candidate has
+        cpu_excess: Mean vCPUs of demand over the candidate's
+        cpu_p99_utilization: 99th percentile of busy vCPUs over the candidate's vCPUs
+    """
+    capacity = candidates['memory_gib'] * 2**30 / (1 + memory_overhead)
+    vcpu = candidates['vcpu'].cast(pl.Float64)
+    used = df['used'].cast(pl.Float64)
+    anonymous = used + df['swap_used'].cast(pl.Float64)
+    busy = (100 - df['idle_cpu'].cast(pl.Float64)) / 100 * int(stats['system']['numCpus'])
+
+    over_capacity, _ = exceedance(used, capacity)
+    cache_pressure, _ = exceedance(used + df['reclaimable'].cast(pl.Float64), capacity)
+    # In swap on the candidate is whatever anonymous memory does not fit
+    swap_pressure, swap_mean = exceedance(anonymous, capacity)
+    cpu_saturation, cpu_excess = exceedance(busy, vcpu)
+    busy_p99 = busy.quantile(0.99, 'nearest') or 0.0
+    return candidates.with_columns(
+        over_capacity=over_capacity,
+        cache_pressure=cache_pressure,
+        swap_pressure=swap_pressure,
+        swap_mean=swap_mean,
+        swap_max=(anonymous.max() - capacity).clip(lower_bound=0),
+        cpu_saturation=cpu_saturation,
+        cpu_excess=cpu_excess,
+        cpu_p99_utilization=busy_p99 / vcpu,
+    )
+
+
+def _replay_inputs(machine_key: str, url: str, region: str, instance_types: str,
+                   history: bool) -> Tuple[Dict[str, Any], pl.DataFrame, pl.DataFrame]:
+    """The stats metadata, the samples to replay and the candidate rows of price_catalog()."""
+    stats, scaled_df = load_bitflux_data(machine_key, url)
+    if scaled_df is None:
+        raise Exception(f"No bitflux data received for {machine_key}")
+    if history:
+        with span('history.scan'):
+            lf = scan_history(machine_key)
+        if lf is not None:
+            scaled_df = strip_warmup(stats, lf.collect())
+    with span('whatif.candidates', region=region):
+        candidates = price_catalog(region, instance_types)
+    if candidates.is_empty():
+        raise ValueError("No candidate instance types, pass a region with prices for them")
+    return stats, scaled_df, candidates
+
+
+def simulate_instances(machine_key: str, url: str, region: str = '', instance_types: str = '*',
+                       history: bool = False, max_candidates: int = DEFAULT_CANDIDATES) -> Dict[str, Any]:
+    """
+    Replay a machine's telemetry against every priced instance type and rank those that fit.
+
+    Burstable candidates are also replayed against their CPU credits, and
+    only fit if they are not held to their baseline more often than
+    CPU_SATURATION_LIMIT.
+
+    Args:
+        machine_key: The machine to replay
+        url: The catcher URL
+        region: Region whose prices are the candidates, by default every cached price list
+        instance_types: Instance type or prefix pattern, e.g. 'm7g.*', as for get_ec2_prices
+        history: Replay the machine's local history instead of the ring buffer
+        max_candidates: Candidates returned, those that fit first, cheapest first
+
+    Returns:
+        Dictionary with the download's metadata, 'samples' replayed,
+        'candidates' and 'fitting' counts and 'data' with one list per
+        column of simulate_candidates plus 'throttling_risk' (null unless
+        burstable, see simulate_credits) and 'fits'
+    """
+    stats, scaled_df, candidates = _replay_inputs(machine_key, url, region, instance_types, history)
+    with span('whatif.simulate', samples=len(scaled_df), candidates=len(candidates)):
+        simulated = simulate_candidates(stats, scaled_df, candidates)
+    with span('whatif.credits'):
+        credits, _ = simulate_credits(stats, scaled_df, candidates)
+    simulated = simulated.join(credits.select('region', 'instance_type', 'throttling_risk'),
+                               on=['region', 'instance_type'], how='left', maintain_order='left')
+    fits = ((pl.col('over_capacity') <= OVER_CAPACITY_LIMIT) & (pl.col('cpu_saturation') <= CPU_SATURATION_LIMIT)
+            & pl.col('throttling_risk').fill_null(0).le(CPU_SATURATION_LIMIT))
+    ranked = simulated.with_columns(fits=fits).sort(['fits', 'price_per_hour', 'instance_type'], descending=[True, False, False])
+    return {
+        **stats_metadata(stats),
+        'samples': len(scaled_df),
+        'candidates': len(ranked),
+        'fitting': ranked['fits'].sum(),
+        'data': ranked.head(max_candidates).to_dict(as_series=False),
+    }
+
+
+def simulate_cpu_credits(machine_key: str, url: str, region: str = '', instance_types: str = 't*',
+                         history: bool = False, every: str = '1h') -> Dict[str, Any]:
+    """
+    Replay a machine's CPU usage against the credits of every burstable instance type, see simulate_credits.
+
+    Args:
+        machine_key: The machine to replay
+        url: The catcher URL
+        region: Region whose prices are the candidates, by default every cached price list
+        instance_types: Instance type or prefix pattern, e.g. 't4g.*', as for get_ec2_prices
+        history: Replay the machine's local history instead of the ring buffer
+        every: Width of the trajectory buckets
+
+    Returns:
+        Dictionary with the download's metadata, 'samples' replayed,
+        'candidates' (one list per column of the candidates of
+        simulate_credits, lowest throttling_risk first, then cheapest) and
+        'trajectories' (TIME_COLUMN and the lowest balance of each
+        candidate per bucket)
+    """
+    stats, scaled_df, candidates = _replay_inputs(machine_key, url, region, instance_types, history)
+    with span('whatif.credits', samples=len(scaled_df)):
+        credits, trajectories = simulate_credits(stats, scaled_df, candidates, every)
+    if credits.is_empty():
+        raise ValueError(f"No burstable instance types among the candidates, expected some of "
+                         f"{', '.join(f'{family}.*' for family in BURSTABLE_BASELINE)}")
+    return {
+        **stats_metadata(stats),
+        'samples': len(scaled_df),
+        'every': every,
+        'candidates': credits.sort(['throttling_risk', 'price_per_hour', 'instance_type']).to_dict(as_series=False),
+        'trajectories': format_time_columns(trajectories).to_dict(as_series=False),
+    }
+
+
+def manual() -> None:
+    import argparse
+    import json
+    parser = argparse.ArgumentParser(description="Replay a machine's telemetry against candidate instance types")
+    parser.add_argument("--machine_key", required=True, help="Machine UUID")
+    parser.add_argument("--url", default="https://catcher.bitflux.ai", help="API base URL")
+    parser.add_argument("--region", default='', help="Region of the candidate prices, by default every cached one")
+    parser.add_argument("--instance_types", default='*', help="Instance type or prefix pattern, e.g. 'm7g.*'")
+    parser.add_argument("--history", action="store_true", help="Replay the local history instead of the ring buffer")
+    parser.add_argument("--max_candidates", type=int, default=DEFAULT_CANDIDATES, help="Candidates returned")
+    parser.add_argument("--credits", action="store_true", help="Replay the CPU credits of burstable instance types instead")
+    parser.add_argument("--every", default="1h", help="Width of the credit trajectory buckets with --credits")
+    args = parser.parse_args()
+
+    if args.credits:
+        result = simulate_cpu_credits(args.machine_key, args.url, args.region, args.instance_types,
+                                      args.history, args.every)
+    else:
+        result = simulate_instances(args.machine_key, args.url, args.region, args.instance_types,
+                                    args.history, args.max_candidates)
+    print(json.dumps(result, indent=4))
+
+
+if __name__ == "__main__":
+    manual()
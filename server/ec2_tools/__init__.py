@@ -1,4 +1,5 @@
 from .ec2_instances import list_ec2_instances, get_ec2_instance_data
-from .ec2_account import get_aws_account_id
+from .ec2_account import get_aws_account_id, get_identity
+from .clients import get_client
 from .ec2_pricing import get_ec2_prices
 from .ec2_ami import get_generic_ami_id, get_bitflux_ami_id, AmiIdTool
@@ -0,0 +1,66 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from .throttle import install_throttle
+
+_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+_clients_lock = threading.Lock()
+# Stand-in clients returned for a service regardless of region, see set_client_override()
+_overrides: Dict[str, Any] = {}
+
+
+def _default_session() -> Any:
+    # boto3.client() uses the default session, so its credentials are the
+    # ones every AWS call in this server is made with. boto3 is imported on
+    # first use to keep it out of server startup.
+    import boto3
+
+    if boto3.DEFAULT_SESSION is None:
+        boto3.setup_default_session()
+    return boto3.DEFAULT_SESSION
+
+
+def get_credentials() -> Any:
+    """Return the credentials of the default session, as used by every client from get_client()."""
+    with _clients_lock:
+        return _default_session().get_credentials()
+
+
+def get_client(service_name: str, region_name: Optional[str] = None) -> Any:
+    """
+    Return a shared boto3 client for service_name in region_name.
+
+    Tool calls run in worker threads. boto3 clients are thread safe but
+    creating them from the shared default session is not, so creation is
+    serialized here and each client is reused afterwards. Requests of all
+    clients for a service and region share one Throttle.
+    """
+    key = (service_name, region_name)
+    with _clients_lock:
+        if service_name in _overrides:
+            return _overrides[service_name]
+        client = _clients.get(key)
+        if client is None:
+            client = install_throttle(_default_session().client(service_name, region_name=region_name), service_name)
+            _clients[key] = client
+        return client
+
+
+def reset_clients() -> None:
+    """Drop all cached clients, e.g. after the default session was replaced."""
+    with _clients_lock:
+        _clients.clear()
+
+
+def set_client_override(service_name: str, client: Optional[Any]) -> Optional[Any]:
+    """
+    Make get_client() return client for service_name in every region.
+
+    Used to replay recorded responses in tests and benchmarks. Pass None to
+    remove the override. Returns the override that was replaced, if any.
+    """
+    with _clients_lock:
+        previous = _overrides.pop(service_name, None)
+        if client is not None:
+            _overrides[service_name] = client
+        return previous
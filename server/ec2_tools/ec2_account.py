@@ -1,6 +1,85 @@
-import boto3
+import hashlib
+import threading
+from typing import Optional
+
+from ..cache import get_store
+from ..metrics import get_metrics
+from .clients import get_client, get_credentials
+
+_IDENTITY_NAMESPACE = 'identity'
+
+
+def credential_fingerprint() -> str:
+    """
+    Return a stable fingerprint of the credentials currently in use.
+
+    The fingerprint changes whenever the access key or session token rotates.
+    Only a hash is returned so no secret material ends up in caches.
+    """
+    credentials = get_credentials()
+    if credentials is None:
+        return ''
+    frozen = credentials.get_frozen_credentials()
+    material = f"{frozen.access_key}:{frozen.token or ''}"
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class IdentityContext:
+    """
+    Caller identity resolved once per credential set.
+
+    The STS GetCallerIdentity result is kept in memory and in the on-disk
+    cache, keyed by the credential fingerprint, and is resolved again
+    automatically when the credentials rotate.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        self._account_id: Optional[str] = None
+        self._account_hash: Optional[str] = None
+
+    def _refresh(self) -> None:
+        fingerprint = credential_fingerprint()
+        if fingerprint == self._fingerprint and self._account_id is not None:
+            get_metrics().cache('identity', hit=True)
+            return
+        account_id = get_store().get(_IDENTITY_NAMESPACE, fingerprint) if fingerprint else None
+        get_metrics().cache('identity', hit=account_id is not None)
+        if account_id is None:
+            sts = get_client('sts')
+            account_id = sts.get_caller_identity()['Account']
+            if fingerprint:
+                get_store().put(_IDENTITY_NAMESPACE, fingerprint, account_id)
+        self._fingerprint = fingerprint
+        self._account_id = account_id
+        self._account_hash = hashlib.sha256(account_id.encode()).hexdigest()
+
+    @property
+    def account_id(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._account_id
+
+    @property
+    def account_hash(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._account_hash
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._fingerprint = None
+            self._account_id = None
+            self._account_hash = None
+
+
+_identity = IdentityContext()
+
+
+def get_identity() -> IdentityContext:
+    return _identity
+
 
 def get_aws_account_id():
-    sts = boto3.client('sts')
-    account_id = sts.get_caller_identity()['Account']
-    return account_id
+    return _identity.account_id
@@ -1,8 +1,32 @@
 #!/usr/bin/env python3
-import boto3
 import os
 from mcp.server.fastmcp import Context
 
+from typing import Any, Callable
+
+from .clients import get_client
+from ..cache import get_store
+from ..metrics import get_metrics
+from ..profiling import run_in_thread
+
+_AMI_NAMESPACE = 'ami_id'
+# New images are published every few weeks, a day old answer is still current
+AMI_MAX_AGE = 24 * 3600
+
+
+def _cached_ami_id(target: str, latest: Callable[[Any], str]) -> str:
+    """Return latest(ec2_client), cached on disk per target and region for AMI_MAX_AGE."""
+    ec2_client = get_client('ec2')
+    region = getattr(getattr(ec2_client, 'meta', None), 'region_name', None) or 'default'
+    key = f'{target}/{region}'
+    ami_id = get_store().get(_AMI_NAMESPACE, key, max_age=AMI_MAX_AGE)
+    get_metrics().cache('ami_id', hit=ami_id is not None)
+    if ami_id is None:
+        ami_id = latest(ec2_client)
+        get_store().put(_AMI_NAMESPACE, key, ami_id)
+    return ami_id
+
+
 def get_generic_ami_id() -> str:
     """
     Get the latest Ubuntu Noble AMI ID for the current region.
@@ -10,8 +34,10 @@ def get_generic_ami_id() -> str:
     Returns:
         AMI ID string
     """
-    ec2_client = boto3.client('ec2')
+    return _cached_ami_id('generic', _latest_generic_ami_id)
 
+
+def _latest_generic_ami_id(ec2_client: Any) -> str:
     response = ec2_client.describe_images(
         Owners=['099720109477'],  # Canonical's AWS account ID
         Filters=[
@@ -36,8 +62,11 @@ def get_bitflux_ami_id() -> str:
     Returns:
         AMI ID string
     """
-    ec2_client = boto3.client('ec2')
+    target = 'bitflux-private' if os.environ.get('PRIVATE_AMI_CATALOG', None) is not None else 'bitflux'
+    return _cached_ami_id(target, _latest_bitflux_ami_id)
+
 
+def _latest_bitflux_ami_id(ec2_client: Any) -> str:
     response = ec2_client.describe_images(
         Filters=[
             {
@@ -92,8 +121,8 @@ class AmiIdTool:
     """
     async def execute(target: str, ctx: Context) -> str:
         if target == "generic":
-            return get_generic_ami_id()
+            return await run_in_thread(get_generic_ami_id)
         elif target == "bitflux":
-            return get_bitflux_ami_id()
+            return await run_in_thread(get_bitflux_ami_id)
         else:
             raise ValueError("Invalid target. Must be 'generic' or 'bitflux'.")
@@ -2,22 +2,42 @@
 """
 Module to list EC2 instances by instance ID in a given AWS region.
 """
-import boto3
 import json
 from typing import Dict, List
 
+from ..cache import get_store
+from ..metrics import get_metrics
+from .clients import get_client
 
-def list_ec2_instances(region_name: str) -> Dict[str, List[str]]:
+_INSTANCES_NAMESPACE = 'ec2_instances'
+# Instance lists change as machines start and stop, so they are only reused briefly
+INSTANCES_MAX_AGE = 300
+
+
+def list_ec2_instances(region_name: str, max_age: float = INSTANCES_MAX_AGE) -> Dict[str, List[str]]:
     """
     Retrieve all EC2 instances owned by user in the specified AWS region.
 
+    A list fetched less than max_age seconds ago is served from the on-disk
+    cache, pass max_age=0 to always call DescribeInstances.
+
     Args:
         region_name: AWS region code (e.g., 'us-east-1').
 
     Returns:
         A dictionary of instances information.
     """
-    ec2 = boto3.client('ec2', region_name=region_name)
+    cached = get_store().get(_INSTANCES_NAMESPACE, region_name, max_age=max_age) if max_age > 0 else None
+    get_metrics().cache('ec2_instances', hit=cached is not None)
+    if cached is not None:
+        return cached
+    instances = _describe_instances(region_name)
+    get_store().put(_INSTANCES_NAMESPACE, region_name, instances)
+    return instances
+
+
+def _describe_instances(region_name: str) -> Dict[str, List[str]]:
+    ec2 = get_client('ec2', region_name=region_name)
     paginator = ec2.get_paginator('describe_instances')
     instances: dict[str, str] = {"Name": [], "InstanceId": [], "InstanceType": [], "State": []}
     for page in paginator.paginate():
@@ -37,7 +57,7 @@ def list_ec2_instances(region_name: str) -> Dict[str, List[str]]:
 
 # get ec2 Instance data from
 def get_ec2_instance_data(instance_id: str) -> Dict[str, str]:
-    ec2 = boto3.client('ec2')
+    ec2 = get_client('ec2')
     response = ec2.describe_instances(InstanceIds=[instance_id])
     instances = response['Reservations'][0]['Instances'][0]
     return instances
@@ -1,14 +1,22 @@
 #!/usr/bin/env python3
-import boto3
 import json
 
+from .clients import get_client
+from ..cache import get_store
+from ..metrics import get_metrics
+from ..tracing import span
+
+_PRICES_NAMESPACE = 'ec2_prices'
+# The price list is updated at most a few times a month
+PRICES_MAX_AGE = 24 * 3600
+
 # Map AWS region codes (e.g., 'us-east-1') to the pricing API location strings (e.g., 'US East (N. Virginia)').
 def _get_location_for_region(region_code, pricing_region='us-east-1'):
     """
     Resolve AWS Pricing API location name for a given AWS region code.
     Uses the AWS Price List API to map the region code to the location string expected by the EC2 pricing service.
     """
-    pricing_client = boto3.client('pricing', region_name=pricing_region)
+    pricing_client = get_client('pricing', region_name=pricing_region)
     response = pricing_client.get_products(
         ServiceCode='AmazonEC2',
         Filters=[{'Type': 'TERM_MATCH', 'Field': 'regionCode', 'Value': region_code}],
@@ -32,7 +40,7 @@ def get_page_iterator(region_name, instance_type, location):
     instance_type: EC2 instance type to filter (e.g., 't3.micro').
     location: AWS region location string in the pricing API (e.g., 'US East (N. Virginia)').
     """
-    pricing_client = boto3.client('pricing', region_name=region_name)
+    pricing_client = get_client('pricing', region_name=region_name)
     # Determine if instance_type contains wildcard; AWS API TERM_MATCH doesn't support wildcards,
     # so skip the instanceType filter if a wildcard is used.
     wildcard = '*' in instance_type
@@ -174,11 +182,17 @@ def get_ec2_prices_full(region_name, instance_type):
     instance_type: EC2 instance type to filter (e.g., 't3.micro').
     """
     # Resolve the AWS Pricing API location string for the given region
-    location = _get_location_for_region(region_name)
-    page_iterator = get_page_iterator(region_name, instance_type, location)
+    with span('pricing.location', region=region_name):
+        location = _get_location_for_region(region_name)
+    page_iterator = iter(get_page_iterator(region_name, instance_type, location))
     prices = []
-    for page in page_iterator:
-        prices += get_prices_per_page(page)
+    while True:
+        with span('pricing.fetch_page'):
+            page = next(page_iterator, None)
+        if page is None:
+            break
+        with span('pricing.flatten', items=len(page['PriceList'])):
+            prices += get_prices_per_page(page)
     return prices
 
 def get_ec2_prices_filtered(region_name, instance_type):
@@ -187,7 +201,23 @@ def get_ec2_prices_filtered(region_name, instance_type):
     fields returned to the ones we need.
     region_name: AWS region code (e.g., 'us-east-1').
     instance_type: EC2 instance type to filter (e.g., 't3.micro').
+
+    Results are cached on disk for PRICES_MAX_AGE. A cached '*' catalog for
+    the region answers every instance_type; callers narrow it down as
+    get_ec2_prices does.
     """
+    store = get_store()
+    for key in (f'{region_name}/*', f'{region_name}/{instance_type}'):
+        cached = store.get(_PRICES_NAMESPACE, key, max_age=PRICES_MAX_AGE)
+        if cached is not None:
+            get_metrics().cache('ec2_prices', hit=True)
+            return cached
+    get_metrics().cache('ec2_prices', hit=False)
+    prices = _fetch_ec2_prices_filtered(region_name, instance_type)
+    store.put(_PRICES_NAMESPACE, f'{region_name}/{instance_type}', prices)
+    return prices
+
+def _fetch_ec2_prices_filtered(region_name, instance_type):
     # Resolve the AWS Pricing API location string for the given region
     fullprices = get_ec2_prices_full(region_name, instance_type)
     prices = []
@@ -236,8 +266,25 @@ def manual():
     parser.add_argument('--region', default="us-east-1", help='AWS region code (e.g., us-east-1)')
     parser.add_argument('--instance_type', default="t3.*", help='AWS region code (e.g., us-east-1)')
     parser.add_argument('--simple', action='store_true', help='Get simple pricing')
+    parser.add_argument('--record', default='', help='Record the Pricing API responses to this fixture file (.json.gz) and exit')
+    parser.add_argument('--replay', nargs='*', default=[], help='Answer Pricing API calls from these recorded fixture files')
 
     args = parser.parse_args()
+    if args.record:
+        from .pricing_fixtures import record_fixture
+        items = record_fixture(args.record, args.region, args.instance_type)
+        print(f"Recorded {items} price list items to {args.record}")
+        return
+    if args.replay:
+        import os
+        import tempfile
+        from ..cache import reset_store
+        from .clients import set_client_override
+        # Keep replayed prices out of the real price cache
+        os.environ['BITFLUX_CACHE_DIR'] = tempfile.mkdtemp(prefix='bitflux_replay_')
+        reset_store()
+        from .pricing_fixtures import ReplayPricingClient, load_fixture
+        set_client_override('pricing', ReplayPricingClient([load_fixture(path) for path in args.replay]))
     if args.simple:
         prices = get_ec2_prices_simple(args.region, args.instance_type)
         print(json.dumps(prices, indent=2))
@@ -0,0 +1,95 @@
+import re
+from typing import Any, Dict, List, Optional
+
+import polars as pl
+
+from ..cache import get_store
+from .ec2_pricing import _PRICES_NAMESPACE, get_ec2_prices
+
+# Columns of price_catalog(), one row per region and instance type
+CATALOG_SCHEMA = {
+    'region': pl.String,
+    'instance_type': pl.String,
+    'instance_family': pl.String,
+    'vcpu': pl.Int32,
+    'memory_gib': pl.Float64,
+    'price_per_hour': pl.Float64,
+}
+
+# Burstable families and the baseline utilization per vCPU of each size. A
+# CPU credit is one vCPU at 100% for a minute, so an instance earns
+# vcpu * baseline * 60 credits an hour and keeps at most 24 hours of them.
+BURSTABLE_BASELINE = {
+    family: {'nano': 0.05, 'micro': 0.10, 'small': 0.20, 'medium': 0.20,
+             'large': 0.30, 'xlarge': 0.40, '2xlarge': 0.40}
+    for family in ('t3', 't3a', 't4g')
+}
+BURSTABLE_ACCRUAL_HOURS = 24
+
+
+def _number(value: str) -> Optional[float]:
+    """The number in a price list attribute such as '16 GiB', '1,952 GiB' or '0.0416000000'."""
+    match = re.search(r'[\d.]+', (value or '').replace(',', ''))
+    return float(match.group()) if match else None
+
+
+def _catalog_rows(region: str, prices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    for p in prices:
+        price = _number(p.get('pricePerUnit', ''))
+        vcpu = _number(p.get('vcpu', ''))
+        memory = _number(p.get('memory', ''))
+        if not price or vcpu is None or memory is None:
+            continue
+        instance_type = p.get('instanceType', '')
+        rows.append({
+            'region': region,
+            'instance_type': instance_type,
+            'instance_family': instance_type.split('.', 1)[0],
+            'vcpu': int(vcpu),
+            'memory_gib': memory,
+            'price_per_hour': price,
+        })
+    return rows
+
+
+def price_catalog(region: str = '', instance_type: str = '*') -> pl.DataFrame:
+    """
+    On demand Linux prices as a table of CATALOG_SCHEMA columns.
+
+    With a region its prices are looked up with get_ec2_prices, from the
+    cache or the Pricing API. Without one the table holds every price list
+    already cached, without calling AWS. instance_type narrows either down
+    as in get_ec2_prices. Free and unpriced entries are left out, and an
+    instance type listed twice keeps its first price.
+    """
+    rows = []
+    if region:
+        rows = _catalog_rows(region, get_ec2_prices(region, instance_type))
+    else:
+        for key, prices in get_store().get_all(_PRICES_NAMESPACE).items():
+            rows += _catalog_rows(key.split('/', 1)[0], prices)
+    df = pl.DataFrame(rows, schema=CATALOG_SCHEMA)
+    if not region and instance_type != '*':
+        prefix, wildcard, _ = instance_type.partition('*')
+        df = df.filter(pl.col('instance_type').str.starts_with(prefix) if wildcard else pl.col('instance_type') == prefix)
+    return df.unique(subset=['region', 'instance_type'], keep='first', maintain_order=True).sort('region', 'instance_type')
+
+
+def with_credit_specs(candidates: pl.DataFrame) -> pl.DataFrame:
+    """
+    Add the CPU credit specification of burstable instance types to rows of price_catalog().
+
+    Adds baseline (utilization per vCPU), credits_per_hour and max_credits,
+    null for instance types that are not burstable.
+    """
+    baselines = pl.DataFrame(
+        [{'instance_type': f'{family}.{size}', 'baseline': baseline}
+         for family, sizes in BURSTABLE_BASELINE.items() for size, baseline in sizes.items()],
+        schema={'instance_type': pl.String, 'baseline': pl.Float64},
+    )
+    credits_per_hour = pl.col('vcpu') * pl.col('baseline') * 60
+    return candidates.join(baselines, on='instance_type', how='left', maintain_order='left').with_columns(
+        credits_per_hour=credits_per_hour,
+        max_credits=credits_per_hour * BURSTABLE_ACCRUAL_HOURS,
+    )
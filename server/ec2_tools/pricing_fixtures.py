@@ -0,0 +1,161 @@
+import contextlib
+import gzip
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .clients import get_client, set_client_override
+
+FIXTURE_VERSION = 1
+
+
+def _filter_key(filters: Sequence[Dict[str, str]]) -> Dict[str, str]:
+    return {f['Field']: f['Value'] for f in filters or []}
+
+
+class RecordingPricingClient:
+    """
+    Wraps a boto3 pricing client and keeps every get_products response.
+
+    Direct get_products calls and get_products paginators are recorded; any
+    other attribute is passed through to the wrapped client.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self.calls: List[Dict[str, Any]] = []
+
+    def get_products(self, **params: Any) -> Dict[str, Any]:
+        response = self.client.get_products(**params)
+        self._record(params, [response])
+        return response
+
+    def get_paginator(self, operation_name: str) -> Any:
+        if operation_name != 'get_products':
+            return self.client.get_paginator(operation_name)
+        recorder = self
+
+        class Paginator:
+            def paginate(self, **params: Any) -> Iterator[Dict[str, Any]]:
+                pages = []
+                for page in recorder.client.get_paginator('get_products').paginate(**params):
+                    pages.append(page)
+                    yield page
+                recorder._record(params, pages)
+
+        return Paginator()
+
+    def _record(self, params: Dict[str, Any], pages: List[Dict[str, Any]]) -> None:
+        self.calls.append({
+            'filters': _filter_key(params.get('Filters')),
+            'pages': [{'PriceList': page.get('PriceList', [])} for page in pages],
+        })
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+
+class ReplayPricingClient:
+    """
+    Stand-in for boto3.client('pricing') serving recorded get_products pages.
+
+    A request is answered from the recorded call whose filters are a subset
+    of the requested ones, preferring the closest match. Requested filters the
+    recording did not use are applied locally as TERM_MATCH on the product
+    attributes, so a recording of '*' also serves single types and families.
+    """
+
+    def __init__(self, fixtures: Sequence[Dict[str, Any]]) -> None:
+        self.calls = [call for fixture in fixtures for call in fixture['calls']]
+        self.requests = 0
+
+    def get_products(self, ServiceCode: str = 'AmazonEC2', Filters: Sequence[Dict[str, str]] = (),
+                     MaxResults: Optional[int] = None, **kwargs: Any) -> Dict[str, Any]:
+        price_list = [item for page in self._pages(Filters) for item in page['PriceList']]
+        if MaxResults is not None:
+            price_list = price_list[:MaxResults]
+        return {'PriceList': price_list, 'FormatVersion': 'aws_v1'}
+
+    def get_paginator(self, operation_name: str) -> Any:
+        if operation_name != 'get_products':
+            raise NotImplementedError(f"Replay only supports get_products, not {operation_name}")
+        replay = self
+
+        class Paginator:
+            def paginate(self, ServiceCode: str = 'AmazonEC2', Filters: Sequence[Dict[str, str]] = (),
+                         **kwargs: Any) -> Iterator[Dict[str, Any]]:
+                yield from replay._pages(Filters)
+
+        return Paginator()
+
+    def _pages(self, filters: Sequence[Dict[str, str]]) -> List[Dict[str, Any]]:
+        self.requests += 1
+        wanted = _filter_key(filters)
+        candidates = [
+            call for call in self.calls
+            if all(wanted.get(field) == value for field, value in call['filters'].items())
+        ]
+        if not candidates:
+            raise LookupError(f"No recorded pricing response matches filters {wanted}")
+        call = max(candidates, key=lambda c: len(c['filters']))
+        extra = {field: value for field, value in wanted.items() if field not in call['filters']}
+        if not extra:
+            return call['pages']
+        pages = []
+        for page in call['pages']:
+            kept = [item for item in page['PriceList'] if _matches(item, extra)]
+            if kept:
+                pages.append({'PriceList': kept})
+        return pages or [{'PriceList': []}]
+
+
+def _matches(item: str, filters: Dict[str, str]) -> bool:
+    attributes = json.loads(item).get('product', {}).get('attributes', {})
+    return all(attributes.get(field) == value for field, value in filters.items())
+
+
+def save_fixture(path: str, fixture: Dict[str, Any]) -> None:
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(fixture, f)
+
+
+def load_fixture(path: str) -> Dict[str, Any]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        fixture = json.load(f)
+    if fixture.get('version') != FIXTURE_VERSION:
+        raise ValueError(f"Unsupported pricing fixture version {fixture.get('version')} in {path}")
+    return fixture
+
+
+@contextlib.contextmanager
+def replay_pricing(fixtures: Sequence[Dict[str, Any]]) -> Iterator[ReplayPricingClient]:
+    """Serve every pricing client from get_client() from fixtures while the context is active."""
+    client = ReplayPricingClient(fixtures)
+    previous = set_client_override('pricing', client)
+    try:
+        yield client
+    finally:
+        set_client_override('pricing', previous)
+
+
+def record_fixture(path: str, region_name: str, instance_type: str) -> int:
+    """
+    Run get_ec2_prices_full against the live Pricing API and save every page it read.
+
+    Returns:
+        The number of price list items recorded
+    """
+    from .ec2_pricing import get_ec2_prices_full
+
+    recorder = RecordingPricingClient(get_client('pricing', region_name=region_name))
+    previous = set_client_override('pricing', recorder)
+    try:
+        get_ec2_prices_full(region_name, instance_type)
+    finally:
+        set_client_override('pricing', previous)
+    save_fixture(path, {
+        'version': FIXTURE_VERSION,
+        'region': region_name,
+        'instance_type': instance_type,
+        'calls': recorder.calls,
+    })
+    return sum(len(page['PriceList']) for call in recorder.calls for page in call['pages'])
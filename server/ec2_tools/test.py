@@ -0,0 +1,225 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import polars as pl
+import pytest
+
+from ..bench.synthetic import synthetic_price_fixture
+from ..cache import reset_store
+from . import ec2_account, ec2_pricing, pricing_fixtures, throttle
+from .clients import get_client, set_client_override
+
+
+class FakeSTS:
+    calls = 0
+
+    def get_caller_identity(self):
+        FakeSTS.calls += 1
+        return {'Account': '123456789012'}
+
+
+@pytest.fixture
+def identity(tmp_path, monkeypatch):
+    monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+    reset_store()
+    FakeSTS.calls = 0
+    fingerprint = ['creds-1']
+    monkeypatch.setattr(ec2_account, 'credential_fingerprint', lambda: fingerprint[0])
+    monkeypatch.setattr(ec2_account, 'get_client', lambda service, **kwargs: FakeSTS())
+    ctx = ec2_account.IdentityContext()
+    yield ctx, fingerprint
+    reset_store()
+
+
+class TestIdentityContext:
+
+    def test_resolved_once(self, identity):
+        ctx, _ = identity
+        assert ctx.account_id == '123456789012'
+        assert ctx.account_id == '123456789012'
+        assert ctx.account_hash == hashlib.sha256(b'123456789012').hexdigest()
+        assert FakeSTS.calls == 1
+
+    def test_rotation_resolves_again(self, identity):
+        ctx, fingerprint = identity
+        ctx.account_id
+        fingerprint[0] = 'creds-2'
+        ctx.account_id
+        assert FakeSTS.calls == 2
+
+    def test_persisted_across_processes(self, identity):
+        ctx, _ = identity
+        ctx.account_id
+        assert ec2_account.IdentityContext().account_id == '123456789012'
+        assert FakeSTS.calls == 1
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+    reset_store()
+    yield tmp_path
+    reset_store()
+
+
+@pytest.mark.usefixtures('cache')
+class TestPricingReplay:
+
+    def test_single_type_and_family_from_wildcard_recording(self):
+        with pricing_fixtures.replay_pricing([synthetic_price_fixture()]):
+            single = ec2_pricing.get_ec2_prices('us-east-1', 'm5.large')
+            family = ec2_pricing.get_ec2_prices('us-east-1', 'm5.*')
+        assert {p['instanceType'] for p in single} == {'m5.large'}
+        assert single[0]['pricePerUnit'] == '0.0650000000'
+        assert len(family) == 10
+
+    def test_record_and_reload(self, tmp_path):
+        path = str(tmp_path / 'prices.json.gz')
+        set_client_override('pricing', pricing_fixtures.ReplayPricingClient([synthetic_price_fixture()]))
+        try:
+            items = pricing_fixtures.record_fixture(path, 'us-east-1', 't3.*')
+        finally:
+            set_client_override('pricing', None)
+        assert items == 221
+        fixture = pricing_fixtures.load_fixture(path)
+        with pricing_fixtures.replay_pricing([fixture]) as replay:
+            prices = ec2_pricing.get_ec2_prices_full('us-east-1', 't3.*')
+            assert get_client('pricing', region_name='eu-west-1') is replay
+        assert len(prices) == 220 * 21
+
+    def test_price_catalog(self):
+        from .price_catalog import price_catalog
+        assert price_catalog().is_empty()
+        with pricing_fixtures.replay_pricing([synthetic_price_fixture()]):
+            region = price_catalog('us-east-1')
+        # The cached price list answers without a region
+        cached = price_catalog()
+        assert cached.equals(region) and len(region) == 220
+        m5 = region.row(by_predicate=pl.col('instance_type') == 'm5.large', named=True)
+        assert m5 == {'region': 'us-east-1', 'instance_type': 'm5.large', 'instance_family': 'm5',
+                      'vcpu': 2, 'memory_gib': 8.0, 'price_per_hour': 0.065}
+
+
+class ThrottlingPricingAPI:
+    """Local Pricing endpoint that throttles requests beyond max_in_flight at once."""
+
+    def __init__(self, max_in_flight, delay=0.05):
+        api = self
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.served = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                with api.lock:
+                    api.in_flight += 1
+                    throttled = api.in_flight > api.max_in_flight
+                    if throttled:
+                        api.throttled += 1
+                try:
+                    if throttled:
+                        status, body = 400, {'__type': 'ThrottlingException', 'message': 'Rate exceeded'}
+                    else:
+                        time.sleep(delay)
+                        status, body = 200, {'FormatVersion': 'aws_v1', 'PriceList': []}
+                finally:
+                    with api.lock:
+                        api.in_flight -= 1
+                        api.served += not throttled
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/x-amz-json-1.1')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def throttles(monkeypatch):
+    throttle.reset_throttles()
+    monkeypatch.setattr(throttle, 'BACKOFF_BASE', 0.01)
+    yield
+    throttle.reset_throttles()
+
+
+@pytest.mark.usefixtures('throttles')
+class TestThrottle:
+
+    def test_token_bucket_paces_after_burst(self):
+        bucket = throttle.TokenBucket(rate=50, burst=2)
+        start = time.monotonic()
+        for _ in range(7):
+            bucket.acquire()
+        assert time.monotonic() - start >= 0.09
+
+    def test_aimd(self, monkeypatch):
+        limiter = throttle.AIMDLimiter(1, max_limit=5)
+        for _ in range(20):
+            # Use the whole limit so it may grow
+            held = int(limiter.limit)
+            for _ in range(held):
+                limiter.acquire()
+            for _ in range(held):
+                limiter.release(throttled=False)
+        assert limiter.limit == 5
+        limiter.limit = 4.0
+        limiter.acquire()
+        limiter.release(throttled=True)
+        limiter.acquire()
+        limiter.release(throttled=True)
+        # One overload, one cut
+        assert limiter.limit == 2.0
+
+    def test_backoff_is_jittered_and_capped(self):
+        delays = {throttle.backoff(3) for _ in range(20)}
+        assert len(delays) > 1
+        assert all(0 <= d <= 0.08 for d in delays)
+        assert throttle.backoff(100) <= throttle.BACKOFF_CAP
+
+    def test_unsaturated_limit_does_not_grow(self):
+        limiter = throttle.AIMDLimiter(4, max_limit=16)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(throttled=False)
+        assert limiter.limit == 4
+
+    def test_client_adapts_to_throttling(self, monkeypatch):
+        import boto3
+
+        # Fast enough that concurrency, not the request rate, is the limit
+        monkeypatch.setitem(throttle.THROTTLE_DEFAULTS, 'pricing',
+                            {'rate': 1000.0, 'burst': 1000.0, 'concurrency': 2, 'max_concurrency': 8})
+        api = ThrottlingPricingAPI(max_in_flight=2)
+        try:
+            session = boto3.session.Session(aws_access_key_id='test', aws_secret_access_key='test',
+                                            region_name='test-region-1')
+            client = throttle.install_throttle(session.client('pricing', endpoint_url=api.url), 'pricing')
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(lambda _: client.get_products(ServiceCode='AmazonEC2'), range(24)))
+        finally:
+            api.close()
+        assert len(results) == 24
+        assert api.served == 24
+        stats = throttle.get_throttle('pricing', 'test-region-1').snapshot()
+        assert stats['requests'] == 24 + stats['throttled']
+        # Starts at 2 concurrent requests, so throttles only come from probing above that
+        assert 0 < stats['throttled'] <= 12
+        assert stats['concurrency_limit'] < 4
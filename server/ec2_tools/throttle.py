@@ -0,0 +1,209 @@
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from ..metrics import get_metrics
+
+# Error codes AWS services use to signal request rate or concurrency limits
+THROTTLE_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'RequestLimitExceeded', 'RequestThrottled', 'SlowDown',
+    'BandwidthLimitExceeded', 'LimitExceededException', 'PriorRequestNotComplete', 'EC2ThrottledException',
+}
+
+# Per service: sustained requests per second, burst, and initial and maximum concurrency.
+# EC2 Describe* calls refill at about 20/s from a bucket of 100, the Pricing
+# API allows far less.
+THROTTLE_DEFAULTS: Dict[str, Dict[str, float]] = {
+    'pricing': {'rate': 5.0, 'burst': 10.0, 'concurrency': 2, 'max_concurrency': 8},
+    'ec2': {'rate': 20.0, 'burst': 50.0, 'concurrency': 4, 'max_concurrency': 32},
+    '*': {'rate': 10.0, 'burst': 20.0, 'concurrency': 4, 'max_concurrency': 16},
+}
+
+# Backoff after a throttled attempt: uniform in [0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt)]
+BACKOFF_BASE = 0.2
+BACKOFF_CAP = 20.0
+# Throttled attempts retried per call before botocore's own retry policy decides
+MAX_THROTTLE_ATTEMPTS = 8
+# The concurrency limit is cut at most once per this many seconds, one
+# overload usually throttles every request in flight
+DECREASE_INTERVAL = 1.0
+DECREASE_FACTOR = 0.5
+
+
+class TokenBucket:
+    """Allows rate requests per second on average with bursts of up to burst requests."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self) -> None:
+        """Drop saved up tokens, so callers go back to the sustained rate."""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    Each successful request made while the limit was fully used raises it
+    by 1/limit, about one more request in flight per round of successes.
+    A throttle cuts the limit by DECREASE_FACTOR, at most once per
+    DECREASE_INTERVAL.
+    """
+
+    def __init__(self, limit: float, max_limit: float, min_limit: float = 1.0) -> None:
+        self.limit = float(limit)
+        self.max_limit = float(max_limit)
+        self.min_limit = float(min_limit)
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled: bool) -> None:
+        with self._cond:
+            # Only a limit that was reached has been shown to be sustainable
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_decrease >= DECREASE_INTERVAL:
+                    self.limit = max(self.min_limit, self.limit * DECREASE_FACTOR)
+                    self._last_decrease = now
+            elif saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class Throttle:
+    """Rate and concurrency control shared by every client of one AWS service and region."""
+
+    def __init__(self, service: str, region: str, rate: float, burst: float,
+                 concurrency: float, max_concurrency: float) -> None:
+        self.service = service
+        self.region = region
+        self.bucket = TokenBucket(rate, burst)
+        self.limiter = AIMDLimiter(concurrency, max_concurrency)
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def before_attempt(self) -> None:
+        self.limiter.acquire()
+        waited = self.bucket.acquire()
+        with self._lock:
+            self.requests += 1
+            self.waited += waited
+
+    def after_attempt(self, throttled: bool) -> None:
+        self.limiter.release(throttled)
+        if throttled:
+            self.bucket.drain()
+            with self._lock:
+                self.throttled += 1
+        get_metrics().aws_request(self.service, self.region, throttled)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'service': self.service,
+                'region': self.region,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'waited_s': self.waited,
+                'concurrency_limit': self.limiter.limit,
+                'rate': self.bucket.rate,
+            }
+
+
+def backoff(attempt: int) -> float:
+    """Full jitter exponential backoff for the given attempt, starting at 1."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def is_throttle(response: Optional[Tuple[Any, Dict[str, Any]]]) -> bool:
+    if response is None:
+        return False
+    http_response, parsed = response
+    code = parsed.get('Error', {}).get('Code', '') if isinstance(parsed, dict) else ''
+    return code in THROTTLE_CODES or getattr(http_response, 'status_code', 0) == 429
+
+
+_throttles: Dict[Tuple[str, str], Throttle] = {}
+_throttles_lock = threading.Lock()
+
+
+def get_throttle(service: str, region: str) -> Throttle:
+    """Return the process-wide Throttle for service in region."""
+    key = (service, region)
+    with _throttles_lock:
+        throttle = _throttles.get(key)
+        if throttle is None:
+            throttle = Throttle(service, region, **THROTTLE_DEFAULTS.get(service, THROTTLE_DEFAULTS['*']))
+            _throttles[key] = throttle
+        return throttle
+
+
+def reset_throttles() -> None:
+    with _throttles_lock:
+        _throttles.clear()
+
+
+def throttle_snapshot() -> list:
+    with _throttles_lock:
+        throttles = list(_throttles.values())
+    return [t.snapshot() for t in throttles]
+
+
+def install_throttle(client: Any, service: str) -> Any:
+    """
+    Route every HTTP attempt of a botocore client through its service and region Throttle.
+
+    Hooks each attempt rather than each call, so paginated calls are paced
+    page by page and botocore retries take a slot like any other request.
+    Throttled attempts are retried after a jittered backoff; other errors
+    are left to botocore's retry policy.
+    """
+    throttle = get_throttle(service, client.meta.region_name or '')
+
+    def before_send(**kwargs: Any) -> None:
+        throttle.before_attempt()
+
+    def needs_retry(response: Any = None, attempts: int = 1, **kwargs: Any) -> Optional[float]:
+        throttled = is_throttle(response)
+        throttle.after_attempt(throttled)
+        if throttled and attempts < MAX_THROTTLE_ATTEMPTS:
+            return backoff(attempts)
+        return None
+
+    client.meta.events.register_first('before-send', before_send)
+    client.meta.events.register_first('needs-retry', needs_retry)
+    return client
@@ -1,2 +1,4 @@
-from .tool import machine_lookup
+from .tool import machine_lookup, machine_lookup_by_hash, machine_key_by_instance_id
+from .instance_index import get_instance_index
+from .registry import get_registry
 from .tool import manual
@@ -0,0 +1,102 @@
+import contextvars
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from ..bitflux_catcher_api import ApiException
+
+# How long the first lookup waits for others to join its batch
+BATCH_WINDOW = 0.01
+# Flush immediately once this many distinct hashes are pending
+MAX_BATCH = 256
+
+
+class LookupBatcher:
+    """
+    Coalesces concurrent single-instance machine lookups into one request.
+
+    The first caller starts a short timer; every hash submitted before it
+    fires goes out in a single /machinelookup call using instance_hashes,
+    and each caller gets back the machines matching its own hash. Hashes a
+    batch answered nothing for are looked up on their own, in case the
+    catcher ignored instance_hashes. If the catcher rejects batched requests,
+    answers them with machines that were not asked for, or finds machines
+    for a hash on its own that its batch missed, the batcher falls back to
+    one request per hash for the rest of the process.
+
+    The flush runs in the context of the lookup that started the batch, so
+    its catcher call is traced under that lookup's span.
+
+    fetch is called as fetch(instance_hash=...) or fetch(instance_hashes=[...])
+    and must return the list of machine dicts from the response.
+    """
+
+    def __init__(self, fetch: Callable[..., List[Dict[str, Any]]],
+                 window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH) -> None:
+        self.fetch = fetch
+        self.window = window
+        self.max_batch = max_batch
+        self.batch_supported = True
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[Future]] = {}
+        self._timer: Optional[threading.Timer] = None
+
+    def lookup(self, instance_hash: str) -> List[Dict[str, Any]]:
+        """Return the machines for instance_hash, blocking until its batch completes."""
+        future: Future = Future()
+        flush_now = False
+        with self._lock:
+            self._pending.setdefault(instance_hash, []).append(future)
+            if len(self._pending) >= self.max_batch:
+                flush_now = True
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, contextvars.copy_context().run, (self._flush,))
+                self._timer.daemon = True
+                self._timer.start()
+        if flush_now:
+            self._flush()
+        return future.result()
+
+    def _flush(self) -> None:
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        try:
+            results = self._fetch_all(list(pending))
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    future.set_exception(e)
+            return
+        for instance_hash, futures in pending.items():
+            for future in futures:
+                future.set_result(results.get(instance_hash, []))
+
+    def _fetch_all(self, hashes: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        if len(hashes) == 1 or not self.batch_supported:
+            return {h: self.fetch(instance_hash=h) for h in hashes}
+        try:
+            machines = self.fetch(instance_hashes=hashes)
+        except ApiException as e:
+            if e.status not in (400, 404, 422):
+                raise
+            self.batch_supported = False
+            return self._fetch_all(hashes)
+        results: Dict[str, List[Dict[str, Any]]] = {}
+        for machine in machines:
+            results.setdefault(machine.get('instanceId', ''), []).append(machine)
+        if not set(results) <= set(hashes):
+            # An unfiltered list, the catcher does not know instance_hashes
+            self.batch_supported = False
+            return self._fetch_all(hashes)
+        for h in hashes:
+            if h not in results:
+                results[h] = self.fetch(instance_hash=h)
+                if results[h]:
+                    self.batch_supported = False
+        return results
@@ -0,0 +1,81 @@
+import hashlib
+import threading
+import time
+from typing import Dict, List, Optional
+
+from ..cache import get_store
+
+_INDEX_NAMESPACE = 'instance_hash'
+# Minimum seconds between re-reading the on-disk index after a miss
+RELOAD_INTERVAL = 5.0
+
+
+def sha256_hex(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+class InstanceHashIndex:
+    """
+    Persisted instance_id -> instance_hash index.
+
+    The catcher only knows instances by the SHA-256 of their id. The index
+    keeps every hash we have computed, in memory and in the on-disk cache,
+    so repeated region scans reuse them and hashes returned by the catcher
+    can be mapped back to instance ids. Hashes added by other processes
+    sharing the cache are picked up by re-reading the index on a miss.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._loaded_at = 0.0
+        self._by_id: Dict[str, str] = {}
+        self._by_hash: Dict[str, str] = {}
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._by_id = get_store().get_all(_INDEX_NAMESPACE)
+        self._by_hash = {h: i for i, h in self._by_id.items()}
+        self._loaded = True
+        self._loaded_at = time.monotonic()
+
+    def hashes_of(self, instance_ids: List[str]) -> List[str]:
+        """Return the hash of each instance id, computing and persisting any new ones."""
+        with self._lock:
+            self._load()
+            new = {}
+            for instance_id in instance_ids:
+                if instance_id and instance_id not in self._by_id and instance_id not in new:
+                    new[instance_id] = sha256_hex(instance_id)
+            if new:
+                self._by_id.update(new)
+                self._by_hash.update({h: i for i, h in new.items()})
+                get_store().put_many(_INDEX_NAMESPACE, new)
+            return [self._by_id.get(i, '') for i in instance_ids]
+
+    def hash_of(self, instance_id: str) -> str:
+        return self.hashes_of([instance_id])[0]
+
+    def instance_id_for(self, instance_hash: str) -> Optional[str]:
+        with self._lock:
+            self._load()
+            instance_id = self._by_hash.get(instance_hash)
+            if instance_id is None and time.monotonic() - self._loaded_at >= RELOAD_INTERVAL:
+                self._loaded = False
+                self._load()
+                instance_id = self._by_hash.get(instance_hash)
+            return instance_id
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id = {}
+            self._by_hash = {}
+            self._loaded = False
+
+
+_index = InstanceHashIndex()
+
+
+def get_instance_index() -> InstanceHashIndex:
+    return _index
@@ -0,0 +1,145 @@
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..cache import cache_dir, connect
+from .instance_index import get_instance_index
+
+# How long a registry entry is trusted before going back to the catcher
+REGISTRY_MAX_AGE = 24 * 3600
+
+# MachineLookup fields as returned by json_format.MessageToDict, mapped to columns
+_FIELDS = {
+    'machineKey': 'machine_key',
+    'instanceId': 'instance_hash',
+    'accountId': 'account_hash',
+    'amiId': 'ami_id',
+    'deviceid': 'deviceid',
+    'organizationId': 'organization_id',
+}
+
+
+class MachineRegistry:
+    """
+    Local registry of machine_key <-> instance id <-> instance hash <-> account <-> AMI.
+
+    Rows are upserted from every MachineLookupList the catcher returns, so
+    the registry is refreshed incrementally as lookups happen. The catcher
+    only knows hashes; the plain instance id is filled in from the instance
+    hash index when we have seen it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS machines ('
+                ' machine_key TEXT PRIMARY KEY,'
+                ' instance_id TEXT,'
+                ' instance_hash TEXT,'
+                ' account_hash TEXT,'
+                ' ami_id TEXT,'
+                ' deviceid TEXT,'
+                ' organization_id TEXT,'
+                ' updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS machines_instance_hash ON machines (instance_hash)')
+            conn.execute('CREATE INDEX IF NOT EXISTS machines_account_hash ON machines (account_hash)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def record(self, machines: List[Dict[str, Any]], account_hash: str = '') -> None:
+        """
+        Upsert machines from a MachineLookupList response.
+
+        If account_hash is given the list is the full set of machines for
+        that account, and machines no longer listed are dropped.
+        """
+        now = time.time()
+        index = get_instance_index()
+        rows = []
+        for machine in machines:
+            if not machine.get('machineKey'):
+                continue
+            row = {col: machine.get(field, '') for field, col in _FIELDS.items()}
+            row['instance_id'] = index.instance_id_for(row['instance_hash']) or ''
+            row['updated_at'] = now
+            rows.append(row)
+        with self._connect() as conn:
+            if account_hash:
+                conn.execute('DELETE FROM machines WHERE account_hash = ?', (account_hash,))
+            conn.executemany(
+                'INSERT INTO machines (machine_key, instance_id, instance_hash, account_hash, ami_id,'
+                ' deviceid, organization_id, updated_at)'
+                ' VALUES (:machine_key, :instance_id, :instance_hash, :account_hash, :ami_id,'
+                ' :deviceid, :organization_id, :updated_at)'
+                ' ON CONFLICT (machine_key) DO UPDATE SET'
+                ' instance_id = CASE WHEN excluded.instance_id != \'\' THEN excluded.instance_id ELSE machines.instance_id END,'
+                ' instance_hash = excluded.instance_hash, account_hash = excluded.account_hash,'
+                ' ami_id = excluded.ami_id, deviceid = excluded.deviceid,'
+                ' organization_id = excluded.organization_id, updated_at = excluded.updated_at',
+                rows,
+            )
+
+    def _select(self, where: str, params: tuple, max_age: Optional[float]) -> List[Dict[str, Any]]:
+        query = f'SELECT {", ".join(_FIELDS.values())}, instance_id FROM machines WHERE {where}'
+        if max_age is not None:
+            query += ' AND updated_at >= ?'
+            params = params + (time.time() - max_age,)
+        rows = self._connect().execute(query + ' ORDER BY updated_at DESC', params).fetchall()
+        fields = list(_FIELDS.keys())
+        machines = []
+        for row in rows:
+            machine = {fields[i]: row[i] for i in range(len(fields)) if row[i]}
+            if row[-1]:
+                machine['instanceIdPlain'] = row[-1]
+            machines.append(machine)
+        return machines
+
+    def by_instance_hash(self, instance_hash: str, max_age: Optional[float] = REGISTRY_MAX_AGE) -> List[Dict[str, Any]]:
+        """Return registry entries for an instance hash, in the same shape as machine_lookup results."""
+        return self._select('instance_hash = ?', (instance_hash,), max_age)
+
+    def by_account_hash(self, account_hash: str, max_age: Optional[float] = REGISTRY_MAX_AGE) -> List[Dict[str, Any]]:
+        return self._select('account_hash = ?', (account_hash,), max_age)
+
+    def all(self) -> List[Dict[str, Any]]:
+        return self._select('1 = 1', (), None)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Every entry with its column names, updated_at in epoch seconds."""
+        conn = self._connect()
+        cursor = conn.execute('SELECT * FROM machines ORDER BY machine_key')
+        names = [d[0] for d in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def forget(self, machine_key: str) -> None:
+        with self._connect() as conn:
+            conn.execute('DELETE FROM machines WHERE machine_key = ?', (machine_key,))
+
+
+_registry: Optional[MachineRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MachineRegistry:
+    """Return the process-wide MachineRegistry stored next to the other caches."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MachineRegistry(cache_dir() / 'cache.sqlite')
+        return _registry
+
+
+def reset_registry() -> None:
+    """Forget the process-wide registry so the next get_registry() reopens it (used by tests)."""
+    global _registry
+    with _registry_lock:
+        _registry = None
@@ -0,0 +1,163 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ..bitflux_catcher_api import ApiException
+from ..bitflux_catcher_api.standin import StandinCatcher
+from ..cache import reset_store
+from . import instance_index, registry, tool
+from .batcher import LookupBatcher
+from .instance_index import sha256_hex
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+    reset_store()
+    registry.reset_registry()
+    instance_index.get_instance_index().clear()
+    yield
+    reset_store()
+    registry.reset_registry()
+    instance_index.get_instance_index().clear()
+
+
+def machine(key, instance_id, account='acct'):
+    return {
+        'machineKey': key,
+        'instanceId': sha256_hex(instance_id),
+        'accountId': sha256_hex(account),
+        'amiId': 'ami-1',
+    }
+
+
+class TestInstanceHashIndex:
+
+    def test_hashes_and_reverse(self):
+        index = instance_index.get_instance_index()
+        assert index.hashes_of(['i-1', 'i-2']) == [sha256_hex('i-1'), sha256_hex('i-2')]
+        assert index.instance_id_for(sha256_hex('i-2')) == 'i-2'
+
+    def test_persisted(self):
+        index = instance_index.get_instance_index()
+        index.hash_of('i-1')
+        index.clear()
+        assert index.instance_id_for(sha256_hex('i-1')) == 'i-1'
+
+    def test_sees_hashes_of_other_processes(self, monkeypatch):
+        monkeypatch.setattr(instance_index, 'RELOAD_INTERVAL', 0.0)
+        ours, theirs = instance_index.InstanceHashIndex(), instance_index.InstanceHashIndex()
+        assert ours.instance_id_for(sha256_hex('i-9')) is None
+        theirs.hash_of('i-9')
+        assert ours.instance_id_for(sha256_hex('i-9')) == 'i-9'
+
+
+class TestMachineRegistry:
+
+    def test_record_and_lookup(self):
+        instance_index.get_instance_index().hash_of('i-1')
+        reg = registry.get_registry()
+        reg.record([machine('k1', 'i-1'), machine('k2', 'i-2')])
+        found = reg.by_instance_hash(sha256_hex('i-1'))
+        assert [m['machineKey'] for m in found] == ['k1']
+        assert found[0]['instanceIdPlain'] == 'i-1'
+        assert found[0]['amiId'] == 'ami-1'
+        assert len(reg.by_account_hash(sha256_hex('acct'))) == 2
+
+    def test_account_refresh_drops_missing(self):
+        reg = registry.get_registry()
+        reg.record([machine('k1', 'i-1'), machine('k2', 'i-2')])
+        reg.record([machine('k2', 'i-2')], account_hash=sha256_hex('acct'))
+        assert [m['machineKey'] for m in reg.by_account_hash(sha256_hex('acct'))] == ['k2']
+
+    def test_max_age(self):
+        reg = registry.get_registry()
+        reg.record([machine('k1', 'i-1')])
+        assert reg.by_instance_hash(sha256_hex('i-1'), max_age=-1) == []
+
+    def test_machine_key_skips_lookup_on_hit(self, catcher):
+        catcher.add_machine('k1', sha256_hex('i-1'), sha256_hex('acct'))
+        assert tool.machine_key_by_instance_id('i-1', catcher.url) == 'k1'
+        assert tool.machine_key_by_instance_id('i-1', catcher.url) == 'k1'
+        assert catcher.requests['/machinelookup'] == 1
+
+
+@pytest.fixture
+def catcher():
+    with StandinCatcher() as c:
+        yield c
+
+
+class TestLookupBatcher:
+
+    def test_concurrent_lookups_coalesced(self, catcher):
+        ids = [f'i-{n}' for n in range(8)]
+        for n, instance_id in enumerate(ids):
+            catcher.add_machine(f'k{n}', sha256_hex(instance_id))
+        batcher = LookupBatcher(functools.partial(tool.request_machines, catcher.url), window=0.2)
+        with ThreadPoolExecutor(len(ids)) as pool:
+            results = list(pool.map(batcher.lookup, [sha256_hex(i) for i in ids]))
+        assert [r[0]['machineKey'] for r in results] == [f'k{n}' for n in range(8)]
+        assert catcher.requests['/machinelookup'] == 1
+        assert len(catcher.bodies[0]['instance_hashes']) == 8
+
+    def test_unknown_hash_gets_empty_list(self, catcher):
+        catcher.add_machine('k1', sha256_hex('i-1'))
+        batcher = LookupBatcher(functools.partial(tool.request_machines, catcher.url), window=0.2)
+        with ThreadPoolExecutor(2) as pool:
+            found, missing = pool.map(batcher.lookup, [sha256_hex('i-1'), sha256_hex('i-2')])
+        assert found[0]['machineKey'] == 'k1'
+        assert missing == []
+
+    def test_falls_back_when_batches_rejected(self):
+        calls = []
+
+        def fetch(instance_hash=None, instance_hashes=None):
+            calls.append(instance_hashes or instance_hash)
+            if instance_hashes is not None:
+                raise ApiException(status=400, reason='unknown field')
+            return [{'machineKey': 'k-' + instance_hash, 'instanceId': instance_hash}]
+
+        batcher = LookupBatcher(fetch, window=0.2)
+        with ThreadPoolExecutor(2) as pool:
+            results = list(pool.map(batcher.lookup, ['a', 'b']))
+        assert [r[0]['machineKey'] for r in results] == ['k-a', 'k-b']
+        assert batcher.batch_supported is False
+        assert len(calls) == 3
+
+    @pytest.mark.parametrize('answer', ['empty', 'unfiltered'])
+    def test_falls_back_when_batches_ignored(self, answer):
+        machines = {h: {'machineKey': 'k-' + h, 'instanceId': h} for h in ('a', 'b', 'c')}
+        calls = []
+
+        def fetch(instance_hash=None, instance_hashes=None):
+            calls.append(instance_hashes or instance_hash)
+            if instance_hashes is not None:
+                # A catcher without instance_hashes sees a request without filters
+                return [] if answer == 'empty' else list(machines.values())
+            return [machines[instance_hash]]
+
+        batcher = LookupBatcher(fetch, window=0.2)
+        with ThreadPoolExecutor(2) as pool:
+            results = list(pool.map(batcher.lookup, ['a', 'b']))
+        assert [r[0]['machineKey'] for r in results] == ['k-a', 'k-b']
+        assert batcher.batch_supported is False and len(calls) == 3
+
+    def test_flush_is_traced_under_the_first_lookup(self):
+        from ..tracing import add_exporter, reset_exporters, span
+
+        def fetch(instance_hash=None, instance_hashes=None):
+            with span('catcher.machinelookup'):
+                return []
+
+        traces = []
+        add_exporter(type('Collect', (), {'export': lambda self, spans: traces.append(spans)})())
+        try:
+            with span('tool', root=True) as root:
+                LookupBatcher(fetch, window=0.05).lookup('a')
+        finally:
+            reset_exporters()
+        [spans] = traces
+        assert [s.name for s in spans] == ['catcher.machinelookup', 'tool']
+        assert spans[0].parent_id == root.span_id
@@ -4,47 +4,143 @@ from ..bitflux_catcher_api import Configuration
 from ..bitflux_catcher_api import ApiClient
 from ..bitflux_catcher_api import MachineLookupRequest
 from ..bitflux_catcher_api import downloadstats_pb2
+from ..bitflux_catcher_api import CatcherUnavailable, call_catcher
 from ..ec2_tools import list_ec2_instances
-from ..ec2_tools import get_aws_account_id
+from ..ec2_tools import get_identity
+from ..cache import get_store
+from .instance_index import get_instance_index, sha256_hex
+from .registry import get_registry
+from .batcher import LookupBatcher
+from ..metrics import get_metrics
+from ..tracing import span
 from google.protobuf import json_format
-from typing import Any, Dict, List
-import hashlib
+from typing import Any, Dict, List, Optional
+import functools
+import sys
+import threading
+import time
+
+_ACCOUNT_LOOKUP_NAMESPACE = 'account_lookup'
+# How long the catcher's full machine list for an account is reused from the registry
+ACCOUNT_LOOKUP_MAX_AGE = 300
 
 
 def machine_lookup(instance_id: str, account_id: str, url: str) -> List[Dict[str, Any]]:
-    """Lookup machine information by instance and/or account hashes."""
+    """Lookup machine information by instance and/or account ids."""
+    instance_hash = get_instance_index().hash_of(instance_id) if instance_id else ""
+    account_hash = sha256_hex(account_id) if account_id else ""
+    return machine_lookup_by_hash(instance_hash, account_hash, url)
+
+def request_machines(url: str, instance_hash: str = "", account_hash: str = "",
+                     instance_hashes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Call /machinelookup and record the machines in the registry, raising on failure."""
     # Initialize API client
-    configuration = Configuration(host=url)
+    # Retries are left to call_catcher
+    configuration = Configuration(host=url, retries=False)
     with ApiClient(configuration) as api_client:
         api_instance = DefaultApi(api_client)
-        instance_hash = hashlib.sha256(instance_id.encode()).hexdigest() if instance_id else ""
-        account_hash = hashlib.sha256(account_id.encode()).hexdigest() if account_id else ""
-        body = MachineLookupRequest(instance_hash=instance_hash, account_hash=account_hash)
-
-        try:
-            response = api_instance.machine_lookup(machine_lookup_request=body)
-        except Exception as e:
-            print(f"Error calling machine_lookup: {e}")
-            return {}
-
-        # Parse Protobuf response
-        mlist_pb = downloadstats_pb2.MachineLookupList()
-        mlist_pb.ParseFromString(response)
-        # Convert to dict
-        result = json_format.MessageToDict(mlist_pb)
-        return result['machines']
+        if instance_hashes is not None:
+            body = MachineLookupRequest(instance_hashes=instance_hashes)
+        else:
+            body = MachineLookupRequest(instance_hash=instance_hash, account_hash=account_hash)
+
+        with span('catcher.machinelookup', batch=len(instance_hashes or [])) as s:
+            response = call_catcher(url, 'machinelookup', lambda timeout: api_instance.machine_lookup(
+                machine_lookup_request=body, _request_timeout=timeout))
+
+            # Parse Protobuf response
+            mlist_pb = downloadstats_pb2.MachineLookupList()
+            mlist_pb.ParseFromString(response)
+            # Convert to dict
+            result = json_format.MessageToDict(mlist_pb)
+            machines = result.get('machines', [])
+            s.set('machines', len(machines))
+        # An account-only lookup is the full list for that account
+        full_account = account_hash if not instance_hash and instance_hashes is None else ""
+        get_registry().record(machines, account_hash=full_account)
+        return machines
+
+def machine_lookup_by_hash(instance_hash: str, account_hash: str, url: str) -> List[Dict[str, Any]]:
+    """Lookup machine information by instance and/or account hashes."""
+    try:
+        return request_machines(url, instance_hash=instance_hash, account_hash=account_hash)
+    except Exception as e:
+        print(f"Error calling machine_lookup: {e}", file=sys.stderr)
+        return {}
+
+def machines_by_account_hash(account_hash: str, url: str) -> List[Dict[str, Any]]:
+    """
+    Return every machine of an account.
+
+    After the catcher has listed the account the registry holds exactly its
+    machines, so for ACCOUNT_LOOKUP_MAX_AGE seconds they are read from there.
+    """
+    if get_store().get(_ACCOUNT_LOOKUP_NAMESPACE, account_hash, max_age=ACCOUNT_LOOKUP_MAX_AGE) is not None:
+        get_metrics().cache('account_lookup', hit=True)
+        return get_registry().by_account_hash(account_hash)
+    get_metrics().cache('account_lookup', hit=False)
+    try:
+        machines = request_machines(url, account_hash=account_hash)
+    except CatcherUnavailable as e:
+        # Whatever the registry last heard about the account beats nothing
+        get_metrics().catcher_request('machinelookup', 'fallback')
+        print(f"Error calling machine_lookup, using cached machines: {e}", file=sys.stderr)
+        return get_registry().by_account_hash(account_hash, max_age=None)
+    except Exception as e:
+        print(f"Error calling machine_lookup: {e}", file=sys.stderr)
+        return []
+    get_store().put(_ACCOUNT_LOOKUP_NAMESPACE, account_hash, time.time())
+    return machines
+
+_batchers: Dict[str, LookupBatcher] = {}
+_batchers_lock = threading.Lock()
+
+def get_lookup_batcher(url: str) -> LookupBatcher:
+    """Return the process-wide LookupBatcher for a catcher url."""
+    with _batchers_lock:
+        batcher = _batchers.get(url)
+        if batcher is None:
+            batcher = LookupBatcher(functools.partial(request_machines, url))
+            _batchers[url] = batcher
+        return batcher
+
+def machine_key_by_instance_id(instance_id: str, url: str) -> str:
+    """Resolve the machine_key for an instance id, from the local registry when possible."""
+    with span('machine_lookup', instance_id=instance_id) as s:
+        instance_hash = get_instance_index().hash_of(instance_id)
+        machines = get_registry().by_instance_hash(instance_hash)
+        get_metrics().cache('machine_registry', hit=len(machines) > 0)
+        s.set('cached', len(machines) > 0)
+        if len(machines) == 0:
+            try:
+                machines = get_lookup_batcher(url).lookup(instance_hash)
+            except CatcherUnavailable:
+                # Machine keys do not change, an expired registry entry is still right
+                machines = get_registry().by_instance_hash(instance_hash, max_age=None)
+                if len(machines) == 0:
+                    raise
+                get_metrics().catcher_request('machinelookup', 'fallback')
+                s.set('stale', True)
+    if len(machines) == 0:
+        raise Exception(f"No machines found for instance_id {instance_id}")
+    machine_key = machines[0].get('machineKey', None)
+    if machine_key is None:
+        raise Exception(f"No machine key found for instance_id {instance_id} {machines}")
+    return machine_key
 
 def lookup_machines_by_region(region: str, url: str) -> Dict[str, Any]:
-    instances = list_ec2_instances(region)
-    account_id = get_aws_account_id()
-    machines = machine_lookup("", account_id, url)
+    with span('ec2.describe_instances', region=region):
+        instances = list_ec2_instances(region)
+    with span('sts.identity'):
+        account_hash = get_identity().account_hash
+    machines = machines_by_account_hash(account_hash, url)
     indexed_machines = {}
     for machine in machines:
         indexed_machines[machine["instanceId"]] = machine
+    hashed_instance_ids = get_instance_index().hashes_of(instances["InstanceId"])
     output = {"Name": [], "InstanceType": [], "InstanceId": [], "machineKey": []}
     for i in range(len(instances["InstanceId"])):
-        instance_id = instances["InstanceId"][i]
-        hashed_instance_id = hashlib.sha256(instance_id.encode()).hexdigest()
+        hashed_instance_id = hashed_instance_ids[i]
         if not hashed_instance_id in indexed_machines:
             continue
         if instances["State"][i] != "running":
@@ -0,0 +1,2 @@
+from .metrics import Metrics, OPENMETRICS_CONTENT_TYPE, get_metrics, merge_openmetrics
+from .instrument import InstrumentedFastMCP, instrument
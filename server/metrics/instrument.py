@@ -0,0 +1,88 @@
+import functools
+import inspect
+import json
+import time
+from typing import Any, Callable, Optional
+
+from mcp.server.fastmcp import FastMCP
+
+from ..profiling import profile_call
+from ..tracing import span
+from .metrics import get_metrics
+
+
+def response_size(result: Any) -> int:
+    """Approximate size in bytes of result once serialized for the client."""
+    if isinstance(result, bytes):
+        return len(result)
+    if isinstance(result, str):
+        return len(result.encode())
+    try:
+        return len(json.dumps(result, default=str).encode())
+    except (TypeError, ValueError):
+        return len(str(result).encode())
+
+
+def is_error(result: Any) -> bool:
+    """Tools report failures as {'status': 'error', ...} rather than raising."""
+    return isinstance(result, dict) and result.get('status') == 'error'
+
+
+def instrument(fn: Callable[..., Any], kind: str, name: str) -> Callable[..., Any]:
+    """
+    Wrap a tool, resource or prompt function so every call is recorded in the
+    metrics and, when enabled, traced as the root span of its own trace and profiled.
+
+    The wrapper keeps fn's signature, so FastMCP derives the same argument
+    schema and still injects the Context.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        error, size = True, 0
+        with span(f'{kind} {name}', root=True, **{'mcp.kind': kind, 'mcp.name': name}) as call, \
+                profile_call(kind, name):
+            try:
+                result = fn(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    result = await result
+                error, size = is_error(result), response_size(result)
+                if error:
+                    call.fail(str(result.get('message', '')))
+                call.set('response_bytes', size)
+                return result
+            finally:
+                get_metrics().observe_call(kind, name, time.perf_counter() - start, size, error)
+
+    return wrapper
+
+
+class InstrumentedFastMCP(FastMCP):
+    """FastMCP server whose tools, resources and prompts are all wrapped with instrument()."""
+
+    def tool(self, name: Optional[str] = None, description: Optional[str] = None, **kwargs: Any) -> Callable:
+        register = super().tool(name=name, description=description, **kwargs)
+
+        def decorator(fn: Callable) -> Callable:
+            register(instrument(fn, 'tool', name or fn.__name__))
+            return fn
+
+        return decorator
+
+    def resource(self, uri: str, **kwargs: Any) -> Callable:
+        register = super().resource(uri, **kwargs)
+
+        def decorator(fn: Callable) -> Callable:
+            register(instrument(fn, 'resource', uri))
+            return fn
+
+        return decorator
+
+    def prompt(self, name: Optional[str] = None, description: Optional[str] = None) -> Callable:
+        register = super().prompt(name=name, description=description)
+
+        def decorator(fn: Callable) -> Callable:
+            register(instrument(fn, 'prompt', name or fn.__name__))
+            return fn
+
+        return decorator
@@ -0,0 +1,211 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'bitflux'
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a running count and sum."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, count of observations <= le) pairs, ending with +Inf."""
+        total = 0
+        out = []
+        for bound, n in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += n
+            out.append(('+Inf' if bound == float('inf') else _number(bound), total))
+        return out
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + '}'
+
+
+class Metrics:
+    """
+    Process-wide counters and histograms for tool calls and caches.
+
+    Calls are keyed by kind ('tool', 'resource' or 'prompt') and name. Caches
+    report hits and misses by cache name, AWS requests whether they were
+    throttled by service and region, and catcher calls their outcome by
+    endpoint. Everything is guarded by one lock,
+    so tools running in worker threads can record safely.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._caches: Dict[str, Dict[str, int]] = {}
+        self._aws: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self._catcher: Dict[Tuple[str, str], int] = {}
+
+    def observe_call(self, kind: str, name: str, seconds: float, response_bytes: int, error: bool) -> None:
+        with self._lock:
+            entry = self._calls.get((kind, name))
+            if entry is None:
+                entry = {
+                    'calls': 0,
+                    'errors': 0,
+                    'latency': Histogram(LATENCY_BUCKETS),
+                    'response_bytes': Histogram(SIZE_BUCKETS),
+                }
+                self._calls[(kind, name)] = entry
+            entry['calls'] += 1
+            entry['errors'] += int(error)
+            entry['latency'].observe(seconds)
+            entry['response_bytes'].observe(response_bytes)
+
+    def cache(self, name: str, hit: bool) -> None:
+        """Count one lookup in cache name."""
+        with self._lock:
+            entry = self._caches.setdefault(name, {'hit': 0, 'miss': 0})
+            entry['hit' if hit else 'miss'] += 1
+
+    def aws_request(self, service: str, region: str, throttled: bool) -> None:
+        """Count one AWS request attempt."""
+        with self._lock:
+            entry = self._aws.setdefault((service, region), {'ok': 0, 'throttled': 0})
+            entry['throttled' if throttled else 'ok'] += 1
+
+    def catcher_request(self, endpoint: str, result: str) -> None:
+        """Count one catcher client outcome, e.g. 'ok', 'retried', 'hedged' or 'short_circuited'."""
+        with self._lock:
+            self._catcher[(endpoint, result)] = self._catcher.get((endpoint, result), 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values as plain dictionaries, e.g. for the server_metrics tool."""
+        with self._lock:
+            calls = []
+            for (kind, name), entry in sorted(self._calls.items()):
+                latency, size = entry['latency'], entry['response_bytes']
+                calls.append({
+                    'kind': kind,
+                    'name': name,
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'latency_seconds_sum': latency.sum,
+                    'latency_seconds_mean': latency.sum / latency.count if latency.count else 0.0,
+                    'latency_seconds_buckets': dict(latency.cumulative()),
+                    'response_bytes_sum': int(size.sum),
+                    'response_bytes_mean': size.sum / size.count if size.count else 0.0,
+                })
+            caches = {name: dict(entry) for name, entry in sorted(self._caches.items())}
+            aws = [{'service': service, 'region': region, **entry} for (service, region), entry in sorted(self._aws.items())]
+            catcher: Dict[str, Dict[str, int]] = {}
+            for (endpoint, result), count in sorted(self._catcher.items()):
+                catcher.setdefault(endpoint, {})[result] = count
+            return {'calls': calls, 'caches': caches, 'aws_requests': aws, 'catcher_requests': catcher}
+
+    def render(self) -> str:
+        """Render all metrics in the OpenMetrics text format."""
+        lines = []
+        with self._lock:
+            calls = sorted(self._calls.items())
+            caches = sorted(self._caches.items())
+            aws = sorted(self._aws.items())
+            catcher = sorted(self._catcher.items())
+
+            lines += [f'# TYPE {PREFIX}_calls counter', f'# HELP {PREFIX}_calls Tool, resource and prompt calls.']
+            for (kind, name), entry in calls:
+                lines.append(f"{PREFIX}_calls_total{_labels({'kind': kind, 'name': name})} {entry['calls']}")
+            lines += [f'# TYPE {PREFIX}_call_errors counter', f'# HELP {PREFIX}_call_errors Calls that raised or returned an error status.']
+            for (kind, name), entry in calls:
+                lines.append(f"{PREFIX}_call_errors_total{_labels({'kind': kind, 'name': name})} {entry['errors']}")
+            for metric, key, unit_help in (
+                ('call_duration_seconds', 'latency', 'Wall clock time per call.'),
+                ('response_bytes', 'response_bytes', 'Size of the serialized response.'),
+            ):
+                lines += [f'# TYPE {PREFIX}_{metric} histogram', f'# HELP {PREFIX}_{metric} {unit_help}']
+                for (kind, name), entry in calls:
+                    histogram = entry[key]
+                    for le, count in histogram.cumulative():
+                        lines.append(f"{PREFIX}_{metric}_bucket{_labels({'kind': kind, 'name': name, 'le': le})} {count}")
+                    lines.append(f"{PREFIX}_{metric}_count{_labels({'kind': kind, 'name': name})} {histogram.count}")
+                    lines.append(f"{PREFIX}_{metric}_sum{_labels({'kind': kind, 'name': name})} {_number(histogram.sum)}")
+
+            lines += [f'# TYPE {PREFIX}_cache_lookups counter', f'# HELP {PREFIX}_cache_lookups Cache lookups by result.']
+            for name, entry in caches:
+                for result in ('hit', 'miss'):
+                    lines.append(f"{PREFIX}_cache_lookups_total{_labels({'cache': name, 'result': result})} {entry[result]}")
+
+            lines += [f'# TYPE {PREFIX}_aws_requests counter', f'# HELP {PREFIX}_aws_requests AWS API request attempts by result.']
+            for (service, region), entry in aws:
+                for result in ('ok', 'throttled'):
+                    labels = {'service': service, 'region': region, 'result': result}
+                    lines.append(f"{PREFIX}_aws_requests_total{_labels(labels)} {entry[result]}")
+
+            lines += [f'# TYPE {PREFIX}_catcher_requests counter', f'# HELP {PREFIX}_catcher_requests Catcher client calls, retries, hedges and short circuits.']
+            for (endpoint, result), count in catcher:
+                lines.append(f"{PREFIX}_catcher_requests_total{_labels({'endpoint': endpoint, 'result': result})} {count}")
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        with self._lock:
+            self._calls.clear()
+            self._caches.clear()
+            self._aws.clear()
+            self._catcher.clear()
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+def merge_openmetrics(texts: Sequence[str]) -> str:
+    """
+    Merge render() outputs of several processes into one exposition.
+
+    Every metric here is a counter or a histogram, so samples with the same
+    name and labels are summed.
+    """
+    families: Dict[str, Dict[str, Any]] = {}
+    for text in texts:
+        family = None
+        for line in text.splitlines():
+            if not line or line == '# EOF':
+                continue
+            if line.startswith('# '):
+                name = line.split(' ', 3)[2]
+                family = families.setdefault(name, {'header': [], 'samples': {}})
+                if line not in family['header']:
+                    family['header'].append(line)
+                continue
+            sample, _, value = line.rpartition(' ')
+            if family is None:
+                family = families.setdefault('', {'header': [], 'samples': {}})
+            family['samples'][sample] = family['samples'].get(sample, 0.0) + float(value)
+    lines = []
+    for family in families.values():
+        lines += family['header']
+        lines += [f'{sample} {_number(value)}' for sample, value in family['samples'].items()]
+    lines.append('# EOF')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from mcp.server.fastmcp import Context
+
+from . import InstrumentedFastMCP, get_metrics
+from .metrics import Histogram, Metrics, merge_openmetrics
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    get_metrics().reset()
+    yield get_metrics()
+    get_metrics().reset()
+
+
+class TestMetrics:
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram((1, 10))
+        for value in (0.5, 1, 5, 50):
+            histogram.observe(value)
+        assert histogram.cumulative() == [('1', 2), ('10', 3), ('+Inf', 4)]
+        assert histogram.sum == 56.5
+
+    def test_render_openmetrics(self, metrics):
+        metrics.observe_call('tool', 'a"b', 0.02, 300, error=True)
+        metrics.cache('identity', hit=True)
+        metrics.aws_request('pricing', 'us-east-1', throttled=True)
+        text = metrics.render()
+        assert 'bitflux_aws_requests_total{region="us-east-1",result="throttled",service="pricing"} 1' in text
+        assert 'bitflux_calls_total{kind="tool",name="a\\"b"} 1' in text
+        assert 'bitflux_call_errors_total{kind="tool",name="a\\"b"} 1' in text
+        assert 'bitflux_call_duration_seconds_bucket{kind="tool",le="0.025",name="a\\"b"} 1' in text
+        assert 'bitflux_response_bytes_bucket{kind="tool",le="256",name="a\\"b"} 0' in text
+        assert 'bitflux_cache_lookups_total{cache="identity",result="miss"} 0' in text
+        assert text.endswith('# EOF\n')
+
+    def test_merge_sums_workers(self):
+        first, second = Metrics(), Metrics()
+        first.observe_call('tool', 'a', 0.02, 300, error=False)
+        second.observe_call('tool', 'a', 0.5, 300, error=True)
+        second.observe_call('tool', 'b', 0.5, 300, error=False)
+        merged = merge_openmetrics([first.render(), second.render(), ''])
+        assert 'bitflux_calls_total{kind="tool",name="a"} 2' in merged
+        assert 'bitflux_calls_total{kind="tool",name="b"} 1' in merged
+        assert 'bitflux_call_errors_total{kind="tool",name="a"} 1' in merged
+        assert 'bitflux_call_duration_seconds_sum{kind="tool",name="a"} 0.52' in merged
+        assert merged.count('# TYPE bitflux_calls counter') == 1
+        assert merged.count('# EOF') == 1
+        # Samples of a family stay together after their TYPE line
+        lines = merged.splitlines()
+        start = lines.index('# TYPE bitflux_call_errors counter')
+        assert lines.index('bitflux_calls_total{kind="tool",name="b"} 1') < start
+
+
+class TestInstrumentedFastMCP:
+
+    def test_tools_and_resources_recorded(self, metrics):
+        mcp = InstrumentedFastMCP(name='test')
+
+        @mcp.tool(name='echo', description='Echo')
+        async def echo(text: str, ctx: Context, repeat: int = 1) -> dict:
+            return {'status': 'success', 'text': text * repeat}
+
+        @mcp.tool(name='fail')
+        async def fail(ctx: Context) -> dict:
+            return {'status': 'error', 'message': 'nope'}
+
+        @mcp.resource('test://value')
+        async def value() -> str:
+            return 'v'
+
+        async def run():
+            tools = {t.name: t for t in await mcp.list_tools()}
+            assert set(tools['echo'].inputSchema['properties']) == {'text', 'repeat'}
+            await mcp.call_tool('echo', {'text': 'ab', 'repeat': 2})
+            await mcp.call_tool('fail', {})
+            await mcp.read_resource('test://value')
+
+        asyncio.run(run())
+        calls = {c['name']: c for c in metrics.snapshot()['calls']}
+        assert calls['echo']['calls'] == 1 and calls['echo']['errors'] == 0
+        assert calls['echo']['response_bytes_sum'] == len('{"status": "success", "text": "abab"}')
+        assert calls['fail']['errors'] == 1
+        assert calls['test://value']['kind'] == 'resource'
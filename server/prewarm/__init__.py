@@ -0,0 +1 @@
+from .prewarm import Prewarmer, parse_regions, prewarm, start_prewarm
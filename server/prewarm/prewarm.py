@@ -0,0 +1,124 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..tracing import span
+
+# Concurrent AWS and catcher calls made while prewarming
+DEFAULT_WORKERS = 8
+
+
+def parse_regions(regions: Sequence[str]) -> List[str]:
+    """
+    Regions to prewarm from CLI arguments.
+
+    Empty arguments fall back to BITFLUX_PREWARM_REGIONS. Both accept
+    space or comma separated region codes.
+    """
+    if not regions:
+        regions = [os.environ.get('BITFLUX_PREWARM_REGIONS', '')]
+    found: List[str] = []
+    for value in regions:
+        for region in value.replace(',', ' ').split():
+            if region not in found:
+                found.append(region)
+    return found
+
+
+def prewarm_tasks(regions: Sequence[str], url: str) -> List[Tuple[str, str, Callable[[], Any]]]:
+    """
+    The (name, region, call) tasks that fill the caches the first tool call reads.
+
+    Per region that is the instance list and the catcher's machine list
+    (both through lookup_machines_by_region) and the On-Demand price
+    catalog. The STS identity and the AMI ids are shared by all regions.
+    """
+    # Imported here as these pull in boto3, protobuf and the catcher client
+    from ..ec2_tools import get_bitflux_ami_id, get_generic_ami_id, get_identity
+    from ..ec2_tools.ec2_pricing import get_ec2_prices_filtered
+    from ..machine_lookup.tool import lookup_machines_by_region
+
+    tasks: List[Tuple[str, str, Callable[[], Any]]] = [
+        ('identity', '', lambda: get_identity().account_id),
+        ('generic_ami_id', '', get_generic_ami_id),
+        ('bitflux_ami_id', '', get_bitflux_ami_id),
+    ]
+    for region in regions:
+        tasks.append(('machines', region, lambda region=region: lookup_machines_by_region(region, url)))
+        tasks.append(('prices', region, lambda region=region: get_ec2_prices_filtered(region, '*')))
+    return tasks
+
+
+def _run_task(name: str, region: str, call: Callable[[], Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+    with span(f'prewarm.{name}', root=True, region=region) as s:
+        try:
+            call()
+            status, message = 'success', ''
+        except Exception as e:
+            status, message = 'error', f'{type(e).__name__}: {e}'
+            s.fail(message)
+    return {'task': name, 'region': region, 'status': status, 'message': message,
+            'seconds': time.perf_counter() - start}
+
+
+def prewarm(regions: Sequence[str], url: str, workers: int = DEFAULT_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Fill the identity, instance list, machine registry, AMI id and price caches.
+
+    Tasks run concurrently and a failing task does not stop the others.
+
+    Returns:
+        One result per task with its status and duration in seconds
+    """
+    tasks = prewarm_tasks(regions, url)
+    with ThreadPoolExecutor(max(1, min(workers, len(tasks))), thread_name_prefix='prewarm') as pool:
+        return list(pool.map(lambda task: _run_task(*task), tasks))
+
+
+class Prewarmer:
+    """
+    Runs prewarm() in a daemon thread so the server answers while caches fill.
+
+    Progress goes to stderr, as stdout carries the stdio transport.
+    """
+
+    def __init__(self, regions: Sequence[str], url: str, workers: int = DEFAULT_WORKERS) -> None:
+        self.regions = list(regions)
+        self.url = url
+        self.workers = workers
+        self.results: List[Dict[str, Any]] = []
+        self.done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='prewarm', daemon=True)
+
+    def start(self) -> 'Prewarmer':
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        try:
+            self.results = prewarm(self.regions, self.url, self.workers)
+        except Exception as e:
+            print(f"Prewarm failed: {e}", file=sys.stderr)
+        finally:
+            self.done.set()
+        failed = [r for r in self.results if r['status'] != 'success']
+        for r in failed:
+            print(f"Prewarm {r['task']} {r['region']} failed: {r['message']}", file=sys.stderr)
+        print(f"Prewarmed {len(self.results) - len(failed)}/{len(self.results)} caches for "
+              f"{', '.join(self.regions) or 'no regions'} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self.done.wait(timeout)
+
+
+def start_prewarm(regions: Sequence[str], url: str, workers: int = DEFAULT_WORKERS) -> Optional[Prewarmer]:
+    """Start prewarming regions in the background, or return None when there is nothing to warm."""
+    regions = parse_regions(regions)
+    if not regions:
+        return None
+    return Prewarmer(regions, url, workers).start()
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from ..bench.aws import install_aws_stubs
+from ..bench.catcher import DEFAULT_ACCOUNT_ID, populate
+from ..bitflux_catcher_api.standin import StandinCatcher
+from ..cache import reset_store
+from ..ec2_tools import get_bitflux_ami_id, get_client, get_identity
+from ..ec2_tools.clients import set_client_override
+from ..ec2_tools.ec2_pricing import get_ec2_prices
+from ..machine_lookup import instance_index, registry
+from ..machine_lookup.tool import lookup_machines_by_region
+from . import parse_regions, prewarm, start_prewarm
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv('BITFLUX_CACHE_DIR', str(tmp_path))
+    monkeypatch.delenv('BITFLUX_PREWARM_REGIONS', raising=False)
+    reset_store()
+    registry.reset_registry()
+    instance_index.get_instance_index().clear()
+    get_identity().invalidate()
+    yield
+    for service in ('ec2', 'sts', 'pricing'):
+        set_client_override(service, None)
+    reset_store()
+    registry.reset_registry()
+    instance_index.get_instance_index().clear()
+    get_identity().invalidate()
+
+
+@pytest.fixture
+def fleet():
+    with StandinCatcher() as catcher:
+        machines = populate(catcher, machines=3, rows=100)
+        install_aws_stubs([instance_id for _, instance_id in machines], DEFAULT_ACCOUNT_ID)
+        yield catcher
+
+
+class TestPrewarm:
+
+    def test_parse_regions(self, monkeypatch):
+        assert parse_regions(['us-east-1,eu-west-1', 'us-east-1']) == ['us-east-1', 'eu-west-1']
+        assert parse_regions([]) == []
+        monkeypatch.setenv('BITFLUX_PREWARM_REGIONS', 'us-west-2 eu-central-1')
+        assert parse_regions([]) == ['us-west-2', 'eu-central-1']
+
+    def test_first_calls_hit_warm_caches(self, fleet):
+        results = prewarm(['us-east-1'], fleet.url)
+        assert {r['task'] for r in results} == {'identity', 'generic_ami_id', 'bitflux_ami_id', 'machines', 'prices'}
+        assert all(r['status'] == 'success' for r in results), results
+
+        ec2, pricing = get_client('ec2'), get_client('pricing')
+        ec2_requests, pricing_requests = dict(ec2.requests), pricing.requests
+        lookups = fleet.requests['/machinelookup']
+
+        machines = lookup_machines_by_region('us-east-1', fleet.url)
+        assert len(machines['machineKey']) == 3
+        assert get_bitflux_ami_id() == 'ami-00000000000000002'
+        assert {p['instanceType'] for p in get_ec2_prices('us-east-1', 'm5.large')} == {'m5.large'}
+
+        assert ec2.requests == ec2_requests
+        assert pricing.requests == pricing_requests
+        assert fleet.requests['/machinelookup'] == lookups
+
+    def test_failures_are_reported_per_task(self, fleet):
+        class BrokenPricing:
+            def get_products(self, **kwargs):
+                raise RuntimeError('throttled')
+
+        set_client_override('pricing', BrokenPricing())
+        results = {(r['task'], r['region']): r for r in prewarm(['us-east-1'], fleet.url)}
+        assert results[('prices', 'us-east-1')]['status'] == 'error'
+        assert 'throttled' in results[('prices', 'us-east-1')]['message']
+        assert results[('machines', 'us-east-1')]['status'] == 'success'
+
+    def test_does_not_block(self):
+        with StandinCatcher(latency=0.5) as catcher:
+            populate(catcher, machines=1, rows=100)
+            install_aws_stubs([], DEFAULT_ACCOUNT_ID)
+            start = time.perf_counter()
+            prewarmer = start_prewarm(['us-east-1'], catcher.url)
+            assert time.perf_counter() - start < 0.1
+            assert not prewarmer.done.is_set()
+            assert prewarmer.wait(30)
+        assert all(r['status'] == 'success' for r in prewarmer.results)
+
+    def test_nothing_to_warm(self):
+        assert start_prewarm([], 'http://127.0.0.1:1') is None
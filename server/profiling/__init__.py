@@ -0,0 +1 @@
+from .profiler import configure_profiling, profile_call, run_in_thread
@@ -0,0 +1,157 @@
+import asyncio
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Number of entries written to the text summaries
+TOP_ENTRIES = 50
+
+_lock = threading.Lock()
+# Held by the call being profiled, cProfile having one profiler slot per process
+_profiling = threading.Lock()
+_settings: Dict[str, Any] = {'dir': '', 'every': 1}
+_counts: Dict[str, int] = {}
+_tracemalloc_users = 0
+
+
+def configure_profiling(profile_dir: str = '', every: int = 0) -> None:
+    """
+    Enable profiling of tool calls into profile_dir.
+
+    Empty or zero arguments fall back to BITFLUX_PROFILE_DIR and
+    BITFLUX_PROFILE_EVERY. With every=N only every Nth call of each tool is
+    profiled. Without a directory profiling stays off.
+    """
+    with _lock:
+        _settings['dir'] = profile_dir or os.environ.get('BITFLUX_PROFILE_DIR', '')
+        _settings['every'] = max(1, every or int(os.environ.get('BITFLUX_PROFILE_EVERY', '1') or 1))
+        _counts.clear()
+
+
+def _start_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+        tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+class CallProfile:
+    """
+    Profile of one tool call.
+
+    Since Python 3.12 cProfile hooks into sys.monitoring, which sees every
+    thread, so the single profiler enabled for the call also covers the
+    work it hands to worker threads, and the work of calls running next
+    to it. There is one such profiler per process, so only one call is
+    profiled at a time.
+    """
+
+    def __init__(self, kind: str, name: str, directory: Path) -> None:
+        self.kind = kind
+        self.name = name
+        self.directory = directory
+        self.profiler: Optional[cProfile.Profile] = cProfile.Profile()
+
+    def enable(self) -> None:
+        try:
+            self.profiler.enable()
+        except ValueError as e:
+            # Another profiling tool, e.g. a debugger, holds the profiler slot
+            print(f"Not profiling {self.name}: {e}", file=sys.stderr)
+            self.profiler = None
+
+    def disable(self) -> None:
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def write(self, seconds: float, snapshot: tracemalloc.Snapshot, peak: int) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.profiler is not None:
+            pstats.Stats(self.profiler).dump_stats(self.directory / 'profile.prof')
+            text = io.StringIO()
+            pstats.Stats(str(self.directory / 'profile.prof'), stream=text).sort_stats('cumulative').print_stats(TOP_ENTRIES)
+            (self.directory / 'profile.txt').write_text(text.getvalue())
+        lines = [f'Peak traced memory: {peak} bytes', '']
+        for stat in snapshot.statistics('lineno')[:TOP_ENTRIES]:
+            lines.append(str(stat))
+        (self.directory / 'tracemalloc.txt').write_text('\n'.join(lines) + '\n')
+        (self.directory / 'call.json').write_text(json.dumps({
+            'kind': self.kind,
+            'name': self.name,
+            'seconds': seconds,
+            'peak_traced_bytes': peak,
+            'cprofile': self.profiler is not None,
+        }, indent=2))
+
+
+def _should_profile(name: str) -> Optional[Path]:
+    with _lock:
+        if not _settings['dir']:
+            return None
+        count = _counts.get(name, 0) + 1
+        _counts[name] = count
+        if count % _settings['every'] != 0:
+            return None
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S.%fZ')
+        return Path(_settings['dir']) / f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}-{stamp}"
+
+
+@contextlib.contextmanager
+def profile_call(kind: str, name: str) -> Iterator[Optional[CallProfile]]:
+    """
+    Profile the enclosed tool call if profiling is on and this call is selected.
+
+    The profile is written to <profile_dir>/<name>-<UTC timestamp>/:
+    profile.prof (pstats, e.g. for snakeviz), profile.txt, tracemalloc.txt
+    and call.json. A call that overlaps the one being profiled runs
+    unprofiled.
+    """
+    directory = _should_profile(name)
+    if directory is None or not _profiling.acquire(blocking=False):
+        yield None
+        return
+    try:
+        profile = CallProfile(kind, name, directory)
+        _start_tracemalloc()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield profile
+        finally:
+            profile.disable()
+            seconds = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            _stop_tracemalloc()
+            try:
+                profile.write(seconds, snapshot, peak)
+            except OSError as e:
+                print(f"Failed to write profile to {directory}: {e}", file=sys.stderr)
+    finally:
+        _profiling.release()
+
+
+async def run_in_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """asyncio.to_thread(), whose worker thread the profiler of a profiled call sees too."""
+    return await asyncio.to_thread(func, *args, **kwargs)
@@ -0,0 +1,88 @@
+import asyncio
+import json
+import sys
+
+import pytest
+from mcp.server.fastmcp import Context
+
+from ..metrics import InstrumentedFastMCP
+from . import configure_profiling, run_in_thread
+
+
+def busy(n):
+    return sum(i * i for i in range(n))
+
+
+@pytest.fixture
+def profiled_mcp(tmp_path):
+    mcp = InstrumentedFastMCP(name='test')
+
+    @mcp.tool(name='busy')
+    async def busy_tool(ctx: Context) -> dict:
+        return {'status': 'success', 'total': await run_in_thread(busy, 20000)}
+
+    @mcp.tool(name='slow')
+    async def slow_tool(ctx: Context) -> dict:
+        await asyncio.sleep(0.1)
+        return {'status': 'success', 'total': await run_in_thread(busy, 20000)}
+
+    yield mcp, tmp_path
+    configure_profiling('', 0)
+
+
+class TestProfiling:
+
+    def test_every_call(self, profiled_mcp):
+        mcp, tmp_path = profiled_mcp
+        configure_profiling(str(tmp_path), 1)
+        asyncio.run(mcp.call_tool('busy', {}))
+        [directory] = list(tmp_path.iterdir())
+        assert directory.name.startswith('busy-')
+        assert {p.name for p in directory.iterdir()} == {'profile.prof', 'profile.txt', 'tracemalloc.txt', 'call.json'}
+        if sys.version_info >= (3, 12):
+            # Before 3.12 cProfile only sees the thread that enabled it
+            assert 'busy' in (directory / 'profile.txt').read_text()
+        call = json.loads((directory / 'call.json').read_text())
+        assert call['name'] == 'busy' and call['cprofile']
+
+    def test_overlapping_calls_profile_one(self, profiled_mcp):
+        mcp, tmp_path = profiled_mcp
+        configure_profiling(str(tmp_path), 1)
+
+        async def calls():
+            return await asyncio.gather(mcp.call_tool('slow', {}), mcp.call_tool('slow', {}))
+
+        results = asyncio.run(calls())
+        assert all('success' in str(result) for result in results)
+        assert len(list(tmp_path.iterdir())) == 1
+        # The next call is profiled again
+        asyncio.run(mcp.call_tool('busy', {}))
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_every_nth_call(self, profiled_mcp):
+        mcp, tmp_path = profiled_mcp
+        configure_profiling(str(tmp_path), 3)
+
+        async def calls():
+            for _ in range(7):
+                await mcp.call_tool('busy', {})
+
+        asyncio.run(calls())
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_off_by_default(self, profiled_mcp, monkeypatch):
+        mcp, tmp_path = profiled_mcp
+        monkeypatch.delenv('BITFLUX_PROFILE_DIR', raising=False)
+        configure_profiling('', 0)
+        asyncio.run(mcp.call_tool('busy', {}))
+        assert list(tmp_path.iterdir()) == []
+
+    def test_write_failure_reported_on_stderr(self, profiled_mcp, capsys):
+        mcp, tmp_path = profiled_mcp
+        blocker = tmp_path / 'not-a-directory'
+        blocker.write_text('')
+        configure_profiling(str(blocker), 1)
+        asyncio.run(mcp.call_tool('busy', {}))
+        out, err = capsys.readouterr()
+        assert out == ''
+        assert f'Failed to write profile to {blocker}' in err
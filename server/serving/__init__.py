@@ -0,0 +1 @@
+from .gateway import Gateway, WorkerPool, exit_with_gateway, free_port, serve, wait_for_port, worker_message_path
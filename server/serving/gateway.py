@@ -0,0 +1,266 @@
+import asyncio
+import contextlib
+import itertools
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+import httpx
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+
+from ..metrics import OPENMETRICS_CONTENT_TYPE, merge_openmetrics
+
+# Streamable HTTP session header, assigned by the worker that ran initialize
+SESSION_HEADER = 'mcp-session-id'
+# Added to every proxied response to show which worker served it
+WORKER_HEADER = 'x-bitflux-worker'
+# Headers that only describe one hop and are not forwarded. Host is kept so
+# redirects from the workers (e.g. /mcp to /mcp/) point back at the gateway.
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailers',
+              'transfer-encoding', 'upgrade'}
+# Streamable HTTP sessions remembered for routing, oldest are forgotten first
+MAX_SESSIONS = 100_000
+# Seconds between checks for exited workers, and by workers for an exited gateway
+MONITOR_INTERVAL = 1.0
+# Seconds the gateway waits for open streams when shutting down
+SHUTDOWN_TIMEOUT = 5
+# Set for workers so they can exit when their gateway is gone
+GATEWAY_PID_ENV = 'BITFLUX_GATEWAY_PID'
+
+_MESSAGES_PATH = re.compile(r'^/messages/(\d+)/')
+
+
+def worker_message_path(index: int) -> str:
+    """
+    SSE message path of worker index.
+
+    The SSE endpoint event tells clients to post to this path, so the
+    gateway knows the session's worker from the url alone.
+    """
+    return f'/messages/{index}/'
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"MCP server exited with code {process.returncode}")
+        with contextlib.suppress(OSError), socket.create_connection(('127.0.0.1', port), timeout=1):
+            return
+        time.sleep(0.2)
+    raise TimeoutError(f"MCP server did not listen on port {port} within {timeout}s")
+
+
+def exit_with_gateway() -> None:
+    """
+    In a worker, exit as soon as the gateway that started it is gone.
+
+    Covers a gateway that was killed before it could stop its workers.
+    """
+    gateway_pid = int(os.environ.get(GATEWAY_PID_ENV, '0'))
+    if not gateway_pid:
+        return
+
+    def watch() -> None:
+        while os.getppid() == gateway_pid:
+            time.sleep(MONITOR_INTERVAL)
+        os._exit(0)
+
+    threading.Thread(target=watch, name='gateway-watch', daemon=True).start()
+
+
+def worker_command() -> List[str]:
+    """The command line this process was started with, to start workers the same way."""
+    return [sys.executable, *sys.orig_argv[1:]]
+
+
+class Worker:
+
+    def __init__(self, index: int, port: int) -> None:
+        self.index = index
+        self.port = port
+        self.url = f'http://127.0.0.1:{port}'
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+
+
+class WorkerPool:
+    """
+    N server processes on private ports, started from the same command line.
+
+    Each worker gets --workers 1, its --worker_index and port appended, which
+    override the values of the original arguments. Only worker 0 prewarms, the
+    others read the caches it fills from the shared on-disk store.
+    """
+
+    def __init__(self, command: Sequence[str], count: int) -> None:
+        self.command = list(command)
+        self.workers = [Worker(index, free_port()) for index in range(count)]
+
+    def _spawn(self, worker: Worker) -> None:
+        args = ['--workers', '1', '--worker_index', str(worker.index), '--host', '127.0.0.1', '--port', str(worker.port)]
+        env = {**os.environ, GATEWAY_PID_ENV: str(os.getpid())}
+        if worker.index > 0:
+            args.append('--prewarm_regions')
+            env['BITFLUX_PREWARM_REGIONS'] = ''
+        worker.process = subprocess.Popen(self.command + args, env=env)
+
+    def start(self) -> None:
+        for worker in self.workers:
+            self._spawn(worker)
+        for worker in self.workers:
+            wait_for_port(worker.port, worker.process)
+
+    def restart_exited(self) -> List[Worker]:
+        """Start workers whose process exited again on the same port, returning them."""
+        restarted = []
+        for worker in self.workers:
+            if worker.process is not None and worker.process.poll() is not None:
+                print(f"Worker {worker.index} exited with code {worker.process.returncode}, restarting", file=sys.stderr)
+                worker.restarts += 1
+                self._spawn(worker)
+                restarted.append(worker)
+        return restarted
+
+    def stop(self) -> None:
+        for worker in self.workers:
+            if worker.process is not None and worker.process.poll() is None:
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process is None:
+                continue
+            try:
+                worker.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                worker.process.kill()
+
+
+class Gateway:
+    """
+    Reverse proxy that spreads MCP sessions over a WorkerPool.
+
+    New sessions go to the workers round robin. Later requests of a session
+    go to the worker that holds it: SSE messages by the worker index in
+    their path, streamable HTTP requests by their mcp-session-id. /metrics
+    sums the metrics of all workers.
+    """
+
+    def __init__(self, pool: WorkerPool) -> None:
+        self.pool = pool
+        self.sessions: Dict[str, int] = {}
+        self._next = itertools.count()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def route(self, path: str, session_id: Optional[str]) -> Worker:
+        workers = self.pool.workers
+        match = _MESSAGES_PATH.match(path)
+        if match is not None and int(match.group(1)) < len(workers):
+            return workers[int(match.group(1))]
+        if session_id:
+            index = self.sessions.get(session_id)
+            if index is None:
+                # Unknown to this gateway, let a stable worker answer for it
+                index = zlib.crc32(session_id.encode()) % len(workers)
+            return workers[index]
+        return workers[next(self._next) % len(workers)]
+
+    def _remember(self, session_id: str, index: int) -> None:
+        if session_id in self.sessions:
+            return
+        if len(self.sessions) >= MAX_SESSIONS:
+            self.sessions.pop(next(iter(self.sessions)))
+        self.sessions[session_id] = index
+
+    async def proxy(self, request: Request) -> Response:
+        path = request.url.path
+        if path == '/metrics':
+            return await self.metrics()
+        session_id = request.headers.get(SESSION_HEADER)
+        worker = self.route(path, session_id)
+        url = worker.url + path + (f'?{request.url.query}' if request.url.query else '')
+        headers = [(k, v) for k, v in request.headers.items() if k not in HOP_BY_HOP and k != 'content-length']
+        upstream = self._client.build_request(request.method, url, headers=headers, content=await request.body())
+        try:
+            response = await self._client.send(upstream, stream=True)
+        except httpx.HTTPError as e:
+            return Response(f"Worker {worker.index} unavailable: {e}", status_code=502, headers={WORKER_HEADER: str(worker.index)})
+
+        assigned = response.headers.get(SESSION_HEADER)
+        if assigned:
+            self._remember(assigned, worker.index)
+        if request.method == 'DELETE' and session_id and response.is_success:
+            self.sessions.pop(session_id, None)
+
+        headers = {k: v for k, v in response.headers.items() if k not in HOP_BY_HOP}
+        headers[WORKER_HEADER] = str(worker.index)
+        return StreamingResponse(response.aiter_raw(), status_code=response.status_code, headers=headers,
+                                 background=BackgroundTask(response.aclose))
+
+    async def metrics(self) -> Response:
+        async def fetch(worker: Worker) -> str:
+            try:
+                response = await self._client.get(worker.url + '/metrics', timeout=10)
+                return response.text if response.is_success else ''
+            except httpx.HTTPError:
+                return ''
+
+        texts = await asyncio.gather(*[fetch(worker) for worker in self.pool.workers])
+        return Response(merge_openmetrics(texts), media_type=OPENMETRICS_CONTENT_TYPE)
+
+    async def _monitor(self) -> None:
+        while True:
+            await asyncio.sleep(MONITOR_INTERVAL)
+            for worker in await asyncio.to_thread(self.pool.restart_exited):
+                # Its sessions died with the process
+                self.sessions = {s: i for s, i in self.sessions.items() if i != worker.index}
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self, app: Starlette) -> AsyncIterator[None]:
+        # No read timeout, SSE streams stay open for the whole session
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(None, connect=10),
+                                         limits=httpx.Limits(max_connections=None, max_keepalive_connections=100))
+        monitor = asyncio.create_task(self._monitor())
+        try:
+            yield
+        finally:
+            monitor.cancel()
+            await self._client.aclose()
+
+    def app(self) -> Starlette:
+        methods = ['GET', 'POST', 'DELETE', 'PUT', 'PATCH', 'HEAD', 'OPTIONS']
+        return Starlette(routes=[Route('/{path:path}', self.proxy, methods=methods)], lifespan=self.lifespan)
+
+
+def serve(workers: int, host: str, port: int, command: Optional[Sequence[str]] = None) -> None:
+    """
+    Serve on host:port from workers server processes.
+
+    The workers are started from command, by default this process's own
+    command line, and must be up before the gateway starts listening.
+    """
+    import uvicorn
+
+    pool = WorkerPool(command or worker_command(), workers)
+    try:
+        pool.start()
+        print(f"Serving on http://{host}:{port} from {workers} workers", file=sys.stderr)
+        uvicorn.run(Gateway(pool).app(), host=host, port=port, log_level='warning',
+                    timeout_graceful_shutdown=SHUTDOWN_TIMEOUT)
+    finally:
+        pool.stop()
@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from ..bench import load
+from ..bench.catcher import populate
+from ..bitflux_catcher_api.standin import StandinCatcher
+from .gateway import WORKER_HEADER, Gateway, Worker
+
+
+class FakePool:
+
+    def __init__(self, count):
+        self.workers = [Worker(index, 9000 + index) for index in range(count)]
+
+
+@pytest.fixture(scope='module')
+def catcher():
+    with StandinCatcher() as c:
+        populate(c, machines=3, rows=500)
+        yield c
+
+
+def read_endpoint(base: str) -> tuple:
+    """Open an SSE stream and return the serving worker and the message url it announces."""
+    with httpx.stream('GET', base + '/sse', timeout=10) as response:
+        for line in response.iter_lines():
+            if line.startswith('data: '):
+                return response.headers[WORKER_HEADER], line[len('data: '):]
+
+
+class TestRouting:
+
+    def test_new_sessions_round_robin(self):
+        gateway = Gateway(FakePool(3))
+        assert [gateway.route('/sse', None).index for _ in range(4)] == [0, 1, 2, 0]
+
+    def test_sse_messages_follow_path(self):
+        gateway = Gateway(FakePool(3))
+        assert gateway.route('/messages/2/', None).index == 2
+        # Out of range indexes are treated as new requests
+        assert gateway.route('/messages/7/', None).index == 0
+
+    def test_streamable_sessions_stick(self):
+        gateway = Gateway(FakePool(4))
+        gateway._remember('abc', 3)
+        assert gateway.route('/mcp', 'abc').index == 3
+        unknown = gateway.route('/mcp', 'other').index
+        assert gateway.route('/mcp', 'other').index == unknown
+
+
+class TestWorkers:
+
+    def test_sse_sessions_spread_and_stick(self, catcher):
+        with load.stubbed_server(catcher.url, 3, extra_args=['--workers', '2']) as url:
+            base = url[:-len('/sse')]
+            endpoints = [read_endpoint(base) for _ in range(2)]
+            assert sorted(worker for worker, _ in endpoints) == ['0', '1']
+            for worker, endpoint in endpoints:
+                assert endpoint.startswith(f'/messages/{worker}/?session_id=')
+
+            fleet = [(load.machine_key_for(n), load.instance_id_for(n)) for n in range(3)]
+            samples, _ = asyncio.run(load.run_step(url, 4, 1.0, load.DEFAULT_MIX, fleet))
+            assert samples and not any(failed for _, _, failed in samples)
+
+            metrics = httpx.get(base + '/metrics').text
+            calls = sum(float(line.rsplit(' ', 1)[1]) for line in metrics.splitlines()
+                        if line.startswith('bitflux_calls_total{kind="tool"'))
+            assert calls == len(samples)
+
+    def test_streamable_http(self, catcher):
+        async def call(url):
+            async with streamablehttp_client(url) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    result = await session.call_tool('download_stats_by_machine_key',
+                                                     {'machine_key': load.machine_key_for(1)})
+                    return json.loads(result.content[0].text)
+
+        with load.stubbed_server(catcher.url, 3, extra_args=['--workers', '2'], transport='http') as url:
+            async def sessions():
+                return await asyncio.gather(*[call(url) for _ in range(3)])
+            for stats in asyncio.run(sessions()):
+                assert stats['status'] == 'success'
@@ -1,6 +1,7 @@
+from ..profiling import run_in_thread
 from mcp.server.fastmcp import Context
 from typing import Any, Dict
-from ..downloadstats.tool import download_stats_by_machine_key, download_stats_by_instance_id
+from ..downloadstats.constants import DEFAULT_MAX_POINTS
 
 base_description='''
     Output format is as follows:
@@ -23,6 +24,10 @@ base_description='''
         // The instance type used to collect the stats
         "instance_type": "m6i.2xlarge",
 
+        // Only present when the bitflux servers could not be reached and the last
+        // download made at this time was used instead
+        "stale_since": "2025-05-11T06:40:12.000+00:00",
+
         // Calculated Requirements
         "summary_requirements": {
           // The calculated amount of memory the workload used
@@ -31,8 +36,14 @@ base_description='''
           "vcpu_usage": "1.7"
         },
 
-        // A small sample of raw measurements at successive intervals
+        // Measurements over the whole window, downsampled to at most max_points samples per column
+        // with Largest-Triangle-Three-Buckets so peaks and dips are kept
         "data": {
+            // Position of each sample in the full series; sample i was taken at
+            // timestamp - (last sample_index - i) * sample_rate seconds
+            "sample_index": [0, 340, 681],
+            // Time each sample was taken (ISO 8601 UTC)
+            "time": ["2025-05-10T07:49:01.725+00:00", "2025-05-10T19:09:01.725+00:00", "2025-05-11T06:31:01.725+00:00"],
             // BitFlux calculated used memory
             "used": [16188846080, 16121737216, 16239177728],
             // Bytes of unused RAM at this sample
@@ -82,7 +93,7 @@ base_description='''
         }
       }
 
-    A user may want to see graphs and/or charts of the memory and cpus over time. You can use the timestamp field as the time of the last sample, with the sample_rate being the time between samples.
+    A user may want to see graphs and/or charts of the memory and cpus over time. You can use the timestamp field as the time of the last sample, with the sample_rate being the time between samples, or the 'time' field of each point in 'data'.
     '''
 
 class DownloadStatsByMachineKeyTool():
@@ -90,15 +101,17 @@ class DownloadStatsByMachineKeyTool():
     description = base_description + '''
     **Parameters**:
     - `machine_key`: The machine_key from the bitflux servers for the machine to download stats for.
+    - `max_points`: Optional maximum number of samples per column in `data` (default 60). Raise it for more detailed charts.
 
     NOTE: Use this tool with the machine_key if you have it.  Use download_stats_by_instance_id if you have the instance_id but not the machine_key.
     '''
 
-    async def execute(machine_key: str, url: str, ctx: Context) -> Dict[str, Any]:
+    async def execute(machine_key: str, max_points: int, url: str, ctx: Context) -> Dict[str, Any]:
         """Download stats from bitflux daemon"""
+        from ..downloadstats.tool import download_stats_by_machine_key
         try:
             # Use the ec2_pricing module to fetch raw pricing entries
-            stats = download_stats_by_machine_key(machine_key, url)
+            stats = await run_in_thread(download_stats_by_machine_key, machine_key, url, max_points)
             return {
                 'status': 'success',
                 'machine_key': machine_key,
@@ -122,14 +135,16 @@ class DownloadStatsByInstanceIdTool():
 
     **Parameters**:
     - `instance_id`: The AWS EC2 instance_id for the machine to download stats for.
+    - `max_points`: Optional maximum number of samples per column in `data` (default 60). Raise it for more detailed charts.
 
     ''' + base_description
 
-    async def execute(instance_id: str, url: str, ctx: Context) -> Dict[str, Any]:
+    async def execute(instance_id: str, max_points: int, url: str, ctx: Context) -> Dict[str, Any]:
         """Download stats from bitflux daemon"""
+        from ..downloadstats.tool import download_stats_by_instance_id
         try:
             # Use the ec2_pricing module to fetch raw pricing entries
-            stats = download_stats_by_instance_id(instance_id, url)
+            stats = await run_in_thread(download_stats_by_instance_id, instance_id, url, max_points)
             return {
                 'status': 'success',
                 'instance_id': instance_id,
@@ -0,0 +1,50 @@
+from ..profiling import run_in_thread
+from mcp.server.fastmcp import Context
+from typing import Any, Dict, List, Optional
+
+
+class FleetPercentilesTool():
+    name = 'fleet_percentiles'
+
+    description = '''
+    Percentiles of memory and CPU usage across a group of machines, e.g. the p99 of used memory over every machine in a region.
+
+    Each machine's summary keeps a mergeable quantile sketch per column, so the group's percentiles are computed by merging one sketch per machine rather than all their samples. Machines whose summary is missing or over an hour old are downloaded and summarized first.
+
+    **Parameters**:
+    - `machine_keys`: Machine keys in the group (see list_machines_by_region).
+    - `region`: Optional AWS region; its running machines with bitflux are added to the group.
+    - `percentiles`: List of 'pNN' entries, e.g. ['p50', 'p90', 'p99.9']. Defaults to ['p90', 'p99'].
+    - `columns`: Optional subset of used, free, cached, swap_used, swap_cached, reclaimable and idle_cpu (all bytes except idle_cpu, which is percent idle).
+
+    **Output**:
+    - On success, returns a dictionary with:
+      - `status`: 'success'
+      - `machines`: Number of machines merged
+      - `refreshed`: How many of them were downloaded for this call
+      - `failed`: Machines that could not be summarized, with the error
+      - `columns`: Per column `count` (samples over all machines), `mean`, `min`, `max` and one entry per percentile,
+        e.g. `{"used": {"count": 120000, "mean": 1.2e9, "min": 8.1e8, "max": 3.4e9, "p90": 2.1e9, "p99": 3.0e9}}`.
+        Percentiles are within 1% of the exact value over all samples.
+    - On error, returns a dictionary with:
+      - `status`: 'error'
+      - `message`: The error message
+    '''
+
+    async def execute(machine_keys: Optional[List[str]], region: str, percentiles: Optional[List[str]],
+                      columns: Optional[List[str]], url: str, ctx: Context) -> Dict[str, Any]:
+        """Merge the quantile sketches of a group of machines"""
+        from ..downloadstats.fleet import fleet_percentiles_by_group
+        try:
+            result = await run_in_thread(fleet_percentiles_by_group, url, machine_keys, region,
+                                         percentiles=percentiles, columns=columns)
+            return {
+                'status': 'success',
+                **result,
+            }
+        except Exception as e:
+            await ctx.error(f'Failed to compute fleet percentiles via {url}: {e}')
+            return {
+                'status': 'error',
+                'message': str(e),
+            }
@@ -1,3 +1,4 @@
+from ..profiling import run_in_thread
 from mcp.server.fastmcp import Context
 from typing import Any, Dict
 from ..ec2_tools.ec2_instances import list_ec2_instances
@@ -49,7 +50,7 @@ class ListEC2InstancesTool():
       """Retrieve a list of your EC2 instances for a given region."""
       try:
           # Use the ec2_pricing module to fetch raw pricing entries
-          instances = list_ec2_instances(region)
+          instances = await run_in_thread(list_ec2_instances, region)
           return {
               'status': 'success',
               'region': region,
@@ -1,7 +1,6 @@
+from ..profiling import run_in_thread
 from mcp.server.fastmcp import Context
 from typing import Any, Dict
-from ..machine_lookup.tool import machine_lookup
-from ..machine_lookup.tool import lookup_machines_by_region
 
 class MachineLookupByInstanceIdTool():
     name = 'machine_key_by_instance_id'
@@ -29,18 +28,14 @@ class MachineLookupByInstanceIdTool():
 
     async def execute(instance_id: str, url: str, ctx: Context) -> Dict[str, Any]:
         """Lookup machine information by instance IDs via API"""
+        from ..machine_lookup.tool import machine_key_by_instance_id
         try:
-            result = machine_lookup(instance_id, "", url)
-            machines = []
-            for machine in result.get('machines', []):
-                machines.append(machine['machineKey'])
-            if len(machines) == 0:
-                raise Exception(f"No machine found for instance_id {instance_id}")
+            machine_key = await run_in_thread(machine_key_by_instance_id, instance_id, url)
             return {
                 'status': 'success',
                 'instance_id': instance_id,
                 'url': url,
-                'machine_key': machines[0],
+                'machine_key': machine_key,
             }
         except Exception as e:
             await ctx.error(f'Failed to lookup machine for {instance_id} via {url}: {e}')
@@ -78,10 +73,11 @@ class MachineLookupByAccountIdTool():
 
     async def execute(account_id: str, url: str, ctx: Context) -> Dict[str, Any]:
         """Lookup machine information by account ID via API"""
+        from ..machine_lookup.tool import machine_lookup
         try:
-            result = machine_lookup("", account_id, url)
+            result = await run_in_thread(machine_lookup, "", account_id, url)
             machines = []
-            for machine in result.get('machines', []):
+            for machine in result:
                 machines.append(machine['machineKey'])
             return {
                 'status': 'success',
@@ -140,8 +136,9 @@ class ListMachinesByRegionTool():
 
     async def execute(region: str, url: str, ctx: Context) -> Dict[str, Any]:
         """Lookup machines by region via API"""
+        from ..machine_lookup.tool import lookup_machines_by_region
         try:
-            result = lookup_machines_by_region(region, url)
+            result = await run_in_thread(lookup_machines_by_region, region, url)
             return {
                 'status': 'success',
                 'region': region,
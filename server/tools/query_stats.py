@@ -0,0 +1,61 @@
+from ..profiling import run_in_thread
+from mcp.server.fastmcp import Context
+from typing import Any, Dict
+
+
+class QueryStatsTool():
+    name = 'query_stats'
+
+    description = '''
+    Run a SQL SELECT over the locally stored telemetry, summaries, machine registry and EC2 price list.
+
+    Joins, filters and aggregations run locally, so prefer one query that returns the answer over fetching several tool outputs and combining them yourself, e.g. comparing machines, ranking instance types by price for a memory requirement, or daily peaks across the fleet.
+
+    **Tables**:
+    - `history`: Every sample kept locally (see resample_stats history), columns machine_key, time, used, free, cached, swap_used, swap_cached, reclaimable (bytes) and idle_cpu (percent idle).
+      A machine's samples are added when its stats are downloaded.
+    - `summaries`: The last summary of each downloaded machine, one row per machine_key and column, with timestamp, sample_rate, mem_total, num_cpus, vcpu_usage,
+      count, null_count, mean, std, min, max, median, sum and the percentiles p90, p95, p99, p99_9...
+    - `machines`: Machines looked up so far: machine_key, instance_id, instance_hash, account_hash, ami_id, deviceid, organization_id, updated_at.
+    - `prices`: On demand Linux prices: region, instance_type, instance_family, vcpu, memory_gib, price_per_hour.
+      Holds `region`'s prices when given, otherwise every region already looked up with get_ec2_pricing.
+
+    **Parameters**:
+    - `query`: A single SELECT (or WITH) statement in polars SQL.
+    - `max_rows`: Rows returned at most, defaults to 200, up to 10000. Aggregate in the query rather than raising it.
+    - `region`: Optional AWS region whose prices fill the `prices` table.
+
+    **Examples**:
+    - `SELECT machine_key, date_trunc('day', time) AS day, MAX(used) AS peak FROM history GROUP BY 1, 2 ORDER BY 1, 2`
+    - `SELECT instance_type, price_per_hour FROM prices WHERE memory_gib >= 16 AND vcpu >= 2 ORDER BY price_per_hour LIMIT 5`
+    - `SELECT s.machine_key, m.instance_id, s.p99 FROM summaries s JOIN machines m USING (machine_key) WHERE s."column" = 'used'`
+
+    **Output**:
+    - On success, returns a dictionary with:
+      - `status`: 'success'
+      - `columns`: Result column names in order
+      - `data`: Parallel lists, one per column (times as ISO 8601 strings)
+      - `rows`: Number of rows returned
+      - `truncated`: True if the result had more than max_rows rows
+    - On error, returns a dictionary with:
+      - `status`: 'error'
+      - `message`: The error message
+      - `query` for context
+    '''
+
+    async def execute(query: str, max_rows: int, region: str, ctx: Context) -> Dict[str, Any]:
+        """Run a SQL query over the local tables"""
+        from ..downloadstats.query import run_query
+        try:
+            result = await run_in_thread(run_query, query, max_rows, region)
+            return {
+                'status': 'success',
+                **result,
+            }
+        except Exception as e:
+            await ctx.error(f'Failed to run query: {e}')
+            return {
+                'status': 'error',
+                'message': str(e),
+                'query': query,
+            }
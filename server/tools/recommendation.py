@@ -30,8 +30,14 @@ _inputs = """
           "vcpu_usage": "1.7"
         },
 
-        // A small sample of raw measurements at successive intervals
+        // Measurements over the whole window, downsampled to at most max_points samples per column
+        // with Largest-Triangle-Three-Buckets so peaks and dips are kept
         "data": {
+            // Position of each sample in the full series; sample i was taken at
+            // timestamp - (last sample_index - i) * sample_rate seconds
+            "sample_index": [0, 340, 681],
+            // Time each sample was taken (ISO 8601 UTC)
+            "time": ["2025-05-10T07:49:01.725+00:00", "2025-05-10T19:09:01.725+00:00", "2025-05-11T06:31:01.725+00:00"],
             // BitFlux calculated used memory
             "used": [16188846080, 16121737216, 16239177728],
             // Bytes of unused RAM at this sample
@@ -123,7 +129,7 @@ _core_prompt = """
     - 'savings': Savings are calculated as the cost of the recommended instance type vs the cost of the 'stats' 'instance_type' for a 30 day period. Express in dollars and percentage. If 'instance_type' is empty or missing, express the cost of the recommended instance type.
     - 'reason': A concise explanation of why the instance type was recommended and any comments or warnings.
 
-    Optionally you can include charts and/or graphs of the memory and cpus over time. You can use the timestamp field as the time of the last sample, with the sample_rate being the time between samples.
+    Optionally you can include charts and/or graphs of the memory and cpus over time. You can use the timestamp field as the time of the last sample, with the sample_rate being the time between samples, or the 'time' field of each point in 'data'.
     """
 
 
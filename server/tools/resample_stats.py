@@ -0,0 +1,66 @@
+from ..profiling import run_in_thread
+from mcp.server.fastmcp import Context
+from typing import Any, Dict, List, Optional
+
+
+class ResampleStatsTool():
+    name = 'resample_stats'
+
+    description = '''
+    Aggregate a machine's telemetry into fixed time buckets, e.g. hourly p95 memory or daily max CPU.
+
+    The aggregation runs on the full downloaded series, so prefer this tool over download_stats_* whenever the user asks about usage over time periods (hourly peaks, daily averages, busiest hours, etc.).
+
+    **Parameters**:
+    - `machine_key`: The machine_key from the bitflux servers (see list_machines_by_region or machine_key_by_instance_id).
+    - `every`: Bucket width as a duration string, e.g. '15m', '1h', '6h', '1d'. Defaults to '1h'.
+    - `aggs`: List of aggregates. Each entry is '<agg>' to apply to every column or '<column>:<agg>' for a single column.
+      `<agg>` is one of mean, min, max, median, sum, std, or pNN for a percentile (p50, p95, p99, p99.9).
+      Columns are used, free, cached, swap_used, swap_cached, reclaimable and idle_cpu (all bytes except idle_cpu, which is percent idle).
+      Defaults to ['mean', 'max', 'p95'].
+    - `history`: When true, aggregate every sample kept locally for the machine (up to 90 days by default) instead of only the catcher's current ring buffer, which covers a shorter window. Use it for questions about longer periods, e.g. weekly trends.
+
+    **Examples**:
+    - Hourly p95 memory: `resample_stats(machine_key, '1h', ['used:p95'])`
+    - Daily CPU profile: `resample_stats(machine_key, '1d', ['idle_cpu:min', 'idle_cpu:mean'])`
+    - Daily peak memory over the stored history: `resample_stats(machine_key, '1d', ['used:max'], history=True)`
+
+    **Output**:
+    - On success, returns a dictionary with:
+      - `status`: 'success'
+      - `machine_key`, `every`, `aggs`, `history`: The inputs
+      - `timestamp`: Time of the last sample (ISO 8601 UTC)
+      - `sample_rate`: Interval between samples in seconds
+      - `stale_since`: Only when the bitflux servers could not be reached, the time of the earlier download used instead
+      - `data`: Parallel lists, one entry per bucket:
+         - `time`: Bucket start (ISO 8601 UTC)
+         - `samples`: Number of samples in the bucket
+         - `<column>_<agg>`: One list per requested aggregate, e.g. `used_p95`
+    - On error, returns a dictionary with:
+      - `status`: 'error'
+      - `message`: The error message
+      - `machine_key`, `every`, `aggs` for context
+    '''
+
+    async def execute(machine_key: str, every: str, aggs: Optional[List[str]], history: bool, url: str, ctx: Context) -> Dict[str, Any]:
+        """Download stats and aggregate them into time buckets"""
+        from ..downloadstats.tool import resample_stats_by_machine_key
+        try:
+            result = await run_in_thread(resample_stats_by_machine_key, machine_key, url, every, aggs, history)
+            return {
+                'status': 'success',
+                'machine_key': machine_key,
+                'every': every,
+                'aggs': aggs,
+                'history': history,
+                **result,
+            }
+        except Exception as e:
+            await ctx.error(f'Failed to resample stats for {machine_key} via {url}: {e}')
+            return {
+                'status': 'error',
+                'message': str(e),
+                'machine_key': machine_key,
+                'every': every,
+                'aggs': aggs,
+            }
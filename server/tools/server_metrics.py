@@ -0,0 +1,32 @@
+from mcp.server.fastmcp import Context
+from typing import Any, Dict
+from ..metrics import get_metrics
+
+
+class ServerMetricsTool():
+    name = 'server_metrics'
+
+    description = '''
+    Report this MCP server's own performance counters since it started.
+
+    Use this when asked how the bitflux tools are performing, e.g. which tool calls are slow, failing, or returning large responses, and how well the local caches are working.
+
+    **Output**:
+    - `status`: 'success'
+    - `calls`: One entry per tool, resource and prompt that has been called:
+      - `kind`, `name`: What was called
+      - `calls`, `errors`: Number of calls and how many raised or returned an error
+      - `latency_seconds_sum`, `latency_seconds_mean`: Total and mean wall clock time
+      - `latency_seconds_buckets`: Cumulative histogram, number of calls that took at most each bound in seconds
+      - `response_bytes_sum`, `response_bytes_mean`: Total and mean serialized response size
+    - `caches`: Hit and miss counts per cache name
+    - `aws_requests`: AWS API request attempts per `service` and `region`, split into `ok` and `throttled`
+    - `catcher_requests`: Catcher calls per endpoint by outcome: `ok`, `error`, `retried` attempts, `hedged` second requests and how many of them `hedge_won`, calls `short_circuited` while the endpoint was failing, and `fallback` answers served from cached data
+    '''
+
+    async def execute(ctx: Context) -> Dict[str, Any]:
+        """Return a snapshot of the server metrics"""
+        return {
+            'status': 'success',
+            **get_metrics().snapshot(),
+        }
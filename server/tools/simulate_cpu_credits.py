@@ -0,0 +1,58 @@
+from ..profiling import run_in_thread
+from mcp.server.fastmcp import Context
+from typing import Any, Dict
+
+
+class SimulateCpuCreditsTool():
+    name = 'simulate_cpu_credits'
+
+    description = '''
+    Replay a machine's CPU usage against the CPU credit balance of every burstable (t3, t3a, t4g) instance type, to check whether a burstable recommendation would run out of credits.
+
+    Each sample's busy vCPUs, (100 - idle_cpu) / 100 * num_cpus capped at the candidate's vCPUs, spend one credit per vCPU minute while the candidate earns vcpu * baseline * 60 credits an hour, keeping at most 24 hours of them. Candidates start with a full balance.
+
+    **Parameters**:
+    - `machine_key`: The machine_key from the bitflux servers (see list_machines_by_region or machine_key_by_instance_id).
+    - `region`: AWS region whose on demand prices are the candidates. Without it, every price list already fetched with get_ec2_pricing is used.
+    - `instance_types`: Instance type or prefix pattern to limit the candidates, e.g. 't4g.*'. Defaults to 't*'.
+    - `history`: When true, replay every sample kept locally for the machine instead of only the catcher's ring buffer.
+    - `every`: Width of the trajectory buckets as a duration string, e.g. '15m', '1h', '1d'. Defaults to '1h'.
+
+    **Output**:
+    - On success, returns a dictionary with:
+      - `status`: 'success'
+      - `machine_key`, `every`: The inputs
+      - `timestamp`, `sample_rate`, `mem_total`, `swap_total`, `num_cpus`, `stale_since`: As from download_stats_by_machine_key
+      - `samples`: Number of samples replayed
+      - `candidates`: Parallel lists, one entry per burstable candidate, lowest risk first and then cheapest:
+         - `region`, `instance_type`, `instance_family`, `vcpu`, `memory_gib`, `price_per_hour`
+         - `baseline`: Baseline utilization per vCPU, `credits_per_hour` earned, `max_credits` kept
+         - `throttling_risk`: Fraction of samples that would be held to the baseline in standard mode, having run out of credits
+         - `low_balance`: Fraction of samples with less than 10% of max_credits left
+         - `min_balance`, `final_balance`: Lowest and last balance as fractions of max_credits
+         - `surplus_cost_per_hour`: Average extra cost per hour in unlimited mode ($0.05 per surplus vCPU hour)
+      - `trajectories`: Parallel lists, one entry per bucket: `time` (bucket start, ISO 8601 UTC) and, per candidate as `<region>/<instance_type>` (e.g. `us-east-1/t3.large`), the lowest credit balance in the bucket
+    - On error, returns a dictionary with:
+      - `status`: 'error'
+      - `message`: The error message
+      - `machine_key` for context
+    '''
+
+    async def execute(machine_key: str, region: str, instance_types: str, history: bool, every: str,
+                      url: str, ctx: Context) -> Dict[str, Any]:
+        """Replay stats against burstable instance CPU credits"""
+        from ..downloadstats.whatif import simulate_cpu_credits
+        try:
+            result = await run_in_thread(simulate_cpu_credits, machine_key, url, region, instance_types, history, every)
+            return {
+                'status': 'success',
+                'machine_key': machine_key,
+                **result,
+            }
+        except Exception as e:
+            await ctx.error(f'Failed to simulate CPU credits for {machine_key} via {url}: {e}')
+            return {
+                'status': 'error',
+                'message': str(e),
+                'machine_key': machine_key,
+            }
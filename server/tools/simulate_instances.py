@@ -0,0 +1,64 @@
+from ..profiling import run_in_thread
+from mcp.server.fastmcp import Context
+from typing import Any, Dict
+
+
+class SimulateInstancesTool():
+    name = 'simulate_instance_sizes'
+
+    description = '''
+    Replay a machine's memory and CPU telemetry against every candidate EC2 instance type at once, to right-size it from the full distribution rather than one median.
+
+    Every sample of used, reclaimable and swap_used memory and idle_cpu is compared with each candidate's memory and vCPUs, with used memory taken as 10% higher since the calculated figure runs below actual usage.
+    Burstable (t3, t3a, t4g) candidates are also replayed against their CPU credits, see simulate_cpu_credits.
+    Use it after download_stats_by_machine_key to check a recommendation, or to find the cheapest instance types the workload fits.
+
+    **Parameters**:
+    - `machine_key`: The machine_key from the bitflux servers (see list_machines_by_region or machine_key_by_instance_id).
+    - `region`: AWS region whose on demand prices are the candidates. Without it, every price list already fetched with get_ec2_pricing is used.
+    - `instance_types`: Instance type or prefix pattern to limit the candidates, e.g. 'm7g.*' or 'r6i.large'. Defaults to '*'.
+    - `history`: When true, replay every sample kept locally for the machine instead of only the catcher's ring buffer.
+    - `max_candidates`: Candidates returned, defaults to 20.
+
+    **Output**:
+    - On success, returns a dictionary with:
+      - `status`: 'success'
+      - `machine_key`: The input
+      - `timestamp`, `sample_rate`, `mem_total`, `swap_total`, `num_cpus`, `stale_since`: As from download_stats_by_machine_key
+      - `samples`: Number of samples replayed
+      - `candidates`: Number of instance types simulated, `fitting`: how many of them fit
+      - `data`: Parallel lists, one entry per candidate, those that fit first and cheapest first:
+         - `region`, `instance_type`, `instance_family`, `vcpu`, `memory_gib`, `price_per_hour`
+         - `over_capacity`: Fraction of samples whose used memory would not fit
+         - `cache_pressure`: Fraction of samples where used memory and reclaimable cache would not both fit
+         - `swap_pressure`: Fraction of samples with memory in swap, counting what the machine already swapped
+         - `swap_mean`, `swap_max`: Estimated bytes in swap, mean and peak
+         - `cpu_saturation`: Fraction of samples needing more vCPUs than the candidate has
+         - `cpu_excess`: Mean vCPUs of demand beyond the candidate's
+         - `cpu_p99_utilization`: 99th percentile of CPU demand over the candidate's vCPUs
+         - `throttling_risk`: For burstable types, fraction of samples held to the baseline after running out of CPU credits, otherwise null
+         - `fits`: over_capacity at most 0.1%, and cpu_saturation and throttling_risk at most 1%
+    - On error, returns a dictionary with:
+      - `status`: 'error'
+      - `message`: The error message
+      - `machine_key` for context
+    '''
+
+    async def execute(machine_key: str, region: str, instance_types: str, history: bool, max_candidates: int,
+                      url: str, ctx: Context) -> Dict[str, Any]:
+        """Replay stats against candidate instance types"""
+        from ..downloadstats.whatif import simulate_instances
+        try:
+            result = await run_in_thread(simulate_instances, machine_key, url, region, instance_types, history, max_candidates)
+            return {
+                'status': 'success',
+                'machine_key': machine_key,
+                **result,
+            }
+        except Exception as e:
+            await ctx.error(f'Failed to simulate instance sizes for {machine_key} via {url}: {e}')
+            return {
+                'status': 'error',
+                'message': str(e),
+                'machine_key': machine_key,
+            }
@@ -0,0 +1,47 @@
+from ..profiling import run_in_thread
+from mcp.server.fastmcp import Context
+from typing import Any, Dict
+
+
+class SummarizeStatsTool():
+    name = 'summarize_stats'
+
+    description = '''
+    Summarize a machine's telemetry without the downsampled series, reading the samples in bounded-memory chunks.
+
+    Use this instead of download_stats_by_machine_key when only the summary is needed, or when the machine has a long history at a short sample_rate (e.g. months of 1 second samples) that is too large to load at once.
+
+    **Parameters**:
+    - `machine_key`: The machine_key from the bitflux servers (see list_machines_by_region or machine_key_by_instance_id).
+
+    **Output**:
+    - On success, returns a dictionary with:
+      - `status`: 'success'
+      - `machine_key`: The input
+      - `timestamp`, `sample_rate`, `mem_total`, `swap_total`, `num_cpus`, `stale_since`: As from download_stats_by_machine_key
+      - `summary`: The same statistics per column as download_stats_by_machine_key. count, mean, std, min, max and sum are exact,
+        the percentiles and median are within 1% of the exact value.
+      - `summary_requirements`: `used_memory` and `vcpu_usage`, as from download_stats_by_machine_key
+    - On error, returns a dictionary with:
+      - `status`: 'error'
+      - `message`: The error message
+      - `machine_key` for context
+    '''
+
+    async def execute(machine_key: str, url: str, ctx: Context) -> Dict[str, Any]:
+        """Download stats and summarize them chunk by chunk"""
+        from ..downloadstats.chunked import summarize_stats_by_machine_key
+        try:
+            result = await run_in_thread(summarize_stats_by_machine_key, machine_key, url)
+            return {
+                'status': 'success',
+                'machine_key': machine_key,
+                **result,
+            }
+        except Exception as e:
+            await ctx.error(f'Failed to summarize stats for {machine_key} via {url}: {e}')
+            return {
+                'status': 'error',
+                'message': str(e),
+                'machine_key': machine_key,
+            }
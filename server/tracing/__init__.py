@@ -0,0 +1,2 @@
+from .tracer import Span, add_exporter, current_span, reset_exporters, span
+from .exporters import JsonLinesExporter, OTLPExporter, configure_tracing
@@ -0,0 +1,131 @@
+import json
+import os
+import queue
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+from .tracer import Span, add_exporter
+
+SERVICE_NAME = 'bitflux_mcp'
+
+
+class JsonLinesExporter:
+    """Appends every span of a finished trace to a file, one JSON object per line."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = ''.join(json.dumps(s.to_dict(), default=str) + '\n' for s in spans)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def otlp_payload(spans: List[Span]) -> Dict[str, Any]:
+    """Build an OTLP/HTTP JSON ExportTraceServiceRequest for spans."""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'scopeSpans': [{
+                'scope': {'name': SERVICE_NAME},
+                'spans': [
+                    {
+                        'traceId': s.trace_id,
+                        'spanId': s.span_id,
+                        'parentSpanId': s.parent_id,
+                        'name': s.name,
+                        # SPAN_KIND_SERVER for the tool call, INTERNAL for its phases
+                        'kind': 2 if not s.parent_id else 1,
+                        'startTimeUnixNano': str(s.start_ns),
+                        'endTimeUnixNano': str(s.end_ns),
+                        'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in s.attributes.items()],
+                        # STATUS_CODE_OK or STATUS_CODE_ERROR
+                        'status': {'code': 2, 'message': s.message} if s.status == 'error' else {'code': 1},
+                    }
+                    for s in spans
+                ],
+            }],
+        }],
+    }
+
+
+class OTLPExporter:
+    """
+    Sends finished traces to an OTLP/HTTP collector as JSON.
+
+    Traces are queued and posted to <endpoint>/v1/traces from a background
+    thread so tool calls never wait on the collector. When the queue is full
+    traces are dropped. Traces the collector could not be reached for or
+    answered with an error status are counted in failed and reported on
+    stderr, stdout being the MCP channel of the stdio transport.
+    """
+
+    def __init__(self, endpoint: str, timeout: float = 5.0, max_queue: int = 1000) -> None:
+        import urllib3
+
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.dropped = 0
+        self.failed = 0
+        self._http = urllib3.PoolManager(timeout=timeout, retries=False)
+        self._queue: 'queue.Queue[Optional[List[Span]]]' = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Span]) -> None:
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            try:
+                response = self._http.request('POST', self.url, body=json.dumps(otlp_payload(spans)),
+                                              headers={'Content-Type': 'application/json'})
+                if response.status >= 300:
+                    self.failed += 1
+                    print(f"Failed to send trace to {self.url}: HTTP {response.status} "
+                          f"{response.data[:200].decode(errors='replace')}", file=sys.stderr)
+            except Exception as e:
+                self.failed += 1
+                print(f"Failed to send trace to {self.url}: {e}", file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+def configure_tracing(trace_file: str = '', otlp_endpoint: str = '') -> None:
+    """
+    Enable tracing with the given exporters.
+
+    Empty arguments fall back to the BITFLUX_TRACE_FILE and
+    BITFLUX_OTLP_ENDPOINT environment variables. Without either, tracing
+    stays off and span() costs next to nothing.
+    """
+    trace_file = trace_file or os.environ.get('BITFLUX_TRACE_FILE', '')
+    otlp_endpoint = otlp_endpoint or os.environ.get('BITFLUX_OTLP_ENDPOINT', '')
+    if trace_file:
+        add_exporter(JsonLinesExporter(trace_file))
+    if otlp_endpoint:
+        add_exporter(OTLPExporter(otlp_endpoint))
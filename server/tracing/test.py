@@ -0,0 +1,178 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from mcp.server.fastmcp import Context
+
+from ..bench.synthetic import synthetic_payload, synthetic_ring_buffer
+from ..bitflux_catcher_api.standin import StandinCatcher
+from ..downloadstats.tool import download_stats_by_machine_key
+from ..metrics import InstrumentedFastMCP
+from . import JsonLinesExporter, OTLPExporter, add_exporter, reset_exporters, span
+
+
+class Collect:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append([s.to_dict() for s in spans])
+
+
+@pytest.fixture
+def collected():
+    collect = Collect()
+    add_exporter(collect)
+    yield collect
+    reset_exporters()
+
+
+class TestSpans:
+
+    def test_off_without_exporters(self):
+        with span('x', root=True) as s:
+            s.set('a', 1)
+        assert type(s).__name__ == '_NoopSpan'
+
+    def test_children_outside_trace_ignored(self, collected):
+        with span('orphan'):
+            pass
+        assert collected.traces == []
+
+    def test_tree_across_threads(self, collected):
+        def work():
+            with span('child'):
+                pass
+
+        async def call():
+            with span('root', root=True):
+                await asyncio.to_thread(work)
+                with span('second') as s:
+                    with pytest.raises(ValueError):
+                        with span('failing'):
+                            raise ValueError('boom')
+                    s.set('rows', 3)
+
+        asyncio.run(call())
+        [trace] = collected.traces
+        by_name = {s['name']: s for s in trace}
+        assert len({s['trace_id'] for s in trace}) == 1
+        assert by_name['child']['parent_id'] == by_name['root']['span_id']
+        assert by_name['second']['parent_id'] == by_name['root']['span_id']
+        assert by_name['failing']['parent_id'] == by_name['second']['span_id']
+        assert by_name['failing']['status'] == 'error'
+        assert by_name['second']['attributes'] == {'rows': 3}
+        assert trace[-1]['name'] == 'root'
+
+    def test_tool_call_phases(self, collected):
+        mcp = InstrumentedFastMCP(name='test')
+        with StandinCatcher() as catcher:
+            catcher.add_stats('k', synthetic_payload(*synthetic_ring_buffer(500, 60)))
+
+            @mcp.tool(name='download')
+            async def download(ctx: Context) -> dict:
+                return await asyncio.to_thread(download_stats_by_machine_key, 'k', catcher.url)
+
+            asyncio.run(mcp.call_tool('download', {}))
+        [trace] = collected.traces
+        names = [s['name'] for s in trace]
+        for phase in ('catcher.download', 'protobuf.parse', 'parquet.decode', 'scale',
+                      'strip_warmup', 'downsample', 'summarize'):
+            assert phase in names
+        root = trace[-1]
+        assert root['name'] == 'tool download' and root['parent_id'] == ''
+        assert all(s['parent_id'] == root['span_id'] for s in trace[:-1])
+
+
+class TestExporters:
+
+    def test_json_lines(self, tmp_path):
+        path = tmp_path / 'trace.jsonl'
+        add_exporter(JsonLinesExporter(str(path)))
+        try:
+            with span('root', root=True):
+                with span('child'):
+                    pass
+        finally:
+            reset_exporters()
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [line['name'] for line in lines] == ['child', 'root']
+
+    def test_otlp(self):
+        received = []
+
+        class Collector(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                received.append((self.path, json.loads(self.rfile.read(int(self.headers['Content-Length'])))))
+                self.send_response(200)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Collector)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        exporter = OTLPExporter(f'http://127.0.0.1:{server.server_address[1]}')
+        add_exporter(exporter)
+        try:
+            with span('root', root=True, tool='x'):
+                with span('child'):
+                    pass
+            exporter.flush()
+        finally:
+            reset_exporters()
+            server.shutdown()
+        [(path, body)] = received
+        assert path == '/v1/traces'
+        spans = body['resourceSpans'][0]['scopeSpans'][0]['spans']
+        assert [s['name'] for s in spans] == ['child', 'root']
+        assert spans[0]['parentSpanId'] == spans[1]['spanId']
+        assert spans[1]['attributes'] == [{'key': 'tool', 'value': {'stringValue': 'x'}}]
+
+    @pytest.mark.parametrize('status', [400, 503])
+    def test_otlp_rejected(self, status, capsys):
+        class Collector(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                body = b'invalid trace'
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Collector)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        exporter = OTLPExporter(f'http://127.0.0.1:{server.server_address[1]}')
+        add_exporter(exporter)
+        try:
+            with span('root', root=True):
+                pass
+            exporter.flush()
+        finally:
+            reset_exporters()
+            server.shutdown()
+        assert exporter.failed == 1
+        out, err = capsys.readouterr()
+        assert out == ''
+        assert f'HTTP {status} invalid trace' in err
+
+    def test_failing_exporter_reports_on_stderr(self, capsys):
+        class Failing:
+            def export(self, spans):
+                raise OSError('disk full')
+
+        add_exporter(Failing())
+        try:
+            with span('root', root=True):
+                pass
+        finally:
+            reset_exporters()
+        out, err = capsys.readouterr()
+        assert out == ''
+        assert 'Failed to export trace with Failing: disk full' in err
@@ -0,0 +1,141 @@
+import contextlib
+import contextvars
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+_current: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('bitflux_span', default=None)
+_exporters: List[Any] = []
+
+
+class Span:
+    """
+    One timed phase of a trace.
+
+    Spans form a tree through parent_id. The root span owns the list of
+    finished spans for its trace, which is handed to the exporters when the
+    root ends.
+    """
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns',
+                 'attributes', 'status', 'message', '_trace')
+
+    def __init__(self, name: str, parent: Optional['Span'], attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        if parent is None:
+            self.trace_id = os.urandom(16).hex()
+            self.parent_id = ''
+            self._trace: '_Trace' = _Trace()
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+            self._trace = parent._trace
+        self.attributes = dict(attributes)
+        self.status = 'ok'
+        self.message = ''
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def fail(self, message: str) -> None:
+        self.status = 'error'
+        self.message = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_unix_nano': self.start_ns,
+            'end_unix_nano': self.end_ns,
+            'duration_ms': (self.end_ns - self.start_ns) / 1e6,
+            'attributes': self.attributes,
+            'status': self.status,
+            'message': self.message,
+        }
+
+
+class _Trace:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.spans: List[Span] = []
+
+
+class _NoopSpan:
+    """Returned by span() when tracing is off, so call sites need no checks."""
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+    def fail(self, message: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+@contextlib.contextmanager
+def span(name: str, root: bool = False, **attributes: Any) -> Iterator[Any]:
+    """
+    Time the enclosed block as a child of the current span.
+
+    Outside of a trace the block is only traced when root is True, which
+    starts a new trace that is exported when the block exits. The current
+    span follows contextvars, so work done through asyncio.to_thread stays
+    in the caller's trace.
+
+    Usage:
+        with span('parquet.decode', bytes=len(payload)) as s:
+            df = pl.read_parquet(...)
+            s.set('rows', len(df))
+    """
+    parent = _current.get()
+    if not _exporters or (parent is None and not root):
+        yield NOOP_SPAN
+        return
+    current = Span(name, parent, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(f'{type(e).__name__}: {e}')
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current.reset(token)
+        with current._trace.lock:
+            current._trace.spans.append(current)
+        if parent is None:
+            _export(current._trace.spans)
+
+
+def current_span() -> Any:
+    """The innermost active span, or a no-op span outside of a trace."""
+    return _current.get() or NOOP_SPAN
+
+
+def _export(spans: List[Span]) -> None:
+    for exporter in list(_exporters):
+        try:
+            exporter.export(spans)
+        except Exception as e:
+            print(f"Failed to export trace with {type(exporter).__name__}: {e}", file=sys.stderr)
+
+
+def add_exporter(exporter: Any) -> None:
+    """Register an exporter, an object with export(spans) called once per finished trace."""
+    _exporters.append(exporter)
+
+
+def reset_exporters() -> None:
+    for exporter in _exporters:
+        close = getattr(exporter, 'close', None)
+        if close is not None:
+            close()
+    _exporters.clear()